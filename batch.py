@@ -0,0 +1,113 @@
+"""
+Score lots of scenarios without opening a window.
+
+Usage:
+    python batch.py scenarios/*.jsonl -o results.jsonl -j 16
+
+A path can also be a binary scenario library (see scenariolibrary.py).
+Workers memory-map those and only read the scenarios they're given.
+
+Each line of the output is one scored scenario:
+    {"name": ..., "products": [...], "segments": [...],
+     "scores": [[[year 0, year 1, ...], ...segments], ...products]}
+Lines are written as soon as each scenario is done, in whatever order
+the workers finish them.
+"""
+import argparse
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+import scenario
+import scenariolibrary
+from surveyscore.score import survey_scores
+
+def score_scenario(d):
+    """
+    Score one scenario (given as a dict; see scenario.py).
+    Returns a dict that's ready to be dumped as JSON.
+    """
+    name, num_years, market_segments, products, table = scenario.from_dict(d)
+    scores = table.survey_scores(market_segments)
+    return {
+        'name': name,
+        'products': table.names,
+        'segments': [ms._name for ms in market_segments],
+        'scores': scores.round(4).tolist(),
+    }
+
+# Libraries each worker process has opened so far (path => ScenarioLibrary)
+_libraries = {}
+
+def score_library_scenario(path, i):
+    """
+    Score scenario i of a binary library. Scores straight off the memory
+    map, without building any Product objects.
+    """
+    library = _libraries.get(path)
+    if library is None:
+        library = _libraries[path] = scenariolibrary.ScenarioLibrary(path)
+
+    market_segments = library.market_segments(i)
+    columns = library.columns(i)
+    scores = survey_scores(columns['performance'], columns['size'], columns['mtbf'],
+                           columns['price'], columns['age'], market_segments)
+    return {
+        'name': library.name(i),
+        'products': library.product_names(i),
+        'segments': [ms._name for ms in market_segments],
+        'scores': np.round(scores, 4).tolist(),
+    }
+
+def _score_task(task):
+    if isinstance(task, dict):
+        return score_scenario(task)
+    return score_library_scenario(*task)
+
+def _tasks(paths):
+    """
+    Scenario dicts for JSON files, (path, index) for libraries
+    """
+    for path in paths:
+        if scenariolibrary.is_library(path):
+            library = scenariolibrary.ScenarioLibrary(path)
+            yield from ((path, i) for i in range(len(library)))
+        else:
+            yield from scenario.iter_scenario_dicts([path])
+
+def run(paths, output, processes=None, chunksize=16):
+    """
+    Score every scenario in the given files and stream the results to output
+    (a path). Returns how many scenarios were scored.
+
+    processes defaults to the number of cores.
+    """
+    count = 0
+
+    with open(output, 'w') as out, Pool(processes) as pool:
+        for result in pool.imap_unordered(_score_task, _tasks(paths), chunksize):
+            # Flushed right away, so the output can be watched (or salvaged) mid-run
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            count += 1
+
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score scenarios without the GUI")
+    parser.add_argument('paths', nargs='+', help=".json or .jsonl scenario files, or scenario library directories")
+    parser.add_argument('-o', '--output', default='results.jsonl',
+                        help="where to write the scores (one JSON object per line)")
+    parser.add_argument('-j', '--processes', type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help="scenarios handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    count = run(args.paths, args.output, args.processes, args.chunksize)
+    print(f"Scored {count} scenarios into {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
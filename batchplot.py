@@ -0,0 +1,255 @@
+"""
+Draws lots of products/segments with a handful of artists instead of a
+few per product. Matplotlib's cost is mostly per artist, so with hundreds
+of competitors on the map this is a lot faster than ProductPlot and
+MarketSegmentPlot (which it otherwise looks like).
+
+ - All product markers are one PathCollection, moved with one set_offsets
+ - All segment circles are one EllipseCollection (a PatchCollection of
+   Circles can't be moved without rebuilding every path)
+ - Labels are a TextCollection: one artist that draws every label from
+   an array of positions, and can drop labels that would overlap
+"""
+import numpy as np
+import matplotlib
+from matplotlib.artist import Artist
+from matplotlib.collections import EllipseCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.transforms import Bbox
+
+class TextCollection(Artist):
+    """
+    A bunch of labels drawn by one artist
+    """
+    def __init__(self, ax, ha='left', va='baseline', colors='black', declutter=False,
+                 fontsize=None):
+        """
+        Parameters:
+            ax              Axis to draw on (positions are in its data coordinates)
+            ha              'left' or 'center'
+            va              'baseline' or 'center'
+            colors          One color, or one per label (see set_data)
+            declutter       Skip labels that would overlap ones drawn before them
+                            (earlier labels win)
+            fontsize        Defaults to rcParams["font.size"]
+        """
+        super().__init__()
+        self._ha = ha
+        self._va = va
+        self._colors = colors
+        self._declutter = declutter
+        self._prop = FontProperties(size=fontsize)
+
+        self._offsets = np.zeros((0, 2))
+        self._texts = []
+
+        # (text, dpi) => (width, height, descent) in pixels, for the labels
+        # drawn last time (rebuilt every draw, so it doesn't grow forever)
+        self._extents = {}
+
+        # Number of labels left out by decluttering in the last draw
+        self.culled = 0
+
+        ax.add_artist(self)
+
+    def set_data(self, offsets, texts, colors=None):
+        """
+        Replace every label at once
+        """
+        self._offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+        self._texts = list(texts)
+        if colors is not None:
+            self._colors = colors
+        self.stale = True
+
+    def set_offsets(self, offsets):
+        self._offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+        self.stale = True
+
+    def _layout(self, renderer):
+        """
+        Returns (x, baseline, boxes, keep) in display coordinates (pixels up
+        from the bottom): where each label's baseline starts, each label's
+        (x0, y0, x1, y1) box, and which labels survive decluttering
+        """
+        old, self._extents = self._extents, {}
+        for text in self._texts:
+            key = (text, renderer.dpi)
+            extent = old.get(key) or self._extents.get(key)
+            if extent is None:
+                extent = renderer.get_text_width_height_descent(text, self._prop, ismath=False)
+            self._extents[key] = extent
+        extents = np.array([self._extents[(s, renderer.dpi)] for s in self._texts])
+        w, h, d = extents.T
+
+        xy = self.get_transform().transform(self._offsets)
+        x0 = xy[:, 0] - (w / 2 if self._ha == 'center' else 0)
+        baseline = xy[:, 1] - ((h / 2 - d) if self._va == 'center' else 0)
+        boxes = np.column_stack((x0, baseline - d, x0 + w, baseline - d + h))
+
+        keep = np.ones(len(self._texts), dtype=bool)
+        if self._declutter:
+            # Greedy: each label is kept if it misses every label kept so far
+            placed = np.empty_like(boxes)
+            n = 0
+            for i, box in enumerate(boxes):
+                p = placed[:n]
+                if np.any((p[:, 0] < box[2]) & (box[0] < p[:, 2])
+                          & (p[:, 1] < box[3]) & (box[1] < p[:, 3])):
+                    keep[i] = False
+                else:
+                    placed[n] = box
+                    n += 1
+        return x0, baseline, boxes, keep
+
+    def get_window_extents(self, renderer):
+        """
+        Bboxes (in display coordinates) of the labels that get drawn, in order
+        """
+        _, _, boxes, keep = self._layout(renderer)
+        return [Bbox.from_extents(*box) for box in boxes[keep]]
+
+    def draw(self, renderer):
+        if not self.get_visible() or not self._texts:
+            return
+
+        x0, baseline, _, keep = self._layout(renderer)
+        self.culled = int((~keep).sum())
+
+        # Same as Text.draw: renderers that count y down from the top want it flipped
+        if renderer.flipy():
+            baseline = renderer.get_canvas_width_height()[1] - baseline
+
+        colors = self._colors
+        if isinstance(colors, str):
+            colors = [colors] * len(self._texts)
+
+        renderer.open_group('textcollection', gid=self.get_gid())
+        gc = renderer.new_gc()
+        self._set_gc_clip(gc)
+        gc.set_alpha(self.get_alpha())
+        for i in np.flatnonzero(keep):
+            gc.set_foreground(colors[i])
+            renderer.draw_text(gc, x0[i], baseline[i], self._texts[i], self._prop, 0)
+        gc.restore()
+        renderer.close_group('textcollection')
+        self.stale = False
+
+class ProductCollectionPlot:
+    """
+    Every product's marker and label, as two artists
+    """
+    def __init__(self, ax, declutter=True):
+        self._names = []
+        self._positions = np.zeros((0, 2))
+        self._ages = np.zeros(0)
+        self._visible = np.zeros(0, dtype=bool)
+
+        self._markers = ax.scatter(np.zeros(0), np.zeros(0), c='#000')
+        self._labels = TextCollection(ax, declutter=declutter)
+
+    def artists(self):
+        return [self._markers, self._labels]
+
+    def add(self, name, initial_size, initial_performance):
+        """
+        Returns the product's index
+        """
+        self._names.append(name)
+        self._positions = np.vstack((self._positions, (initial_performance, initial_size)))
+        self._ages = np.append(self._ages, 0)
+        self._visible = np.append(self._visible, True)
+        self.sync()
+        return len(self._names) - 1
+
+    def move(self, index, coords, age):
+        """
+        Doesn't show up until sync()
+        """
+        self._positions[index] = coords
+        self._ages[index] = age
+
+    def set_visible(self, index, visible):
+        self._visible[index] = visible
+
+    def sync(self):
+        """
+        Push every move since the last sync to the artists
+        """
+        shown = np.flatnonzero(self._visible)
+        self._markers.set_offsets(self._positions[shown])
+        self._labels.set_data(self._positions[shown],
+                              [f"{self._names[i]} ({self._ages[i]:g})" for i in shown])
+
+class ProductMarker:
+    """
+    One product's slice of a ProductCollectionPlot, with the same
+    methods as ProductPlot (so the controller can treat them the same)
+    """
+    def __init__(self, plot, name, initial_size, initial_performance):
+        self._plot = plot
+        self._index = plot.add(name, initial_size, initial_performance)
+
+    def artists(self):
+        # The collection's artists are shared, so they're registered once, by the controller
+        return []
+
+    def move(self, name, coords, age):
+        self._plot.move(self._index, coords, age)
+
+    def set_visible(self, visible):
+        self._plot.set_visible(self._index, visible)
+
+class SegmentCollectionPlot:
+    """
+    Every segment's ideal spot, circle, and labels (name, price range, and
+    MTBF range), as three artists. Has the same update(t)/artists() as
+    MarketSegmentPlot.
+    """
+    def __init__(self, ax, market_segments):
+        self._market_segments = market_segments
+        n = len(market_segments)
+
+        cycle = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+        self._colors = [cycle[i % len(cycle)] for i in range(n)]
+
+        self._ideal_spots = ax.scatter(np.zeros(n), np.zeros(n), c=self._colors)
+
+        # Circles with radius 2.5 around the segments (sizes are in data units)
+        self._circles = EllipseCollection(np.full(n, 5.0), np.full(n, 5.0), np.zeros(n),
+                                          units='xy', offsets=np.zeros((n, 2)),
+                                          offset_transform=ax.transData,
+                                          facecolors='none', edgecolors=self._colors)
+        ax.add_collection(self._circles)
+
+        # Name in the middle, price above, MTBF below
+        self._label_offsets = np.array([(0, 0), (0, 0.5), (0, -0.5)])
+        self._labels = TextCollection(ax, ha='center', va='center',
+                                      colors=self._colors * 3)
+
+        self.update(0)
+
+    def artists(self):
+        return [self._ideal_spots, self._circles, self._labels]
+
+    def update(self, t):
+        """
+        Move everything to time t (fractions of a year are fine)
+        """
+        centroids = np.array([ms.trajectory.location(t) for ms in self._market_segments])
+        ideal_spots = np.array([ms.trajectory.ideal_spot(t) for ms in self._market_segments])
+
+        self._ideal_spots.set_offsets(ideal_spots)
+        self._circles.set_offsets(centroids)
+
+        texts = [ms._name for ms in self._market_segments]
+        for ms in self._market_segments:
+            low, high = ms.trajectory.price_range(t)
+            texts.append(f"${low:.2f} to ${high:.2f}")
+        for ms in self._market_segments:
+            low, high = ms.get_mtbf_range()
+            texts.append(f"{low} to {high}")
+
+        # Every segment's name, then every price, then every MTBF
+        offsets = (self._label_offsets[:, None, :] + centroids[None]).reshape(-1, 2)
+        self._labels.set_data(offsets, texts)
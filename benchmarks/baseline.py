@@ -0,0 +1,105 @@
+"""
+Saving benchmark results as JSON baselines and comparing new runs to them.
+
+A baseline file holds the parameters the benchmarks ran with (sizes, etc)
+and the results: each measurement's name mapped to its value in seconds
+(lower is better) or, for names ending in "fps", frames per second
+(higher is better). Results are only comparable between runs with the same
+parameters, so every set of parameters gets its own file.
+"""
+import json
+import os
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+def baseline_path(name, parameters=None):
+    """
+    Where the baseline for a benchmark run with some parameters goes,
+    e.g. suite-products1000-years100.json
+    """
+    key = "".join(f"-{k}{v}" for k, v in sorted((parameters or {}).items()))
+    return os.path.join(BASELINE_DIR, f"{name}{key}.json")
+
+def load(name, parameters=None):
+    """
+    Returns the saved baseline (with "parameters" and "results"), or None if
+    there isn't one yet
+    """
+    try:
+        with open(baseline_path(name, parameters)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save(name, results, parameters=None):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name, parameters), "w") as f:
+        json.dump({"parameters": parameters or {}, "results": results}, f,
+                  indent=4, sort_keys=True)
+        f.write("\n")
+
+def regressions(results, baseline, tolerance):
+    """
+    Returns a list of (name, baseline value, new value) for every measurement
+    that got worse by more than tolerance (0.2 means 20%)
+    """
+    worse = []
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if name.endswith("fps"):
+            regressed = value < old / (1 + tolerance)
+        else:
+            regressed = value > old * (1 + tolerance)
+        if regressed:
+            worse.append((name, old, value))
+    return worse
+
+def report(name, results, tolerance, update=False, parameters=None):
+    """
+    Print results next to the baseline for the same parameters. Saves them as
+    the new baseline if asked to (or if there wasn't one). Returns True if
+    nothing regressed.
+
+    Parameters:
+        name            Name of the benchmark (the baseline file is named after it)
+        results         {measurement: value}
+        tolerance       How much worse counts as a regression (0.2 means 20%)
+        update          Save results as the new baseline no matter what
+        parameters      {parameter: value} the benchmark ran with (sizes, etc)
+    """
+    parameters = parameters or {}
+    saved = load(name, parameters)
+
+    # Old baselines didn't record their parameters, so there's no telling what
+    # they were measured with
+    if saved is not None and saved.get("parameters") != parameters:
+        if not update:
+            print(f"{baseline_path(name, parameters)} was measured with different parameters "
+                  f"({saved.get('parameters')}, not {parameters}); rerun with --update")
+            return False
+        saved = None
+
+    baseline = saved["results"] if saved else None
+    for key, value in sorted(results.items()):
+        old = baseline.get(key) if baseline else None
+        was = f" (baseline {old:.4g})" if old is not None else ""
+        print(f"{name}.{key}: {value:.4g}{was}")
+
+    # A fresh checkout in CI has nothing to compare to; passing would mean the
+    # check never actually runs there
+    if baseline is None and not update and os.environ.get("CI"):
+        print(f"No baseline at {baseline_path(name, parameters)}; save one with --update "
+              f"and make it available to CI")
+        return False
+
+    if update or baseline is None:
+        save(name, results, parameters)
+        print(f"Saved baseline to {baseline_path(name, parameters)}")
+        return True
+
+    worse = regressions(results, baseline, tolerance)
+    for key, old, value in worse:
+        print(f"REGRESSION {name}.{key}: {old:.4g} => {value:.4g}")
+    return not worse
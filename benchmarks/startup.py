@@ -0,0 +1,46 @@
+"""
+Time how long main.py takes to put up its window (first_frame), draw the
+perceptual map (map), and finish building everything else (ready).
+
+Usage (needs a display):
+    python benchmarks/startup.py [--runs 5] [--tolerance 0.25] [--update]
+
+Exits with status 1 if the median of any of those regressed by more than
+the tolerance compared to benchmarks/baselines/startup.json. The first run
+(or --update) saves a new baseline, except under CI (the CI environment
+variable is set), where a missing baseline is a failure.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from baseline import report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_once():
+    env = dict(os.environ, MARKETPREDICTOR_STARTUP_BENCHMARK="1")
+    out = subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True, timeout=120)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true", help="save the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    # The first launch also fills the font cache, so it doesn't count
+    measure_once()
+    runs = [measure_once() for _ in range(args.runs)]
+    results = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+
+    ok = report("startup", results, args.tolerance, args.update)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Headless benchmarks for the model, the scoring, and the rendering.
+
+Usage:
+    python benchmarks/suite.py [--products 1000] [--years 100] [--tolerance 0.25] [--update]
+
+Times are the best of several runs, in seconds. Rendering is reported in
+frames per second. Results are compared to the baseline in
+benchmarks/baselines/ for the same --products/--years/--render-products
+(the first run with those, or --update, saves it) and the exit status is 1
+if anything regressed by more than the tolerance. Under CI, a missing
+baseline fails too.
+"""
+import argparse
+import gc
+import os
+import sys
+import timeit
+
+import matplotlib
+matplotlib.use("Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from baseline import report
+from scenario import default_market_segments, default_products
+from product.model import Product
+from product.table import ProductTable
+from perceptualmap import PerceptualMapFigure
+from surveyscore.score import positioning_score, price_score, mtbf_score, age_score
+from surveyscore.spatialindex import ProductGrid
+
+def best_of(fn, repeat=5, number=1):
+    """
+    Seconds per call of fn, taking the fastest of repeat tries
+    """
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+def random_products(num_products, num_years, seed=0):
+    rng = np.random.default_rng(seed)
+    table = ProductTable(num_years, capacity=num_products)
+    products = [Product(f"bench{i}", size=rng.uniform(2, 18), performance=rng.uniform(2, 18),
+                        mtbf=rng.uniform(14000, 27000), price=rng.uniform(15, 40), table=table)
+                for i in range(num_products)]
+    return table, products
+
+def bench_model(num_products, num_years):
+    table, products = random_products(num_products, num_years)
+    rng = np.random.default_rng(1)
+    edits = [(p, int(t), s) for p, t, s in zip(products, rng.integers(0, num_years - 1, len(products)),
+                                               rng.uniform(2, 18, len(products)))]
+
+    def update_stats():
+        for p, t, s in edits:
+            p.update_stats(t, size=s, performance=s, age=1)
+
+    def update_time():
+        for p in products:
+            p.update_time(num_years // 2)
+
+    return {
+        "model.create_products": best_of(lambda: random_products(num_products, num_years), repeat=3),
+        "model.update_stats": best_of(update_stats),
+        "model.update_time": best_of(update_time),
+    }
+
+def bench_segments(num_years):
+    segments = default_market_segments()
+    quarters = np.arange(num_years * 4) / 4
+
+    def scalar_queries():
+        for ms in segments:
+            for t in quarters:
+                ms.get_location(t)
+                ms.get_ideal_spot(t)
+                ms.get_price_range(t)
+
+    def array_queries():
+        for ms in segments:
+            ms.trajectory.location(quarters)
+            ms.trajectory.ideal_spot(quarters)
+            ms.trajectory.price_range(quarters)
+
+    def rebuild():
+        for ms in segments:
+            ms.drift = ms.drift
+            ms.trajectory
+
+    return {
+        "segments.scalar_queries": best_of(scalar_queries),
+        "segments.array_queries": best_of(array_queries),
+        "segments.rebuild_trajectories": best_of(rebuild),
+    }
+
+def bench_scoring(num_products, num_years):
+    segments = default_market_segments()
+    table, _ = random_products(num_products, num_years)
+    grid = ProductGrid(table)
+    n = num_products * num_years
+    rng = np.random.default_rng(2)
+    x = rng.uniform(0, 20, (n, 2))
+
+    return {
+        "scoring.survey_scores": best_of(lambda: table.survey_scores(segments)),
+        "scoring.survey_scores_indexed": best_of(lambda: grid.survey_scores(segments)),
+        "scoring.positioning_score": best_of(lambda: positioning_score((5, 15), (0, 0), x)),
+        "scoring.price_score": best_of(lambda: price_score(x[:, 0] + 15, 20, 30)),
+        "scoring.mtbf_score": best_of(lambda: mtbf_score(x[:, 0] * 1000 + 10000, 14000, 19000)),
+        "scoring.age_score": best_of(lambda: age_score(x[:, 0] / 2, 2, 1)),
+    }
+
+def bench_render(num_products, frames=30):
+    """
+    Scrub the time slider back and forth and report frames per second
+    """
+    results = {}
+    for blit in (True, False):
+        # The last run's views are still subscribed to pubsub until they're collected
+        gc.collect()
+
+        segments = default_market_segments()
+        products = default_products(10)
+        if num_products > len(products):
+            _, extra = random_products(num_products - len(products), 10, seed=3)
+            products += extra
+
+        m = PerceptualMapFigure(segments, products, FigureCanvasAgg, blit=blit)
+
+        def scrub():
+            for i in range(frames):
+                m.update_time(i % 10)
+                m.bus.flush()
+
+        name = "blit" if blit else "full"
+        results[f"render.scrub_{name}_fps"] = frames / best_of(scrub, repeat=3)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=100)
+    parser.add_argument("--render-products", type=int, default=50,
+                        help="products on screen during the scrub benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true", help="save the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    results.update(bench_model(args.products, args.years))
+    results.update(bench_segments(args.years))
+    results.update(bench_scoring(args.products, args.years))
+    results.update(bench_render(args.render_products))
+
+    parameters = {"products": args.products, "years": args.years,
+                  "render_products": args.render_products}
+    ok = report("suite", results, args.tolerance, args.update, parameters)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import instrument
+
+class BlitManager:
+    """
+    Redraws only the things that move (segments, products, labels) on top
+    of a cached picture of everything that doesn't (axes, grid, title, lines).
+
+    Based on the blitting tutorial in the matplotlib docs:
+    https://matplotlib.org/stable/tutorials/advanced/blitting.html
+    """
+    def __init__(self, canvas, artists=(), enabled=True):
+        """
+        Parameters:
+            canvas          The canvas to draw onto (FigureCanvasTkAgg in the GUI,
+                            but any Agg-based canvas works)
+            artists         Artists that change from frame to frame
+            enabled         If False, every update() is just a canvas.draw()
+        """
+        self._canvas = canvas
+        self._enabled = enabled
+        self._background = None
+        self._artists = []
+
+        for a in artists:
+            self.add_artist(a)
+
+        # Any full redraw (first show, resizing, zooming with the toolbar, etc)
+        # invalidates the cached background, so grab a new one
+        self._cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_artist(self, artist):
+        """
+        Register an artist that changes between frames. It gets left out of
+        the cached background and drawn by hand every update().
+        """
+        if self._enabled:
+            artist.set_animated(True)
+        self._artists.append(artist)
+
+    def add_artists(self, artists):
+        for a in artists:
+            self.add_artist(a)
+
+    def _on_draw(self, event):
+        """
+        Callback for draw_event; caches the static background
+        """
+        if not self._enabled:
+            return
+        fig = self._canvas.figure
+        self._background = self._canvas.copy_from_bbox(fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        fig = self._canvas.figure
+        for a in self._artists:
+            fig.draw_artist(a)
+
+    def update(self):
+        """
+        Draw a new frame
+        """
+        # Need a full draw to get a background in the first place
+        if not self._enabled or self._background is None:
+            with instrument.span("canvas.draw"):
+                self._canvas.draw()
+            instrument.frame_drawn()
+            return
+
+        with instrument.span("canvas.blit"):
+            fig = self._canvas.figure
+            self._canvas.restore_region(self._background)
+            self._draw_animated()
+            self._canvas.blit(fig.bbox)
+        instrument.frame_drawn()
@@ -0,0 +1,103 @@
+"""
+Memoized (products x segments x years) arrays that know what they depend on.
+
+Editing a product at year t only changes that product from year t onward,
+so only those entries of anything derived from it need redoing. Each Memo
+keeps track of which of its entries are still good; invalidate() marks
+some bad (and passes it on to whatever depends on them), and get() redoes
+only the bad ones the next time somebody asks.
+"""
+import numpy as np
+import instrument
+
+# How invalidating an entry of a Memo spreads to a Memo that depends on it
+SAME_ENTRY = 'same'             # Only the same (product, segment, year)
+ALL_PRODUCTS = 'all'            # Every product's entry for that (segment, year),
+                                # e.g. market share, which is split across products
+
+class Memo:
+    """
+    A lazily computed (products x segments x years) array
+    """
+    def __init__(self, name, compute, shape, inputs=()):
+        """
+        Parameters:
+            name        For instrumentation
+            compute     Called with (rows, segments, years) index arrays;
+                        returns those entries as a (rows x segments x years) array
+            shape       Called with no arguments; returns the current
+                        (products, segments, years). If it changes (e.g. a
+                        product was added), everything gets recomputed.
+            inputs      [(Memo, SAME_ENTRY or ALL_PRODUCTS)] this one is computed
+                        from, so it gets invalidated when they do
+        """
+        self.name = name
+        self._compute = compute
+        self._shape = shape
+        self._dependents = []
+
+        for memo, spread in inputs:
+            memo._dependents.append((self, spread))
+
+        self._value = np.zeros(shape())
+        self._valid = np.zeros(self._value.shape, dtype=bool)
+
+        # Number of entries computed so far (to see how much work is being saved)
+        self.computed = 0
+
+    def _check_shape(self):
+        shape = self._shape()
+        if shape != self._value.shape:
+            self._value = np.zeros(shape)
+            self._valid = np.zeros(shape, dtype=bool)
+        return shape
+
+    def invalidate(self, rows=None, segments=None, from_year=0):
+        """
+        Mark entries as needing a recompute, and pass it on to everything
+        computed from them. None means all rows/segments.
+        """
+        self._check_shape()
+        r = slice(None) if rows is None else np.atleast_1d(rows)
+        s = slice(None) if segments is None else np.atleast_1d(segments)
+        if rows is not None and segments is not None:
+            r, s = np.ix_(r, s)
+        self._valid[r, s, from_year:] = False
+
+        for memo, spread in self._dependents:
+            memo.invalidate(None if spread == ALL_PRODUCTS else rows, segments, from_year)
+
+    def is_valid(self):
+        return self._valid.all()
+
+    def get(self):
+        """
+        The whole array, after recomputing whatever isn't up to date.
+        Don't modify it.
+        """
+        shape = self._check_shape()
+        if self._valid.all():
+            return self._value
+
+        with instrument.span(f"memo.{self.name}"):
+            invalid = ~self._valid
+            num_years = shape[2]
+
+            # Edits invalidate from some year on, so the bad entries of a row
+            # are (nearly always) all the years after its first bad one.
+            # Rows that went bad at the same year get recomputed together.
+            bad_years = invalid.any(axis=1)
+            bad_rows = np.flatnonzero(bad_years.any(axis=1))
+            first = bad_years[bad_rows].argmax(axis=1)
+
+            for start in np.unique(first):
+                rows = bad_rows[first == start]
+                segments = np.flatnonzero(invalid[rows, :, start:].any(axis=(0, 2)))
+                years = np.arange(start, num_years)
+
+                index = np.ix_(rows, segments, years)
+                self._value[index] = self._compute(rows, segments, years)
+                self._valid[index] = True
+                self.computed += len(rows) * len(segments) * len(years)
+
+        return self._value
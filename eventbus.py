@@ -0,0 +1,106 @@
+from pubsub import pub
+import instrument
+
+class FrameBus:
+    """
+    Sits between the models and pypubsub. Changes posted during one UI tick
+    get merged (the latest change per product wins) and go out as a single
+    products_changed message, followed by a single redraw.
+
+    Without it, every product sends its own product_changed/{name} message
+    and its view redraws once per product.
+    """
+    TOPIC = "products_changed"
+
+    def __init__(self, schedule=None, redraw=None, topic=TOPIC):
+        """
+        Parameters:
+            schedule        Called with a function to run once the current UI
+                            tick is over (tkinter's after_idle). If None,
+                            nothing goes out until flush() is called.
+            redraw          Called once per delivered batch, after the
+                            views have been told about the changes
+            topic           Topic the batches go out on. Give each bus its own
+                            if there's more than one set of products around
+                            (e.g. two branches side by side).
+        """
+        self.topic = topic
+        self._schedule = schedule
+        self._redraw = redraw
+
+        # Product name => merged keyword arguments of its latest change
+        self._pending = {}
+        self._dirty = False
+        self._scheduled = False
+
+    def post(self, **change):
+        """
+        Queue a change to a product (same arguments as product_changed/{name})
+        """
+        merged = self._pending.setdefault(change['name'], {})
+
+        # A single stat change in the batch means it wasn't just a time change.
+        # Keep track of the earliest year a stat changed at, since later
+        # changes would otherwise hide it.
+        time_change = merged.get('time_change', True) and change.get('time_change', True)
+        if not change.get('time_change', True):
+            merged['changed_from'] = min(merged.get('changed_from', change['time']), change['time'])
+        merged.update(change)
+        merged['time_change'] = time_change
+
+        self.request_redraw()
+
+    def request_redraw(self):
+        """
+        Ask for a new frame even if no product changed (e.g. the segments moved)
+        """
+        self._dirty = True
+        if self._schedule is not None and not self._scheduled:
+            self._scheduled = True
+            self._schedule(self.flush)
+
+    @instrument.timed("bus.flush")
+    def flush(self):
+        """
+        Deliver everything queued so far as one batch
+        """
+        changes, self._pending = self._pending, {}
+        dirty, self._dirty = self._dirty, False
+        self._scheduled = False
+
+        if changes:
+            pub.sendMessage(self.topic, changes=changes)
+
+        if dirty and self._redraw is not None:
+            self._redraw()
+
+class ProductListener:
+    """
+    Mixin for models that need to know when products' stats change (just
+    moving through time doesn't count). Subclasses keep their ProductTable
+    in self._table and define product_changed(name, t), which gets the
+    earliest year that changed.
+    """
+    def listen(self, bus=None):
+        """
+        Start keeping up with the table's products, whether they report
+        through product_changed/{name} or a FrameBus.
+
+        Parameters:
+            bus     The FrameBus the products post to (see Product.set_bus),
+                    if any. Its topic is listened to, so it works for any
+                    figure's bus.
+        """
+        for name in self._table.names:
+            pub.subscribe(self._on_product_changed, f"product_changed/{name}")
+        if bus is not None:
+            pub.subscribe(self._on_products_changed, bus.topic)
+
+    def _on_product_changed(self, name, coords, age, time, time_change):
+        if not time_change:
+            self.product_changed(name, time)
+
+    def _on_products_changed(self, changes):
+        for name, change in changes.items():
+            if 'changed_from' in change and name in self._table:
+                self.product_changed(name, change['changed_from'])
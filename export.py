@@ -0,0 +1,142 @@
+"""
+Render the perceptual map over the whole plan, offscreen, into a GIF or a
+folder of PNG frames (e.g. for a planning deck).
+
+Usage:
+    python export.py scenario.json -o plan.gif --steps-per-year 20 -j 8
+    python export.py -o frames/                 (the default scenario, as PNGs)
+
+Frames are split across worker processes. Each worker builds its own
+PerceptualMapFigure (the same one the GUI uses) once and renders its share
+of the frames with it. Only the things that move get redrawn each frame;
+the axes and grid are drawn once per worker (see blit.py).
+
+With more than one step per year, the segments drift smoothly between
+years, but products stay put until their next yearly revision (they're
+never shown at stats they didn't have).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from multiprocessing import Pool
+import numpy as np
+
+import scenario
+
+# Each worker's figure
+_figure = None
+
+def frame_times(num_years, steps_per_year=1):
+    """
+    Time of every frame, from year 0 through the last year
+    """
+    return np.arange((num_years - 1) * steps_per_year + 1) / steps_per_year
+
+def _init_worker(scenario_dict, heatmap, dpi):
+    global _figure
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from fontcache import init
+    from perceptualmap import PerceptualMapFigure
+
+    init()
+    _, _, market_segments, products, _ = scenario.from_dict(scenario_dict)
+    _figure = PerceptualMapFigure(market_segments, products, FigureCanvasAgg,
+                                  editable=False)
+    _figure.heatmap.set_visible(heatmap)
+
+    # Changing the dpi means a new background has to be cached
+    _figure.figure.set_dpi(dpi)
+    _figure.canvas.draw()
+
+def _render_frame(job):
+    """
+    Draw the frame at time t and save it as a PNG
+    """
+    from PIL import Image
+
+    t, path = job
+    _figure.show_time(t)
+    pixels = np.asarray(_figure.canvas.buffer_rgba())
+    Image.fromarray(pixels[..., :3]).save(path, compress_level=1)
+    return path
+
+def render_frames(scenario_dict, directory, steps_per_year=1, heatmap=False, dpi=100,
+                  processes=None, chunksize=4):
+    """
+    Render every frame of a scenario (given as a dict; see scenario.py) to
+    frame_0000.png, frame_0001.png, ... in directory.
+
+    Returns the paths of the frames, in order
+    """
+    os.makedirs(directory, exist_ok=True)
+    times = frame_times(scenario_dict['num_years'], steps_per_year)
+    paths = [os.path.join(directory, f"frame_{i:04d}.png") for i in range(len(times))]
+
+    with Pool(processes, initializer=_init_worker,
+              initargs=(scenario_dict, heatmap, dpi)) as pool:
+        for _ in pool.imap_unordered(_render_frame, zip(times, paths), chunksize):
+            pass
+
+    return paths
+
+def assemble_gif(paths, output, fps=20):
+    """
+    Stitch PNG frames into a looping GIF. Every frame uses the first
+    frame's palette, so colors don't flicker.
+    """
+    from PIL import Image
+
+    first = Image.open(paths[0]).convert("RGB").quantize(colors=256)
+    frames = [Image.open(p).convert("RGB").quantize(palette=first) for p in paths[1:]]
+    first.save(output, save_all=True, append_images=frames,
+               duration=int(1000 / fps), loop=0, optimize=False)
+
+def export(scenario_dict, output, steps_per_year=1, fps=20, **kwargs):
+    """
+    Render a scenario to output: a GIF if it ends in .gif, otherwise a folder of PNGs.
+    Takes the same keyword arguments as render_frames.
+
+    Returns the number of frames
+    """
+    if not output.lower().endswith(".gif"):
+        return len(render_frames(scenario_dict, output, steps_per_year, **kwargs))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = render_frames(scenario_dict, directory, steps_per_year, **kwargs)
+        assemble_gif(paths, output, fps)
+    return len(paths)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the perceptual map over a whole plan")
+    parser.add_argument('scenario', nargs='?',
+                        help="scenario .json file (defaults to our current round)")
+    parser.add_argument('-o', '--output', default='plan.gif',
+                        help="a .gif, or a folder to put PNG frames in")
+    parser.add_argument('--years', type=int, default=10,
+                        help="number of years (only for the default scenario)")
+    parser.add_argument('--steps-per-year', type=int, default=1,
+                        help="frames per year; more makes a smoother animation")
+    parser.add_argument('--fps', type=float, default=20, help="GIF frame rate")
+    parser.add_argument('--heatmap', action='store_true', help="show positioning scores")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('-j', '--processes', type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        with open(args.scenario) as f:
+            d = json.load(f)
+    else:
+        d = scenario.to_dict("default", args.years, scenario.default_market_segments(),
+                             scenario.default_products(args.years))
+
+    count = export(d, args.output, args.steps_per_year, args.fps, heatmap=args.heatmap,
+                   dpi=args.dpi, processes=args.processes)
+    print(f"Rendered {count} frames to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
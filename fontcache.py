@@ -0,0 +1,107 @@
+"""
+Registering fonts with matplotlib means opening and parsing every font
+file, every launch. This remembers what matplotlib found in each file
+(keyed on the file's modification time) so later launches can skip that.
+
+That leans on some of font_manager's internals (FontEntry, ttflist, the
+findfont cache), so if any of it doesn't work with the installed
+matplotlib, fonts get registered the normal way with addfont() instead.
+Slower, but it still starts.
+
+init() sets up matplotlib the way every part of the app draws (fonts and
+sizes). It doesn't touch Tk, so headless code (export.py, benchmarks) uses
+it too.
+"""
+import dataclasses
+import json
+import os
+
+CACHE_NAME = "marketpredictor-fonts.json"
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+def _cache_path():
+    import matplotlib
+    return os.path.join(matplotlib.get_cachedir(), CACHE_NAME)
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _entries(font_files, cache):
+    """
+    Returns ([FontEntry] for every font file, what to cache for next time)
+    """
+    from matplotlib import font_manager
+
+    entries = []
+    fresh = {}
+    for path in font_files:
+        mtime = os.path.getmtime(path)
+        cached = cache.get(path)
+
+        if cached is not None and cached['mtime'] == mtime:
+            entry = font_manager.FontEntry(**cached['entry'])
+        else:
+            # Same thing FontManager.addfont does, minus adding it
+            entry = font_manager.ttfFontProperty(font_manager.ft2font.FT2Font(path))
+
+        entries.append(entry)
+        fresh[path] = {'mtime': mtime, 'entry': dataclasses.asdict(entry)}
+    return entries, fresh
+
+def register_fonts(font_dir, cache_path=None):
+    """
+    Make every .ttf/.otf font in font_dir available to matplotlib.
+    Returns the names of the registered fonts.
+    """
+    from matplotlib import font_manager
+
+    if cache_path is None:
+        cache_path = _cache_path()
+    cache = _load(cache_path)
+
+    font_files = sorted(os.path.abspath(os.path.join(font_dir, f)) for f in os.listdir(font_dir)
+                        if f.lower().endswith(('.ttf', '.otf')))
+
+    # Nothing gets added until everything's worked out, so falling back can't
+    # leave fonts registered twice
+    try:
+        entries, fresh = _entries(font_files, cache)
+        clear_findfont_cache = font_manager.fontManager._findfont_cached.cache_clear
+    except Exception:
+        for path in font_files:
+            font_manager.fontManager.addfont(path)
+        return [font_manager.FontProperties(fname=path).get_name() for path in font_files]
+
+    font_manager.fontManager.ttflist.extend(entries)
+
+    # findfont caches its answers; they may have changed
+    clear_findfont_cache()
+
+    if fresh != cache:
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump(fresh, f)
+        except OSError:
+            pass    # Not being able to cache shouldn't stop the program
+
+    return [entry.name for entry in entries]
+
+def init():
+    """
+    Does some initializations, like font stuff
+    """
+    import matplotlib
+
+    # Change plot font
+    matplotlib.rcParams["font.family"] = "sans-serif"
+    matplotlib.rcParams["font.size"] = 15
+
+    # Fonts are only parsed the first time (or after they change)
+    register_fonts(FONT_DIR)
+
+    matplotlib.rcParams["font.sans-serif"] = "Raleway"
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import numpy as np
+from surveyscore.score import positioning_score
+import instrument
+
+class RasterCache:
+    """
+    Least-recently-used cache of numpy arrays that stays under a memory cap
+    """
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the cached value, or None if it isn't there
+        """
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, nbytes):
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (value, nbytes)
+        self._bytes += nbytes
+
+        # Throw out the oldest stuff until we fit again
+        while self._bytes > self._max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def _evict(self, key):
+        _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+
+def _rasters(grid, segments):
+    """
+    Positioning score of every pixel for some segments. Runs on worker
+    threads, so it only gets plain arrays.
+
+    Parameters:
+        grid            (rows x columns x 2) grid of (performance, size) points
+        segments        [(centroid, offset)] of each segment
+    """
+    return [positioning_score(centroid, offset, grid).astype(np.float32)
+            for centroid, offset in segments]
+
+class PositioningHeatmap:
+    """
+    Draws the segments' positioning scores over the whole perceptual map
+    as an image behind everything else. Where segments overlap, the
+    better score wins.
+    """
+    def __init__(self, ax, market_segments, resolution=200, extent=(0, 20, 0, 20),
+                 max_bytes=64 * 2**20, cmap='Greens', alpha=0.5, executor=None, on_ready=None):
+        """
+        Parameters:
+            ax                  The axis on which this stuff will be drawn
+            market_segments     A list of MarketSegment objects
+            resolution          Pixels along each side of the raster
+            extent              (left, right, bottom, top) of the raster
+            max_bytes           Memory cap of the raster cache
+            cmap, alpha         How the scores get colored
+            executor            A ComputeExecutor (see worker.py) to compute rasters
+                                on. If None, they're computed right away.
+            on_ready            Called when rasters computed on the executor
+                                have been put up (to redraw)
+        """
+        self._market_segments = market_segments
+        self._executor = executor
+        self._on_ready = on_ready
+
+        # Grid of (performance, size) points, one per pixel
+        left, right, bottom, top = extent
+        xs = np.linspace(left, right, resolution, dtype=np.float32)
+        ys = np.linspace(bottom, top, resolution, dtype=np.float32)
+        self._grid = np.stack(np.meshgrid(xs, ys), axis=-1)
+
+        # (segment, year) => (trajectory it was computed from, raster)
+        self._cache = RasterCache(max_bytes)
+
+        self._image = ax.imshow(np.zeros((resolution, resolution), dtype=np.float32),
+                extent=extent, origin='lower', cmap=cmap, alpha=alpha,
+                vmin=0, vmax=1, aspect='auto', zorder=0, interpolation='bilinear')
+        self._image.set_visible(False)
+
+        # Year currently shown
+        self._t = 0
+
+    def artists(self):
+        return [self._image]
+
+    def _cached(self, ms, t):
+        """
+        Cached raster of one segment at year t, or None
+        """
+        cached = self._cache.get((id(ms), t))
+
+        # A segment's trajectory gets rebuilt when it's edited, so a raster
+        # computed from an old trajectory is stale
+        if cached is not None and cached[0] is ms.trajectory:
+            return cached[1]
+        return None
+
+    def _store(self, ms, t, trajectory, raster):
+        self._cache.put((id(ms), t), (trajectory, raster), raster.nbytes)
+
+    def _raster(self, ms, t):
+        """
+        Positioning score of every pixel for one segment at year t
+        """
+        raster = self._cached(ms, t)
+        if raster is not None:
+            return raster
+
+        with instrument.span("heatmap.raster"):
+            trajectory = ms.trajectory
+            raster, = _rasters(self._grid, [(trajectory.location(t), ms._offset)])
+        self._store(ms, t, trajectory, raster)
+        return raster
+
+    def set_visible(self, visible):
+        """
+        Show or hide the overlay (it gets brought up to date when shown)
+        """
+        self._image.set_visible(visible)
+        if visible:
+            self.update(self._t)
+
+    def get_visible(self):
+        return self._image.get_visible()
+
+    def update(self, t):
+        """
+        Show the scores at year t (skipped while the overlay is hidden).
+        With an executor, rasters that aren't cached yet are computed in the
+        background and shown when they're ready.
+        """
+        self._t = t
+        if not self._image.get_visible():
+            return
+
+        missing = [ms for ms in self._market_segments if self._cached(ms, t) is None]
+        if self._executor is None or not missing:
+            self._show([self._raster(ms, t) for ms in self._market_segments])
+            return
+
+        # Trajectories get built lazily, so look them up here on the main thread
+        trajectories = [ms.trajectory for ms in missing]
+        segments = [(tr.location(t), ms._offset) for ms, tr in zip(missing, trajectories)]
+
+        def done(rasters):
+            for ms, trajectory, raster in zip(missing, trajectories, rasters):
+                self._store(ms, t, trajectory, raster)
+            if self._t == t and self._image.get_visible():
+                self._show([self._raster(ms, t) for ms in self._market_segments])
+                if self._on_ready is not None:
+                    self._on_ready()
+
+        self._executor.submit(f"heatmap{id(self)}", _rasters, self._grid, segments, on_done=done)
+
+    def _show(self, rasters):
+        # Masked pixels are see-through, so the grid shows outside the segments
+        self._image.set_data(np.ma.masked_equal(np.maximum.reduce(rasters), 0))
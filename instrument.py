@@ -0,0 +1,252 @@
+"""
+Counts and times what the program spends its time on: pubsub messages
+(per topic), canvas draws, and model/score recomputations. Also measures
+how long each user interaction (moving the slider, editing a product)
+takes to show up on screen.
+
+It's off by default, and costs next to nothing while off. Turn it on
+with enable() (F12 in the GUI, or set MARKETPREDICTOR_PROFILE), then:
+ - report() gives a table of counts and times
+ - dump_collapsed(path) writes a profile flamegraph.pl/speedscope can read
+ - latency_histogram() buckets the interaction latencies
+"""
+import functools
+import threading
+import time
+from collections import defaultdict
+from pubsub import pub
+
+# Topics that mean the user did something (an interaction lasts until the next frame)
+INTERACTION_TOPICS = ('changing_time', 'product_changing')
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS = (1, 2, 4, 8, 16, 33, 50, 100, 200, 500, 1000, float('inf'))
+
+_enabled = False
+
+# name => [number of calls, total seconds]
+_stats = defaultdict(lambda: [0, 0.0])
+
+# ';'-joined stack of span names => seconds spent in it (not counting children)
+_collapsed = defaultdict(float)
+
+# Spans that haven't finished yet, per thread (spans also run on worker
+# threads; see worker.py): [name, start time, time spent in children]
+_local = threading.local()
+
+# Bumped by reset()/disable() so every thread drops its unfinished spans,
+# not just the one that called it
+_generation = 0
+
+# Held while adding to _stats/_collapsed, since spans end on several threads
+_lock = threading.Lock()
+
+_interaction_start = None
+_latencies = []
+
+class _Span:
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        _push(self._name)
+        return self
+
+    def __exit__(self, *exc):
+        _pop(self._name)
+        return False
+
+class _NoSpan:
+    """
+    What span() hands out while instrumentation is off
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def _stack():
+    """
+    This thread's unfinished spans
+    """
+    if getattr(_local, 'generation', None) != _generation:
+        _local.generation = _generation
+        _local.stack = []
+    return _local.stack
+
+def _push(name):
+    _stack().append([name, time.perf_counter(), 0.0])
+
+def _pop(name):
+    end = time.perf_counter()
+    stack = _stack()
+
+    # Something that raised might have skipped its own _pop; unwind to our span
+    while stack and stack[-1][0] != name:
+        stack.pop()
+    if not stack:
+        return
+
+    path = ';'.join(s[0] for s in stack)
+    _, start, children = stack.pop()
+    elapsed = end - start
+
+    with _lock:
+        stat = _stats[name]
+        stat[0] += 1
+        stat[1] += elapsed
+        _collapsed[path] += elapsed - children
+    if stack:
+        stack[-1][2] += elapsed
+
+def span(name):
+    """
+    Context manager that times the code inside it:
+        with instrument.span("canvas.draw"):
+            canvas.draw()
+    """
+    return _Span(name) if _enabled else _NO_SPAN
+
+def timed(name):
+    """
+    Decorator that times every call of a function
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            _push(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _pop(name)
+        return wrapper
+    return decorator
+
+def count(name):
+    """
+    Count something that isn't worth timing
+    """
+    if _enabled:
+        with _lock:
+            _stats[name][0] += 1
+
+def frame_drawn():
+    """
+    Called whenever a frame makes it to the screen; ends the current interaction
+    """
+    global _interaction_start
+    if _enabled and _interaction_start is not None:
+        _latencies.append(time.perf_counter() - _interaction_start)
+        _interaction_start = None
+
+class _PubsubTimer:
+    """
+    pypubsub notification handler that times each sendMessage
+    """
+    def notifySend(self, stage, topicObj, pubListener=None):
+        global _interaction_start
+        name = topicObj.getName()
+        if stage == 'pre':
+            if name in INTERACTION_TOPICS and _interaction_start is None:
+                _interaction_start = time.perf_counter()
+            _push(f"pubsub:{name}")
+        elif stage == 'post':
+            _pop(f"pubsub:{name}")
+
+    # Not interested in any of these
+    def notifySubscribe(self, *args, **kwargs): pass
+    def notifyUnsubscribe(self, *args, **kwargs): pass
+    def notifyDeadListener(self, *args, **kwargs): pass
+    def notifyNewTopic(self, *args, **kwargs): pass
+    def notifyDelTopic(self, *args, **kwargs): pass
+
+_pubsub_timer = None
+
+def enable():
+    global _enabled, _pubsub_timer
+    if _pubsub_timer is None:
+        _pubsub_timer = _PubsubTimer()
+        pub.addNotificationHandler(_pubsub_timer)
+    pub.setNotificationFlags(sendMessage=True)
+    _enabled = True
+
+def disable():
+    global _enabled, _generation
+    pub.setNotificationFlags(sendMessage=False)
+    _enabled = False
+    _generation += 1
+
+def is_enabled():
+    return _enabled
+
+def toggle():
+    """
+    Turn instrumentation on or off; returns whether it's on now
+    """
+    if _enabled:
+        disable()
+    else:
+        enable()
+    return _enabled
+
+def reset():
+    """
+    Forget everything measured so far
+    """
+    global _interaction_start, _generation
+    with _lock:
+        _stats.clear()
+        _collapsed.clear()
+    _generation += 1
+    _latencies.clear()
+    _interaction_start = None
+
+def stats():
+    """
+    Returns {name: (calls, total seconds)}
+    """
+    return {k: tuple(v) for k, v in _stats.items()}
+
+def latency_histogram():
+    """
+    Returns [(bucket upper bound in ms, number of interactions)]
+    """
+    counts = [0] * len(LATENCY_BUCKETS)
+    for latency in _latencies:
+        ms = latency * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if ms <= bound:
+                counts[i] += 1
+                break
+    return list(zip(LATENCY_BUCKETS, counts))
+
+def dump_collapsed(path):
+    """
+    Write the profile in the "collapsed stack" format used by flamegraph.pl
+    (and speedscope): one line per stack, weighted in microseconds
+    """
+    with open(path, 'w') as f:
+        for stack, seconds in sorted(_collapsed.items()):
+            f.write(f"{stack} {max(int(seconds * 1e6), 0)}\n")
+
+def report():
+    """
+    Returns a human-readable summary as a string
+    """
+    lines = [f"{'name':<40} {'calls':>8} {'total ms':>10} {'mean ms':>9}"]
+    for name, (calls, total) in sorted(_stats.items(), key=lambda kv: -kv[1][1]):
+        mean = total / calls * 1000 if calls else 0
+        lines.append(f"{name:<40} {calls:>8} {total * 1000:>10.1f} {mean:>9.3f}")
+
+    if _latencies:
+        lines.append("")
+        lines.append(f"interaction latency ({len(_latencies)} interactions)")
+        for bound, n in latency_histogram():
+            label = f"<= {bound:g} ms" if bound != float('inf') else "slower"
+            lines.append(f"  {label:>12} {n:>6} {'#' * n if n < 60 else '#' * 60 + '...'}")
+    return "\n".join(lines)
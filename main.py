@@ -1,17 +1,25 @@
 
-from marketsegment import MarketSegment, MarketSegmentPlot, Age, Price, Position, MTBF, BuyingCriteria
-from product.model import Product
-from product.controller import ProductController
-
-import matplotlib
-matplotlib.use("TkAGG")
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+import time
+START_TIME = time.perf_counter()
+
+import json
+import os
 import tkinter as tk
 from tkinter import ttk
-import numpy as np
-from pubsub import pub
+import instrument
+
+# NOTE matplotlib (and everything that draws with it) is slow to import, so it
+#      gets imported when the perceptual map is built, after the window shows up
+
+# Set this to get startup times printed (as JSON) and the window closed right
+# after the map is drawn the first time (see benchmarks/startup.py)
+STARTUP_BENCHMARK = "MARKETPREDICTOR_STARTUP_BENCHMARK" in os.environ
+
+# Set this to start with instrumentation on (F12 toggles it; see instrument.py)
+PROFILE = "MARKETPREDICTOR_PROFILE" in os.environ
+
+# Where the profile goes when instrumentation gets turned off
+PROFILE_PATH = "marketpredictor.folded"
 
 
 
@@ -24,38 +32,43 @@ class PerceptualMap(tk.Frame):
         A lot of this code was taken from a tutorial and can likely
         be improved
     """
-    def __init__(self, parent, controller, num_years, market_segments, products):
+    def __init__(self, parent, controller, num_years, market_segments, products, blit=True):
+        """
+        Set blit to False to redraw the whole canvas every frame (slow, but
+        handy when debugging drawing issues)
+        """
         tk.Frame.__init__(self, parent)
 
-        # The actual graph
-        f = Figure(figsize=(5,5), dpi=100)
-        ax = f.add_subplot(111)
-        ax.set_title("Perceptual Map Predictor", fontsize=30)
-        ax.set_xlim(0,20)       # Set graph limits
-        ax.xaxis.set_ticks(np.arange(0, 20, 2.0))
-        ax.set_ylim(0,20)
-        ax.yaxis.set_ticks(np.arange(0, 20, 2.0))
-
-        # Add line going through 3 ideal points
-        # y = m*(x - x0) + y0
-        x0,y0 = 2.5-0.8, 17.5+0.8
-        x1,y1 = 7.5+1.4, 12.5-1.4
-        m = (y1-y0)/(x1-x0)
-        lin, = ax.plot([0, y0-m*x0], [x0-y0/m, 0])
-
-        # TODO Add line going through initial size segment and in-between ideal
-
-        # Grid line
-        ax.minorticks_on()
-        ax.grid(b=True, which='minor')
-        ax.grid(b=True, which='major', color='black')
-
-        # Use MarketSegmentPlot objects to draw each market segment
-        market_segment_plots = [MarketSegmentPlot(f, ax, ms) for ms in market_segments]
-
-        # Hooks the graph up to the window somehow
-        canvas = FigureCanvasTkAgg(f, self)
-        canvas.draw()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from perceptualmap import PerceptualMapFigure
+        from product.model import Product
+        from worker import ComputeExecutor
+
+        # Heavy stuff (heatmap rasters, frontiers) runs here so it doesn't freeze the window
+        self.executor = ComputeExecutor(self.after)
+
+        self._market_segments = market_segments
+        self._blit = blit
+        self._year = 0
+
+        # Newest year the slider was dragged to, waiting for the main loop to go idle
+        self._slider_year = None
+
+        # Every plan being considered is a branch of the starting products
+        # (see product/branch.py), so they only store what's different
+        root = products[0]._table
+        self._branches = {}
+        self._add_branch([Product.view(root.branch(), p._name) for p in products])
+        self._branch_name = next(iter(self._branches))
+
+        # Figures showing other branches next to this one
+        self._comparisons = []
+
+        # The actual graph (hooked up to the window somehow)
+        self._map = PerceptualMapFigure(market_segments, self._branches[self._branch_name],
+                lambda f: FigureCanvasTkAgg(f, self), parent=self,
+                schedule=self.after_idle, blit=blit, executor=self.executor)
+        canvas = self.canvas = self._map.canvas
         canvas.get_tk_widget().pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
 
         # Allows the user to move around the graph
@@ -68,27 +81,137 @@ class PerceptualMap(tk.Frame):
         # Allows the user to choose the point in time
         time_slider = tk.Scale(self,
                 from_=0, to=num_years-1, resolution=1, orient=tk.HORIZONTAL,
-                command=lambda t: self.update_time(int(t), canvas, market_segment_plots),
+                command=self._on_slider,
                 length=300)
 
         # Put the slider onto the window
         time_slider.pack()
 
-        # This thing deals with products
-        self._pg = ProductController(ax, canvas, products, self)
+        # Toggles the positioning score overlay
+        show_heatmap = tk.BooleanVar(value=False)
+        heatmap_toggle = tk.Checkbutton(self, text="Show positioning scores",
+                variable=show_heatmap,
+                command=lambda: self._map.show_heatmap(show_heatmap.get()))
+        heatmap_toggle.pack()
+
+        # Pick, make, and compare branches
+        branch_row = tk.Frame(self)
+        self._branch_picker = ttk.Combobox(branch_row, state="readonly",
+                values=list(self._branches), width=12)
+        self._branch_picker.set(self._branch_name)
+        self._branch_picker.bind("<<ComboboxSelected>>",
+                lambda _: self.switch_branch(self._branch_picker.get()))
+        self._branch_picker.pack(side=tk.LEFT)
+        tk.Button(branch_row, text="New branch", command=self.new_branch).pack(side=tk.LEFT)
+        tk.Button(branch_row, text="Compare", command=self.compare_branch).pack(side=tk.LEFT)
+        branch_row.pack()
+
+        # Pareto frontier of one product across the picked segments (the two nearest if none are picked)
+        frontier_row = tk.Frame(self)
+        tk.Label(frontier_row, text="Trade-offs for").pack(side=tk.LEFT)
+        self._frontier_product = ttk.Combobox(frontier_row, state="readonly",
+                values=["(none)"] + [p._name for p in products], width=10)
+        self._frontier_product.set("(none)")
+        self._frontier_product.bind("<<ComboboxSelected>>", lambda _: self.show_frontier())
+        self._frontier_product.pack(side=tk.LEFT)
+        self._frontier_segments = tk.Listbox(frontier_row, selectmode=tk.MULTIPLE,
+                height=len(market_segments), exportselection=False)
+        for ms in market_segments:
+            self._frontier_segments.insert(tk.END, ms._name)
+        self._frontier_segments.bind("<<ListboxSelect>>", lambda _: self.show_frontier())
+        self._frontier_segments.pack(side=tk.LEFT)
+        frontier_row.pack()
+
+    def _on_slider(self, t):
+        """
+        Dragging calls this for every year passed over. Only the newest year
+        is kept, and it gets drawn once the main loop is idle (same idea as
+        FrameBus), so a fast drag doesn't queue up a frame per year.
+        """
+        if self._slider_year is None:
+            self.after_idle(self._apply_slider)
+        self._slider_year = int(t)
 
-        
-    def update_time(self, t, canvas, market_segment_plots):
+    def _apply_slider(self):
+        """
+        Draw the newest year the slider was dragged to
+        """
+        t, self._slider_year = self._slider_year, None
+        self.update_time(t)
+
+    def update_time(self, t):
         """
         Draw the market segments to the graph
         """
-        # TODO Listen to event instead
-        for msp in market_segment_plots:
-            msp.update(t)
-        
-        pub.sendMessage("changing_time", time=t)
+        self._year = t
+        self._map.update_time(t)
+
+    def show_frontier(self):
+        """
+        Draw the picked product's Pareto frontier across the picked segments
+        """
+        name = self._frontier_product.get()
+        segments = list(self._frontier_segments.curselection()) or None
+        self._map.show_frontier(None if name == "(none)" else name, segments)
 
-        canvas.draw()
+    def _add_branch(self, products):
+        name = f"Plan {len(self._branches) + 1}"
+        self._branches[name] = products
+        return name
+
+    def switch_branch(self, name):
+        """
+        Show and edit a different branch
+        """
+        self._branch_name = name
+        self._branch_picker.set(name)
+        self._map.show_products(self._branches[name])
+
+    def new_branch(self):
+        """
+        Branch off of the current branch and switch to it
+        """
+        from product.model import Product
+
+        table = self._branches[self._branch_name][0]._table.branch()
+        name = self._add_branch([Product.view(table, n) for n in table.names])
+        self._branch_picker.configure(values=list(self._branches))
+        self.switch_branch(name)
+
+    def compare_branch(self):
+        """
+        Open a snapshot of the current branch in its own window, so it stays
+        up while branches (this one included) get edited. It follows the time
+        slider but can't be edited.
+        """
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from perceptualmap import PerceptualMapFigure
+        from eventbus import FrameBus
+        from product.model import Product
+
+        name = self._branch_name
+        window = tk.Toplevel(self)
+        window.wm_title(name)
+
+        # A snapshot, branched off so it has data of its own. Sharing the
+        # branch would let edits change it without this figure's bus hearing
+        # about them (a product only reports to one bus).
+        table = self._branches[name][0]._table.branch()
+        products = [Product.view(table, n) for n in table.names]
+        figure = PerceptualMapFigure(self._market_segments, products,
+                lambda f: FigureCanvasTkAgg(f, window), schedule=window.after_idle,
+                blit=self._blit, editable=False, executor=self.executor,
+                topic=f"{FrameBus.TOPIC}_compare{len(self._comparisons)}")
+        figure.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._comparisons.append(figure)
+
+        def close():
+            self._comparisons.remove(figure)
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close)
+
+        # Catch it up to the current year
+        self.update_time(self._year)
 
     
 class Window(tk.Tk):
@@ -111,87 +234,84 @@ class Window(tk.Tk):
         container.grid_rowconfigure(0, weight=1)
         container.grid_columnconfigure(0, weight=1)
 
+        # Seconds from launch until things showed up
+        self.startup_times = {}
+
+        # Put something up right away; the perceptual map takes a while
+        self._loading = tk.Label(container, text="Loading...", font=("Avant Garde", 14))
+        self._loading.grid(row=0, column=0, sticky="nsew")
+
+        # Draw the perceptual map once the window is up
+        self._map_args = (container, self, num_years, market_segments, products)
+        self.bind("<Map>", self._on_map)
+
+        # F12 turns instrumentation on and off
+        if PROFILE:
+            instrument.enable()
+        self.bind("<F12>", self._toggle_instrumentation)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _toggle_instrumentation(self, _=None):
+        """
+        Turning instrumentation off prints what it measured and saves the profile
+        """
+        if instrument.toggle():
+            instrument.reset()
+            print("Instrumentation on (F12 to stop)")
+        else:
+            print(instrument.report())
+            instrument.dump_collapsed(PROFILE_PATH)
+            print(f"Saved profile to {PROFILE_PATH}")
+
+    def _on_close(self):
+        if instrument.is_enabled():
+            self._toggle_instrumentation()
+        if hasattr(self, "frame"):
+            self.frame.executor.shutdown()
+        self.destroy()
+
+    def _on_map(self, event):
+        """
+        Callback for when the window first shows up
+        """
+        if event.widget is not self or "first_frame" in self.startup_times:
+            return
+        self.startup_times["first_frame"] = time.perf_counter() - START_TIME
+
+        # Give Tk a chance to actually paint the loading screen first
+        self.after_idle(self._build_map)
+
+    def _build_map(self):
+        from fontcache import init
+        init()
+
         # Draw the perceptual map
-        self.frame = PerceptualMap(container, self, num_years, market_segments, products)
+        self.frame = PerceptualMap(*self._map_args)
         self.frame.grid(row=0, column=0, sticky="nsew") # Something important
+        self._loading.destroy()
 
-def init():
-    """
-    Does some initializations, like font stuff
-    """
-    # Change plot font
-    plt.rcParams["font.family"] = "sans-serif"
-    plt.rcParams["font.size"] = 15
-    font_files = matplotlib.font_manager.findSystemFonts(fontpaths=r"./fonts/")
+        self.update_idletasks()
+        self.startup_times["map"] = time.perf_counter() - START_TIME
 
-    for font_file in font_files:
-        matplotlib.font_manager.fontManager.addfont(font_file)
+        if STARTUP_BENCHMARK:
+            # Let the deferred stuff (like the product input boxes) finish too
+            self.after_idle(self._finish_benchmark)
 
-    plt.rcParams["font.sans-serif"] = "Raleway"
+    def _finish_benchmark(self):
+        self.update_idletasks()
+        self.startup_times["ready"] = time.perf_counter() - START_TIME
+        print(json.dumps(self.startup_times), flush=True)
+        self.destroy()
 
 if __name__ == "__main__":
-    # Does initializations
-    init()
+    from scenario import default_market_segments, default_products
 
     # Constants
     NUM_YEARS = 10
 
-    # TODO Not sure about stdev; I'm setting to 1 for now,
-    #      but they should be higher
-    # Fill in customer criteria
-    traditional_criteria = BuyingCriteria(
-            age=Age(mean=2, stdev=1, importance=0.47),
-            price=Price(low=20, high=30, importance=0.23),
-            position=Position(importance=0.21),
-            mtbf = MTBF(low=14000, high=19000, importance=0.09))
-    low_end_criteria = BuyingCriteria(
-            price=Price(low=15, high=25, importance=0.53),
-            age=Age(mean=7, stdev=1, importance=0.24),
-            position=Position(importance=0.16),
-            mtbf = MTBF(low=12000, high=17000, importance=0.07))
-    high_end_criteria = BuyingCriteria(
-            position=Position(importance=0.43),
-            age=Age(mean=0, stdev=1, importance=0.29),
-            mtbf = MTBF(low=20000, high=25000, importance=0.19),
-            price=Price(low=30, high=40, importance=0.09))
-    performance_criteria = BuyingCriteria(
-            mtbf = MTBF(low=22000, high=27000, importance=0.43),
-            position=Position(importance=0.29),
-            price=Price(low=25, high=35, importance=0.19),
-            age=Age(mean=1, stdev=1, importance=0.09))
-    size_criteria = BuyingCriteria(
-            position=Position(importance=0.43),
-            age=Age(mean=1.5, stdev=1, importance=0.29),
-            mtbf = MTBF(low=16000, high=21000, importance=0.19),
-            price=Price(low=25, high=35, importance=0.09))
-
-    # Create segments
-    traditional = MarketSegment(
-            starting_point=(5, 15), offset=(0, 0), drift=(0.7, -0.7),
-            customer_criteria=traditional_criteria, name="Traditional")
-    low_end = MarketSegment(
-            starting_point=(2.5, 17.5), offset=(-0.8, 0.8), drift=(0.5, -0.5),
-            customer_criteria=low_end_criteria, name="Low End")
-    performance = MarketSegment(
-            starting_point=(8, 17), offset=(1.4, -1.0), drift=(1.0, -0.7),
-            customer_criteria=performance_criteria, name="Performance")
-    high_end = MarketSegment(
-            starting_point=(7.5, 12.5), offset=(1.4, -1.4), drift=(0.9, -0.9),
-            customer_criteria=high_end_criteria, name="High End")
-    size = MarketSegment(
-            starting_point=(3, 12), offset=(1.0, -1.4), drift=(0.7, -1.0),
-            customer_criteria=size_criteria, name="Size")
-
-    market_segments = [low_end, traditional, high_end, performance, size]
-
-    # Create products
-    cake = Product("Cake", performance=5.6, size=14.5, mtbf=17500, year=0, num_years=NUM_YEARS)
-    cedar = Product("Cedar", performance=3.0, size=17.0, mtbf=14000, year=0, num_years=NUM_YEARS)
-    cid = Product("Cid", performance=8.0, size=11.9, mtbf=23000, year=0, num_years=NUM_YEARS)
-    coat = Product("Coat", performance=7.4, size=13.2, mtbf=26000, year=0, num_years=NUM_YEARS)
-    cure = Product("Cure", performance=6.4, size=10.2, mtbf=20400, year=0, num_years=NUM_YEARS)
-
-    products = [cake, cedar, cid, coat, cure]
+    # Segments and products from our current round
+    market_segments = default_market_segments()
+    products = default_products(NUM_YEARS)
     
     # GUI code
     app = Window(NUM_YEARS, market_segments, products)
@@ -1,7 +1,7 @@
 
-import matplotlib.pyplot as plt
+import numpy as np
+import instrument
 from collections import namedtuple
-from matplotlib.transforms import Affine2D, ScaledTranslation, offset_copy
 
 Age = namedtuple('Age', ['mean', 'stdev', 'importance'])
 Price = namedtuple('Price', ['low', 'high', 'importance'])
@@ -9,6 +9,83 @@ Position = namedtuple('Position', ['importance'])
 MTBF = namedtuple('MTBF', ['low', 'high', 'importance'])
 BuyingCriteria = namedtuple('BuyingCriteria', ['age', 'price', 'position', 'mtbf'])
 
+class SegmentTrajectory:
+    """
+    Precomputed centroid, ideal spot, and price band of a MarketSegment
+    for every step of the simulation, so lookups don't redo the math.
+
+    Everything a segment does is linear in t, so fractional times are
+    interpolated exactly from the two neighbouring steps.
+    """
+    def __init__(self, segment, horizon=10, steps_per_year=4):
+        """
+        Parameters:
+            segment             The MarketSegment to precompute
+            horizon             How many years to precompute up front. Asking
+                                for a time past this grows the table.
+            steps_per_year      How many rows per year (4 gives quarters)
+        """
+        self._segment = segment
+        self._steps_per_year = steps_per_year
+        self._build(horizon)
+
+    @instrument.timed("segment.build_trajectory")
+    def _build(self, horizon):
+        seg = self._segment
+        self.horizon = horizon
+        t = np.arange(horizon * self._steps_per_year + 1) / self._steps_per_year
+
+        location = np.asarray(seg._starting_point, dtype=float) + np.outer(t, seg._drift)
+        price = seg._criteria.price
+
+        self._tables = {
+            'location': location,
+            'ideal_spot': location + np.asarray(seg._offset, dtype=float),
+            'price_range': np.column_stack((price.low - .5 * t, price.high - .5 * t)),
+        }
+
+    def _lookup(self, name, t):
+        """
+        Read a row out of a table at time t (a number or an array of them)
+        """
+        i = np.asarray(t, dtype=float) * self._steps_per_year
+        assert(np.all(i >= 0))
+
+        last = self.horizon * self._steps_per_year
+        if np.max(i) >= last:
+            # Past the end; double the horizon until it fits
+            horizon = self.horizon
+            while np.max(i) >= horizon * self._steps_per_year:
+                horizon *= 2
+            self._build(horizon)
+
+        table = self._tables[name]
+        lo = np.floor(i).astype(int)
+        frac = (i - lo)[..., None]
+        rows = table[lo]
+        if np.any(frac):
+            rows = rows + frac * (table[lo + 1] - rows)
+        return rows
+
+    def location(self, t):
+        """
+        Centroid(s) at time t; the last axis holds (x, y)
+        """
+        return self._lookup('location', t)
+
+    def ideal_spot(self, t):
+        """
+        Ideal spot(s) at time t; the last axis holds (x, y)
+        """
+        return self._lookup('ideal_spot', t)
+
+    def price_range(self, t):
+        """
+        Price range(s) at time t; the last axis holds (low, high)
+        """
+        return self._lookup('price_range', t)
+
+
 class MarketSegment:
     def __init__(self, starting_point, offset, drift, customer_criteria, name):
         """
@@ -28,6 +105,9 @@ class MarketSegment:
         self._name = name
         self._criteria = customer_criteria
 
+        # Built the first time someone asks for a position
+        self._trajectory = None
+
         # Sanity check
         should_be_one = (self._criteria.age.importance
             + self._criteria.price.importance
@@ -35,31 +115,73 @@ class MarketSegment:
             + self._criteria.mtbf.importance)
         assert(abs(should_be_one - 1) < 0.0000001)
 
+    # Changing any of these invalidates the precomputed trajectory
+    @property
+    def starting_point(self):
+        return self._starting_point
+
+    @starting_point.setter
+    def starting_point(self, starting_point):
+        self._starting_point = starting_point
+        self._trajectory = None
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @offset.setter
+    def offset(self, offset):
+        self._offset = offset
+        self._trajectory = None
+
+    @property
+    def drift(self):
+        return self._drift
+
+    @drift.setter
+    def drift(self, drift):
+        self._drift = drift
+        self._trajectory = None
+
+    @property
+    def criteria(self):
+        return self._criteria
+
+    @criteria.setter
+    def criteria(self, criteria):
+        self._criteria = criteria
+        self._trajectory = None
+
+    @property
+    def trajectory(self):
+        """
+        The segment's SegmentTrajectory (centroid, ideal spot, and price band
+        for every quarter)
+        """
+        if self._trajectory is None:
+            self._trajectory = SegmentTrajectory(self)
+        return self._trajectory
 
     def get_location(self, t):
         """
         Get the location at a given year t
         (Note: t is measured from start of simulation)
         """
-        x0, y0 = self._starting_point
-        dx, dy = self._drift
-        return (x0 + dx * t, y0 + dy * t)
+        return tuple(self.trajectory.location(t))
 
     def get_ideal_spot(self, t):
         """
         Get the ideal spot at a given year t
         (Note: t is measured from start of simulation)
         """
-        x, y = self.get_location(t)
-        dx, dy = self._offset
-        return (x + dx, y + dy)
+        return tuple(self.trajectory.ideal_spot(t))
 
     def get_price_range(self, t):
         """
         Get the price at a given year t (decreases by 0.5 each year)
         returns (low, high)
         """
-        return (self._criteria.price.low - .5*t, self._criteria.price.high - .5*t)
+        return tuple(self.trajectory.price_range(t))
     
     def get_mtbf_range(self, t=0):
         """
@@ -80,6 +202,10 @@ class MarketSegmentPlot:
             ax                  The axis on which this stuff will be drawn
             industry_segment    A MarketSegment object
         """
+        # Only the plot needs matplotlib, and it's slow to import
+        from matplotlib.patches import Circle
+        from textcache import cached_text
+
         self._industry_segment = industry_segment
         initial_centroid = industry_segment.get_location(0)
         x0, y0 = initial_centroid
@@ -94,41 +220,47 @@ class MarketSegmentPlot:
         self._color, = self._ideal_spot.get_edgecolor()
 
         # Add a circle with radius 2.5 around the segment
-        self._circle = plt.Circle(initial_centroid, 2.5, fill=False, color=self._color)
+        self._circle = Circle(initial_centroid, 2.5, fill=False, color=self._color)
         ax.add_artist(self._circle)
 
         # Add text in the center of the circle
-        self._name = ax.text(*initial_centroid, industry_segment._name,
+        self._name = cached_text(ax, *initial_centroid, industry_segment._name,
                 c=self._color, ha='center', va='center')
 
         # Add pricing info
         self._price_display_offset = (0, 0.5)   # Where should price be drawn?
         px, py = self._price_display_offset
         p_low, p_high = industry_segment.get_price_range(0)
-        self._price = ax.text(x0 + px, y0 + py, f"\${p_low} to \${p_high}",
+        self._price = cached_text(ax, x0 + px, y0 + py, f"\${p_low:.2f} to \${p_high:.2f}",
                 c=self._color, ha='center', va='center')
 
         # Add mtbf info
         self._mtbf_display_offset = (0, -0.5)
         mx, my = self._mtbf_display_offset
         mtbf_low, mtbf_high = industry_segment.get_mtbf_range()
-        self._mtbf = ax.text(x0 + mx, y0 + my, f"{mtbf_low} to {mtbf_high}",
+        self._mtbf = cached_text(ax, x0 + mx, y0 + my, f"{mtbf_low} to {mtbf_high}",
                 c=self._color, ha='center', va='center')
         
 
+    def artists(self):
+        """
+        Everything this draws (all of it moves when the time changes)
+        """
+        return [self._ideal_spot, self._circle, self._name, self._price, self._mtbf]
+
     def update(self, t):
         """
         Draws the name, ideal spot, and bounding circle
 
         Parameters:
-            t           Years from the start
+            t           Years from the start (fractions of a year move smoothly)
         """
         # Update ideal spot
-        new_ideal_spot = self._industry_segment.get_ideal_spot(int(t))
+        new_ideal_spot = self._industry_segment.get_ideal_spot(t)
         self._ideal_spot.set_offsets(new_ideal_spot)
 
         # Get locations
-        new_centroid = self._industry_segment.get_location(int(t))
+        new_centroid = self._industry_segment.get_location(t)
         x, y = new_centroid
 
         # Update circle
@@ -141,7 +273,7 @@ class MarketSegmentPlot:
         p_low, p_high = self._industry_segment.get_price_range(t)
         px, py = self._price_display_offset
         self._price.set_position((x + px, y + py))
-        self._price.set_text(f"\${p_low} to \${p_high}")
+        self._price.set_text(f"\${p_low:.2f} to \${p_high:.2f}")
 
         # Update mtbf location
         mtbf_low, mtbf_high = self._industry_segment.get_mtbf_range()
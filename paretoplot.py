@@ -0,0 +1,45 @@
+"""
+Draws a product's Pareto frontier (see surveyscore/pareto.py) on the
+perceptual map: a dot at every position that's on it, colored like the
+segment it scores best in.
+"""
+import numpy as np
+import matplotlib
+
+class FrontierPlot:
+    """
+    One scatter of frontier positions (hidden until there's a frontier)
+    """
+    def __init__(self, ax, alpha=0.8, size=16):
+        self._cycle = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+
+        # Thin dark edges, so dots on a line of the same color still show up
+        self._dots = ax.scatter(np.zeros(0), np.zeros(0), s=size, alpha=alpha,
+                                marker='o', edgecolors='black', linewidths=0.3, zorder=0.5)
+        self._dots.set_visible(False)
+
+    def artists(self):
+        return [self._dots]
+
+    def set_frontier(self, frontier):
+        """
+        Show a Frontier, or hide the plot if it's None
+        """
+        if frontier is None or len(frontier.scores) == 0:
+            self._dots.set_visible(False)
+            return
+
+        # Lots of frontier points differ only in price or MTBF; the first one
+        # at each position has the best total, so it picks the color
+        positions = np.column_stack((frontier.performance, frontier.size))
+        _, first = np.unique(positions.round(6), axis=0, return_index=True)
+        best = frontier.scores[first].argmax(axis=1)
+        segments = np.asarray(frontier.segments if frontier.segments is not None
+                              else range(frontier.scores.shape[1]))
+
+        self._dots.set_offsets(positions[first])
+        self._dots.set_facecolors([self._cycle[s % len(self._cycle)] for s in segments[best]])
+        self._dots.set_visible(True)
+
+    def get_visible(self):
+        return self._dots.get_visible()
@@ -0,0 +1,193 @@
+from matplotlib.figure import Figure
+from pubsub import pub
+from marketsegment import MarketSegmentPlot
+from product.controller import ProductController
+from blit import BlitManager
+from eventbus import FrameBus
+from heatmap import PositioningHeatmap
+from batchplot import SegmentCollectionPlot
+from paretoplot import FrontierPlot
+from surveyscore import pareto
+
+class PerceptualMapFigure:
+    """
+    The perceptual map graph itself: axes, segments, products, and the
+    positioning score overlay. Knows nothing about windows, so it works on
+    any Agg-based canvas (FigureCanvasTkAgg in the GUI, FigureCanvasAgg
+    when drawing offscreen).
+    """
+    def __init__(self, market_segments, products, make_canvas, parent=None,
+                 schedule=None, blit=True, editable=True, topic=FrameBus.TOPIC,
+                 executor=None, batched=False):
+        """
+        Parameters:
+            market_segments     A list of MarketSegment objects
+            products            A list of Product objects
+            make_canvas         Called with the Figure; returns the canvas to draw on
+            parent              Tk widget to put the product input boxes on.
+                                If None, there are no input boxes.
+            schedule            Passed on to the FrameBus (tkinter's after_idle
+                                in the GUI). If None, call bus.flush() to draw.
+            blit                Set to False to redraw the whole canvas every
+                                frame (slow, but handy when debugging drawing issues)
+            editable            Whether product_changing messages edit these products
+            topic               Topic for this figure's FrameBus; every figure
+                                that's open at once needs its own
+            executor            ComputeExecutor (see worker.py) for heavy work like
+                                the heatmap. If None, it's all done right away.
+            batched             Draw all segments and all products with a few
+                                shared artists (see batchplot.py); much faster
+                                with lots of products
+        """
+        # The actual graph
+        f = Figure(figsize=(5,5), dpi=100)
+        ax = f.add_subplot(111)
+        ax.set_title("Perceptual Map Predictor", fontsize=30)
+        ax.set_xlim(0,20)       # Set graph limits
+        ax.xaxis.set_ticks(range(0, 20, 2))
+        ax.set_ylim(0,20)
+        ax.yaxis.set_ticks(range(0, 20, 2))
+
+        # Add line going through 3 ideal points
+        # y = m*(x - x0) + y0
+        x0,y0 = 2.5-0.8, 17.5+0.8
+        x1,y1 = 7.5+1.4, 12.5-1.4
+        m = (y1-y0)/(x1-x0)
+        lin, = ax.plot([0, y0-m*x0], [x0-y0/m, 0])
+
+        # TODO Add line going through initial size segment and in-between ideal
+
+        # Grid line
+        ax.minorticks_on()
+        ax.grid(visible=True, which='minor')
+        ax.grid(visible=True, which='major', color='black')
+
+        # Optional overlay of positioning scores (hidden until it's turned on)
+        self.heatmap = PositioningHeatmap(ax, market_segments, executor=executor,
+                                          on_ready=lambda: self.bus.request_redraw())
+
+        # Use MarketSegmentPlot objects to draw each market segment
+        if batched:
+            self.market_segment_plots = [SegmentCollectionPlot(ax, market_segments)]
+        else:
+            self.market_segment_plots = [MarketSegmentPlot(f, ax, ms) for ms in market_segments]
+
+        # A product's Pareto frontier (hidden until one's asked for). Made after
+        # the segments so it doesn't take one of their colors
+        self.frontier = FrontierPlot(ax)
+        self._market_segments = market_segments
+        self._executor = executor
+        self._frontier_for = None
+        self._t = 0
+
+        self.figure = f
+        self.axis = ax
+        self.canvas = canvas = make_canvas(f)
+
+        # Everything above stays put, so it gets cached; only the
+        # segments and products are redrawn when things move
+        self.renderer = BlitManager(canvas, artists=self.heatmap.artists(), enabled=blit)
+        for msp in self.market_segment_plots:
+            self.renderer.add_artists(msp.artists())
+        self.renderer.add_artists(self.frontier.artists())
+        canvas.draw()
+
+        # Everything that changes during one tick of the UI gets drawn once
+        self.bus = FrameBus(schedule=schedule, redraw=self.renderer.update, topic=topic)
+
+        # This thing deals with products
+        self.product_controller = ProductController(ax, canvas, products, parent,
+                                                    self.renderer, self.bus, editable, batched)
+
+        # Every open figure follows the same time
+        pub.subscribe(self._change_time, "changing_time")
+
+        # Editing the product whose frontier is showing changes the frontier
+        pub.subscribe(self._products_changed, self.bus.topic)
+
+    def update_time(self, t):
+        """
+        Move every open figure to year t
+        """
+        pub.sendMessage("changing_time", time=t)
+
+    def _change_time(self, time):
+        """
+        Draw the market segments to the graph
+        """
+        self._t = time
+        for msp in self.market_segment_plots:
+            msp.update(time)
+        self.heatmap.update(time)
+        self._update_frontier()
+
+        # Products report their changes through the bus; draw it all at once
+        self.bus.request_redraw()
+
+    def show_time(self, t):
+        """
+        Move everything to time t (fractions of a year are fine) without
+        telling anybody, then draw. For rendering offscreen (see export.py).
+        """
+        for msp in self.market_segment_plots:
+            msp.update(t)
+        self.heatmap.update(t)
+        self.product_controller.show_time(t)
+        self.renderer.update()
+
+    def _products_changed(self, changes):
+        if self._frontier_for is None:
+            return
+        change = changes.get(self._frontier_for[0])
+        if change is not None and not change['time_change']:
+            self._update_frontier()
+
+    def show_products(self, products):
+        """
+        Switch to a different set of products (e.g. another branch)
+        """
+        self.product_controller.set_products(products)
+        self._update_frontier()
+        self.bus.request_redraw()
+
+    def show_heatmap(self, visible):
+        self.heatmap.set_visible(visible)
+        self.bus.request_redraw()
+
+    def show_frontier(self, name, segments=None):
+        """
+        Show the Pareto frontier of a product's placement across some segments
+        (see surveyscore/pareto.py), following the time slider. None hides it.
+
+        Parameters:
+            name            Name of the product
+            segments        Indices of the segments to trade off (defaults to the two nearest)
+        """
+        self._frontier_for = None if name is None else (name, segments)
+        self._update_frontier()
+        self.bus.request_redraw()
+
+    def _update_frontier(self):
+        if self._frontier_for is None:
+            self.frontier.set_frontier(None)
+            return
+
+        name, segments = self._frontier_for
+        product = self.product_controller.get_product(name)
+        if product is None:
+            self.frontier.set_frontier(None)
+            return
+
+        # Trajectories get built lazily, so the arrays are looked up here on the main thread
+        age, arrays, weights, segments = pareto.search_args(product, self._market_segments,
+                                                            self._t, segments)
+        if self._executor is None:
+            self.frontier.set_frontier(pareto.search_arrays(age, arrays, weights)
+                                       ._replace(segments=segments))
+            return
+
+        def done(frontier):
+            self.frontier.set_frontier(frontier._replace(segments=segments))
+            self.bus.request_redraw()
+        self._executor.submit(f"frontier{id(self)}", pareto.search_arrays, age, arrays,
+                              weights, on_done=done)
@@ -0,0 +1,165 @@
+"""
+Copy-on-write branches of a ProductTable, for comparing what-if plans.
+
+A branch starts out as a view of a frozen ProductTable (the "root") and
+only stores what got edited: for each edited product and column, the
+years from the first edited one onward. Branching a branch copies its
+(small) dict of edits and shares the edit arrays themselves, which are
+never changed in place, just replaced.
+
+Branches have the same interface as ProductTable, so Product objects and
+scoring work on them as-is (see Product.view for getting a branch's
+products).
+"""
+import numpy as np
+from product.table import ProductTable
+from surveyscore.score import survey_scores
+
+class TableBranch:
+    """
+    An editable copy of a ProductTable (or of another branch) that shares
+    every year nobody has edited
+    """
+    def __init__(self, root, names=None, patches=None):
+        """
+        Don't make these directly; use ProductTable.branch() or TableBranch.branch()
+
+        Parameters:
+            root            The frozen ProductTable everything is based on
+            names           Product names, in row order (the root's, plus any
+                            products added in this branch or its ancestors)
+            patches         {column: {row: (first year, values from that year on)}}
+        """
+        assert(root._frozen)
+        self._root = root
+        self.num_years = root.num_years
+        self._names = list(names if names is not None else root.names)
+        self._index = {name: row for row, name in enumerate(self._names)}
+        self._patches = {c: dict(patches[c]) if patches else {} for c in ProductTable.COLUMNS}
+
+        # Merged columns, built the first time they're read after an edit
+        self._columns = {}
+
+    def branch(self):
+        """
+        A new branch starting out the same as this one
+        """
+        return TableBranch(self._root, self._names, self._patches)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def row(self, name):
+        return self._index[name]
+
+    def edited(self):
+        """
+        {product name: first year edited} for everything changed in this branch
+        (and the branches it came from)
+        """
+        first = {}
+        for rows in self._patches.values():
+            for row, (start, _) in rows.items():
+                name = self._names[row]
+                first[name] = min(first.get(name, start), start)
+        return first
+
+    def _base_row(self, column, row):
+        """
+        A row as it is in the root (zeros for products added in a branch)
+        """
+        if row < len(self._root):
+            return self._root.column(column)[row]
+        return np.zeros(self.num_years, dtype=ProductTable.COLUMNS[column])
+
+    def _patch(self, column, row, t, values):
+        """
+        Replace a row's values from year t onward
+        """
+        patches = self._patches[column]
+        start, old = patches.get(row, (self.num_years, None))
+
+        # Keep the edited years contiguous, from whichever year is earlier
+        new_start = min(start, t)
+        merged = self._base_row(column, row)[new_start:].copy()
+        if old is not None:
+            merged[start - new_start:] = old
+        merged[t - new_start:] = values
+
+        patches[row] = (new_start, merged)
+        self._columns.pop(column, None)
+
+    def add(self, name, size, performance, mtbf, price=None, year=0):
+        """
+        Same as ProductTable.add, but only in this branch
+        """
+        assert(name not in self._index)
+        year = year or 0
+        row = len(self._names)
+        self._index[name] = row
+        self._names.append(name)
+
+        age = np.arange(self.num_years, dtype=float) - year
+        for column, values in (('size', size), ('performance', performance), ('age', age),
+                               ('mtbf', mtbf), ('price', np.nan if price is None else price),
+                               ('alive', age >= 0)):
+            self._patch(column, row, 0, values)
+        return row
+
+    def column(self, column):
+        """
+        Same as ProductTable.column, except that it's read-only
+        """
+        merged = self._columns.get(column)
+        if merged is not None:
+            return merged
+
+        base = self._root.column(column)
+        patches = self._patches[column]
+        if not patches and len(self._names) == len(base):
+            # Nothing edited; hand out a read-only view of the root's column
+            view = base.view()
+            view.flags.writeable = False
+            return view
+
+        merged = np.zeros((len(self._names), self.num_years), dtype=base.dtype)
+        merged[:len(base)] = base
+        for row, (start, values) in patches.items():
+            merged[row, start:] = values
+        merged.flags.writeable = False
+        self._columns[column] = merged
+        return merged
+
+    def get(self, column, row, t):
+        patch = self._patches[column].get(row)
+        if patch is not None and t >= patch[0]:
+            return patch[1][t - patch[0]]
+        return self._base_row(column, row)[t]
+
+    def fill(self, column, row, t, value):
+        """
+        Set a column to value from year t onward
+        """
+        self._patch(column, row, t, np.full(self.num_years - t, value,
+                                            dtype=ProductTable.COLUMNS[column]))
+
+    def set_age(self, row, t, age):
+        """
+        Set the age at year t; it keeps going up by one every year after
+        """
+        self._patch('age', row, t, age + np.arange(self.num_years - t))
+
+    def survey_scores(self, market_segments):
+        """
+        Same as ProductTable.survey_scores
+        """
+        return survey_scores(self.column('performance'), self.column('size'),
+                             self.column('mtbf'), self.column('price'),
+                             self.column('age'), market_segments)
@@ -1,8 +1,7 @@
+import math
 from pubsub import pub
-import tkinter as tk
-from tkinter import ttk
 from product.plot import ProductPlot
-from product.inputs import ProductGUI
+from batchplot import ProductCollectionPlot, ProductMarker
 
 # This is a controller
 class ProductController:
@@ -10,34 +9,152 @@ class ProductController:
     This should be the only thing talking to the tkinter window
     and modifying the model. Acts as a mediator between views and products.
     """
-    def __init__(self, axis, canvas, products, parent):
+    def __init__(self, axis, canvas, products, parent, renderer=None, bus=None,
+                 editable=True, batched=False):
         """
         Listens for user input events (like updating the time) and
         changes state of the given products accordingly 
+
+        renderer is an optional BlitManager the product plots redraw through.
+        bus is an optional FrameBus; if given, product changes are batched
+        through it and drawn once per UI tick.
+        If editable is False, product_changing messages are ignored (for
+        showing another branch next to the one being edited).
+        If batched is True, all products are drawn by one ProductCollectionPlot
+        (see batchplot.py) instead of a ProductPlot each. That needs a bus.
         """
+        assert(not batched or bus is not None)
+        self._axis = axis
+        self._canvas = canvas
+        self._renderer = renderer
+        self._bus = bus
+        self._year = 0
+
         # Index products by name for better lookups
         self._products = {p._name: p for p in products}
 
         # ProductPlot objects act as a view for products that render them
         # to an axis. They should not modify the products.
-        self._product_plots = [ProductPlot(axis, canvas, p._name, p.get_size(),
-                               p.get_performance()) for p in products]
+        self._product_plots = {}
+        self._collection = None
+        if batched:
+            self._collection = ProductCollectionPlot(axis)
+            if renderer is not None:
+                renderer.add_artists(self._collection.artists())
+        self._add_plots(products)
 
-        # Enables modification of the product
-        self._product_menu = [ProductGUI(parent, p._name, p.get_size(),
-                              p.get_performance()) for p in products]
+        if bus is not None:
+            for p in products:
+                p.set_bus(bus)
+            pub.subscribe(self._draw_changes, bus.topic)
 
-        pub.subscribe(self._change_stats, 'product_changing')
+        # Enables modification of the product. Nobody needs these to see the
+        # map, so they're built after it shows up. (No parent means no menus.)
+        self._parent = parent
+        self._product_menu = []
+        if parent is not None:
+            parent.after_idle(self._build_menus, parent, products)
+
+        if editable:
+            pub.subscribe(self._change_stats, 'product_changing')
         pub.subscribe(self._change_time, 'changing_time')
 
-    def _change_stats(self, name, time=None, size=None, performance=None, age=None):
-        assert(size is not None or performance is not None or age is not None)
+    def _add_plots(self, products):
+        for p in products:
+            if p._name in self._product_plots:
+                continue
+            if self._collection is not None:
+                plot = ProductMarker(self._collection, p._name, p.get_size(), p.get_performance())
+            else:
+                plot = ProductPlot(self._axis, self._canvas, p._name, p.get_size(),
+                                   p.get_performance(), self._renderer)
+            self._product_plots[p._name] = plot
+
+    def _sync(self):
+        """
+        Batched plots only show moves once they're synced
+        """
+        if self._collection is not None:
+            self._collection.sync()
+
+    def set_products(self, products):
+        """
+        Show a different set of products, e.g. the same products in another
+        branch (see product/branch.py). Nothing gets recomputed; the plots
+        just move to where the new products are at the current year, and
+        the input boxes show their stats. Products that aren't in the new
+        set get hidden.
+        """
+        new = [p for p in products if p._name not in self._product_plots]
+        self._products = {p._name: p for p in products}
+        self._add_plots(products)
+        if new and self._parent is not None:
+            self._build_menus(self._parent, new)
+
+        for name, plot in self._product_plots.items():
+            plot.set_visible(name in self._products)
+        self._sync()
+
+        for p in products:
+            if self._bus is not None:
+                p.set_bus(self._bus)
+            p.update_time(self._year)
+
+        # The input boxes still show the old products' stats
+        for menu in self._product_menu:
+            p = self._products.get(menu.name)
+            if p is not None:
+                menu.show_values(p.get_size(self._year), p.get_performance(self._year),
+                                 p.get_age(self._year))
+
+    def get_product(self, name):
+        """
+        The product shown under a name, or None
+        """
+        return self._products.get(name)
+
+    def show_time(self, t):
+        """
+        Move every product plot to time t, which can be a fraction of a year.
+        Products only change at yearly revisions, so each one stays where it
+        was at the start of the year (nothing is shown at stats it never had).
+        The products themselves aren't touched and nobody is told; this is
+        for offscreen rendering.
+        """
+        year = int(math.floor(t))
+        for name, p in self._products.items():
+            year = min(year, p._table.num_years - 1)
+            self._product_plots[name].move(name, (p.get_performance(year), p.get_size(year)),
+                                           p.get_age(year))
+        self._sync()
+
+    def _build_menus(self, parent, products):
+        # Only the GUI has a parent to put these on, so tkinter isn't needed offscreen
+        from product.inputs import ProductGUI
+
+        self._product_menu.extend(ProductGUI(parent, p._name, p.get_size(),
+                                  p.get_performance()) for p in products)
+
+    def _change_stats(self, name, time=None, size=None, performance=None, age=None,
+                      mtbf=None, price=None):
+        assert(size is not None or performance is not None or age is not None
+               or mtbf is not None or price is not None)
         assert(name is not None)
 
         p = self._products[name]
-        p.update_stats(time, size=size, performance=performance, age=age)
+        p.update_stats(time, size=size, performance=performance, age=age,
+                       mtbf=mtbf, price=price)
+
+    def _draw_changes(self, changes):
+        """
+        Move every product plot in a batch from the FrameBus (the bus redraws)
+        """
+        for name, change in changes.items():
+            self._product_plots[name].move(name, change['coords'], change['age'])
+        self._sync()
 
     def _change_time(self, time):
+        self._year = time
         for n in self._products:
             p = self._products[n]
             p.update_time(time)
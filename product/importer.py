@@ -0,0 +1,279 @@
+"""
+Bulk import of competitor products from CSV, straight into a ProductTable.
+
+The CSV has a header and one row per product per round:
+    name,performance,size,mtbf,age,price,year
+    Able,5.5,14.5,17500,3.1,28.00,0
+    Able,6.2,13.8,17500,1.9,27.50,1
+    ...
+(column order doesn't matter, and price may be left blank). A product's
+stats hold from the year of its row until the year of its next row; it's
+alive from the first year it shows up.
+
+The file is read a chunk at a time and each chunk is parsed/validated as
+whole numpy columns, so files bigger than memory are fine and no Python
+object gets made per row.
+"""
+import csv
+import itertools
+from collections import Counter, namedtuple
+import numpy as np
+from product.table import ProductTable
+
+FIELDS = ('name', 'performance', 'size', 'mtbf', 'age', 'price', 'year')
+
+# Rows are dropped (and counted under one of these) if they fail validation
+REJECT_REASONS = {
+    'name': "missing name",
+    'number': "not a number",
+    'year': "year outside the simulation",
+    'position': "negative performance/size",
+    'mtbf': "MTBF not positive",
+    'age': "negative age",
+    'price': "price not positive",
+}
+
+# rows_read, rows_imported: counts of data rows
+# products: names of every product that got imported
+# rejected: {reason: number of rows}
+# examples: [(line number, reason)] for the first few rejected rows
+ImportReport = namedtuple('ImportReport',
+                          ('rows_read', 'rows_imported', 'products', 'rejected', 'examples'))
+
+# How many rejected rows to keep line numbers for
+MAX_EXAMPLES = 20
+
+def _to_float(strings):
+    """
+    Convert a column of strings to floats; anything unparseable (including
+    blanks) becomes nan
+    """
+    try:
+        return np.asarray(strings, dtype=float)
+    except ValueError:
+        pass
+
+    # Some bad values in here; slow path for just this chunk
+    out = np.empty(len(strings))
+    for i, s in enumerate(strings):
+        try:
+            out[i] = float(s)
+        except ValueError:
+            out[i] = np.nan
+    return out
+
+def validate(columns, num_years):
+    """
+    Check a chunk of parsed rows.
+
+    Parameters:
+        columns         {field: array} for every field in FIELDS
+                        (name as strings, the rest as floats)
+        num_years       Number of years in the simulation
+
+    Returns an array of REJECT_REASONS keys, with '' for rows that are fine
+    """
+    n = len(columns['name'])
+    reasons = np.full(n, '', dtype=object)
+
+    # Checked in reverse order of importance, so the most basic problem wins
+    year = columns['year']
+    checks = (
+        ('price', columns['price'] <= 0),
+        ('age', columns['age'] < 0),
+        ('mtbf', columns['mtbf'] <= 0),
+        ('position', (columns['performance'] < 0) | (columns['size'] < 0)),
+        ('year', (year < 0) | (year >= num_years) | (year != np.floor(year))),
+        ('number', ~np.isfinite(np.column_stack([columns[f] for f in
+                                                 ('performance', 'size', 'mtbf', 'age', 'year')])).all(axis=1)
+                   | np.isinf(columns['price'])),
+        ('name', np.char.str_len(columns['name'].astype(str)) == 0),
+    )
+    for reason, bad in checks:
+        reasons[bad] = reason
+    return reasons
+
+class ProductImporter:
+    """
+    Collects product rows chunk by chunk, then writes whole timelines into
+    the table when finished
+    """
+    def __init__(self, table):
+        """
+        Parameters:
+            table           ProductTable to import into. Products already in it
+                            keep their stats from before the first year they
+                            show up in the import.
+        """
+        self._table = table
+        self._preexisting = len(table)
+
+        # Staged stats for every table row; only the years in _observed mean anything
+        num_years = table.num_years
+        self._staged = {c: np.zeros((len(table), num_years)) for c in
+                        ('size', 'performance', 'mtbf', 'age', 'price')}
+        self._observed = np.zeros((len(table), num_years), dtype=bool)
+
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rejected = Counter()
+        self.examples = []
+
+    def _rows_for(self, names):
+        """
+        Table rows for an array of names, adding products that aren't in it yet
+        """
+        unique, inverse = np.unique(names, return_inverse=True)
+        for name in unique:
+            if name not in self._table:
+                # Placeholder stats; finish() overwrites the whole row
+                self._table.add(name, size=0, performance=0, mtbf=0)
+
+        # Keep the staging area as big as the table
+        grow = len(self._table) - len(self._observed)
+        if grow > 0:
+            num_years = self._table.num_years
+            for c, a in self._staged.items():
+                self._staged[c] = np.concatenate((a, np.zeros((grow, num_years))))
+            self._observed = np.concatenate((self._observed,
+                                             np.zeros((grow, num_years), dtype=bool)))
+
+        rows = np.array([self._table.row(name) for name in unique], dtype=int)
+        return rows[inverse]
+
+    def feed(self, columns, first_line=2, lines=None):
+        """
+        Stage a chunk of rows.
+
+        Parameters:
+            columns         {field: array of strings} for every field in FIELDS
+            first_line      Line number of the chunk's first row (for the report)
+            lines           Line number of every row, if they aren't one per
+                            line from first_line (e.g. quoted fields with
+                            line breaks in them)
+        """
+        n = len(columns['name'])
+        if lines is None:
+            lines = np.arange(first_line, first_line + n)
+        parsed = {f: _to_float(columns[f]) for f in FIELDS if f != 'name'}
+        parsed['name'] = np.asarray(columns['name'], dtype=object)
+
+        # A blank price is fine (nan), but one that's there and isn't a
+        # number isn't; make those inf so validate() rejects them
+        price_given = np.char.str_len(np.asarray(columns['price'], dtype=str)) > 0
+        parsed['price'][price_given & np.isnan(parsed['price'])] = np.inf
+
+        reasons = validate(parsed, self._table.num_years)
+        ok = reasons == ''
+        self.rows_read += n
+        self.rows_imported += int(ok.sum())
+
+        if not ok.all():
+            bad = np.flatnonzero(~ok)
+            self.rejected.update(reasons[bad])
+            for i in bad[:MAX_EXAMPLES - len(self.examples)]:
+                self.examples.append((int(lines[i]), REJECT_REASONS[reasons[i]]))
+            parsed = {f: a[ok] for f, a in parsed.items()}
+
+        if len(parsed['name']) == 0:
+            return
+
+        rows = self._rows_for(parsed['name'])
+        years = parsed['year'].astype(int)
+
+        # If the same product/year shows up more than once, the last one wins
+        # (fancy assignment with repeated indices doesn't promise that).
+        # unique() gives the first of each in the reversed chunk.
+        keys = rows * self._table.num_years + years
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        rows, years = rows[keep], years[keep]
+
+        for c, staged in self._staged.items():
+            staged[rows, years] = parsed[c][keep]
+        self._observed[rows, years] = True
+
+    def finish(self):
+        """
+        Write the staged rows into the table. Returns an ImportReport.
+        """
+        table = self._table
+        imported = np.flatnonzero(self._observed.any(axis=1))
+        num_years = table.num_years
+        years = np.arange(num_years)
+
+        if len(imported):
+            observed = self._observed[imported]
+
+            # For each year, the most recent year with a row (-1 if none yet).
+            # Before the first row, fall back on the first row.
+            last = np.maximum.accumulate(np.where(observed, years, -1), axis=1)
+            first = observed.argmax(axis=1)
+            source = np.where(last >= 0, last, first[:, None])
+            r = np.arange(len(imported))[:, None]
+
+            values = {c: staged[imported][r, source] for c, staged in self._staged.items()}
+            values['age'] = values['age'] + (years - source)
+            values['alive'] = last >= 0
+
+            # Products that were already in the table keep their own
+            # stats from before they show up here
+            write = np.ones_like(observed)
+            write[imported < self._preexisting] = last[imported < self._preexisting] >= 0
+
+            for c in ProductTable.COLUMNS:
+                column = table.column(c)
+                column[imported] = np.where(write, values[c], column[imported])
+
+        names = table.names
+        return ImportReport(rows_read=self.rows_read, rows_imported=self.rows_imported,
+                            products=[names[i] for i in imported],
+                            rejected={REJECT_REASONS[k]: v for k, v in self.rejected.items()},
+                            examples=list(self.examples))
+
+def import_csv(path, table=None, num_years=None, chunk_size=100000):
+    """
+    Stream a CSV of competitor products into a ProductTable.
+
+    Parameters:
+        path            CSV file (see the top of this file for the format)
+        table           ProductTable to import into; a new one is made if not given
+        num_years       Required if no table is given
+        chunk_size      How many rows to parse/validate at a time
+
+    Returns (table, ImportReport)
+    """
+    if table is None:
+        table = ProductTable(num_years)
+    assert(num_years is None or num_years == table.num_years)
+
+    importer = ProductImporter(table)
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader)]
+        missing = set(FIELDS) - set(header)
+        assert(not missing), f"{path} is missing columns: {', '.join(sorted(missing))}"
+        index = [header.index(field) for field in FIELDS]
+
+        while True:
+            # Rows can span lines (quoted line breaks), so ask the reader where
+            # each one started
+            chunk, lines = [], []
+            start = reader.line_num + 1
+            for row in itertools.islice(reader, chunk_size):
+                chunk.append(row)
+                lines.append(start)
+                start = reader.line_num + 1
+            if not chunk:
+                break
+
+            # Short rows get padded with blanks (and then rejected as not numbers)
+            width = max(index) + 1
+            chunk = [row if len(row) >= width else row + [''] * (width - len(row)) for row in chunk]
+
+            fields = list(zip(*chunk))
+            importer.feed({field: np.char.strip(np.asarray(fields[i], dtype=str))
+                           for field, i in zip(FIELDS, index)},
+                          lines=lines)
+
+    return table, importer.finish()
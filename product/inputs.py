@@ -64,6 +64,18 @@ class ProductGUI:
         # Frames are horizontally-aligned
         self._frame.pack(side=tk.LEFT)
 
+    @property
+    def name(self):
+        return self._name
+
+    def show_values(self, size, performance, age):
+        """
+        Put a product's stats in the input boxes (e.g. after switching branches)
+        """
+        self._size_var.set(size)
+        self._perf_var.set(performance)
+        self._age_var.set(age)
+
     def _on_update_performance(self, _):
         """
         Callback for when parameter gets updated
@@ -1,64 +1,106 @@
 from pubsub import pub
+from product.table import ProductTable
+import instrument
 
 class Product:
     """
     A product has a name, size, performance, and year.
+
+    The stats themselves live in a row of a ProductTable; this is just a
+    view onto that row. Products sharing a table can be scored/plotted
+    together by reading whole columns of it.
     """
     def __init__(self, name: str, size: float, performance: float,
-            mtbf:int, year:int=None, num_years=None):
+            mtbf:int, year:int=None, num_years=None, price:float=None,
+            table:ProductTable=None):
         """
         Note that num_years is the total number of years in the simulation (I think 6)
+
+        If no table is given, the product gets a table all to itself
+        (num_years is required in that case).
         """
         # Product name; string
         self._name = name
 
-        # size[t], performance[t], age[t] gives the product's size/performance/age at year t
-        self._size = [size for _ in range(num_years)]
-        self._performance = [performance for _ in range(num_years)]
-        self._age = list(range(num_years))      # Goes from 0 ==> num_years - 1
+        if table is None:
+            table = ProductTable(num_years, capacity=1)
+        assert(num_years is None or num_years == table.num_years)
 
-        # Is the product actually in production?
-        self._alive = True
+        # size[t], performance[t], age[t] gives the product's size/performance/age at year t
+        self._table = table
+        self._row = table.add(name, size, performance, mtbf, price=price, year=year)
 
         # The simulation's current year
         self._year = 0
 
+        # If set, changes are batched through this FrameBus instead of
+        # being published right away
+        self._bus = None
+
+    @classmethod
+    def view(cls, table, name):
+        """
+        A Product for something that's already in a table, e.g. the same
+        product in a different branch (see product/branch.py)
+        """
+        p = cls.__new__(cls)
+        p._name = name
+        p._table = table
+        p._row = table.row(name)
+        p._year = 0
+        p._bus = None
+        return p
+
+    def set_bus(self, bus):
+        """
+        Route this product's change messages through a FrameBus
+        """
+        self._bus = bus
+
+    def _publish(self, **change):
+        """
+        Tell the views that the product changed
+        """
+        if self._bus is not None:
+            self._bus.post(**change)
+        else:
+            pub.sendMessage(f"product_changed/{self._name}", **change)
+
+    @instrument.timed("product.update_time")
     def update_time(self, t):
         """
         Change the product's current point in time        
         """
         self._year = t
-        pub.sendMessage(f"product_changed/{self._name}", name=self._name, coords=(self._performance[t], self._size[t]), age=self._age[t], time=self._year, time_change=True)
+        self._publish(name=self._name, coords=(self.get_performance(t), self.get_size(t)), age=self.get_age(t), time=self._year, time_change=True)
 
-    def update_stats(self, t, size=None, performance=None, age=None):
+    @instrument.timed("product.update_stats")
+    def update_stats(self, t, size=None, performance=None, age=None, mtbf=None, price=None):
         """
-        Update the size, performance, and age past the provided year t.
+        Update the size, performance, age, mtbf, and price past the provided year t.
         """
-        assert(size is not None or performance is not None or age is not None)
+        assert(size is not None or performance is not None or age is not None
+               or mtbf is not None or price is not None)
 
         if t is None:
             t = self._year
 
-        assert(t >= 0)
+        assert(0 <= t < self._table.num_years)
 
-        if size is not None:
-            self._size[t:] = len(self._size[t:]) * [size]
-
-        if performance is not None:
-            self._performance[t:] = len(self._performance[t:]) * [performance]
+        for column, value in (('size', size), ('performance', performance),
+                              ('mtbf', mtbf), ('price', price)):
+            if value is not None:
+                self._table.fill(column, self._row, t, value)
 
         if age is not None:
-            num_years = len(self._age)
-            self._age[t:] = [age + i for i in range(num_years - t)]
-            assert(len(self._age) == len(self._performance))
-            assert(self._age[t] == age)
-            assert(t < num_years - 1 and self._age[t+1] == age + 1)
-
-        assert(len(self._size) == len(self._performance))
+            self._table.set_age(self._row, t, age)
 
         # Broadcast that the model changed (views should listen for this)
         # TODO Abstract out params to a namedtuple (call it ProductEvent or something)
-        pub.sendMessage(f"product_changed/{self._name}", name=self._name, coords=(self._performance[t], self._size[t]), age=self._age[t], time=t, time_change=False)
+        self._publish(name=self._name, coords=(self.get_performance(t), self.get_size(t)), age=self.get_age(t), time=t, time_change=False)
+
+    def _get(self, column, t):
+        return self._table.get(column, self._row, t if t is not None else self._year)
 
     # TODO Get rid of these methods and write a method that returns a ProductEvent namedtuple
     #      that gives all of the relevant stats (name, performance, size, age, etc) at a given time t
@@ -66,12 +108,34 @@ class Product:
         """
         Return either the performance in the current year or at a desired year
         """
-        return self._performance[t] if t is not None else self._performance[self._year]
+        return self._get('performance', t)
 
     def get_size(self, t=None):
         """
         Return either the size in the current year or at a desired year
         """
-        return self._size[t] if t is not None else self._size[self._year]
+        return self._get('size', t)
 
+    def get_age(self, t=None):
+        """
+        Return either the age in the current year or at a desired year
+        """
+        return self._get('age', t)
 
+    def get_mtbf(self, t=None):
+        """
+        Return either the mtbf in the current year or at a desired year
+        """
+        return self._get('mtbf', t)
+
+    def get_price(self, t=None):
+        """
+        Return either the price in the current year or at a desired year
+        """
+        return self._get('price', t)
+
+    def is_alive(self, t=None):
+        """
+        Is the product in production in the current year or at a desired year?
+        """
+        return self._get('alive', t)
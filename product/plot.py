@@ -1,4 +1,6 @@
 from pubsub import pub
+import instrument
+from textcache import cached_text
 
 # This is a View()
 class ProductPlot:
@@ -6,7 +8,7 @@ class ProductPlot:
     Draws a Product to a given matplotlib axis
     """
     # TODO Accept a single namedtuple containing the data rather than a list of attributes
-    def __init__(self, ax, canvas, name, initial_size, initial_performance):
+    def __init__(self, ax, canvas, name, initial_size, initial_performance, renderer=None):
         """
         Parameters:
             ax                      The axis on which this stuff will be drawn
@@ -14,9 +16,12 @@ class ProductPlot:
             name                    The product's name
             initial_size            The product's initial position
             initial_performance     The product's initial position
+            renderer                A BlitManager used to redraw. If None,
+                                    the whole canvas gets redrawn instead.
         """
         # Lets us refresh canvas when something changes
         self._canvas = canvas
+        self._renderer = renderer
 
         # Draw coordinate
         self._product_coord = ax.scatter(initial_performance, initial_size, c='#000')
@@ -26,25 +31,50 @@ class ProductPlot:
         self._color = self._product_coord.get_edgecolor()
 
         # Add name+age label (with age of zero). For ex: "cake (0)"
-        self._name_label = ax.text(initial_performance, initial_size, f"{name} (0)")
+        self._name_label = cached_text(ax, initial_performance, initial_size, f"{name} (0)")
         self._product_name = name
 
+        if renderer is not None:
+            renderer.add_artists(self.artists())
+
         pub.subscribe(self._change_product, f"product_changed/{name}")
 
-    # FIXME draw() should be called once per time change and once per
-    #       product change, pretty laggy rn
-    def _change_product(self, name, time, coords, age, time_change):
+    def artists(self):
         """
-        Draw the name and product coordinate
+        Everything this draws
+        """
+        return [self._product_coord, self._name_label]
+
+    def set_visible(self, visible):
+        for a in self.artists():
+            a.set_visible(visible)
+
+    def move(self, name, coords, age):
+        """
+        Update the name and product coordinate without redrawing
         """
         p,s = coords
 
         # Update coordinate positioning
         self._product_coord.set_offsets((p, s))
         self._name_label.set_position((p, s))
-        self._name_label.set_text(f"{name} ({age})")
+        self._name_label.set_text(f"{name} ({age:g})")
+
+    # NOTE When the products go through a FrameBus (see eventbus.py), this
+    #      isn't called at all; the controller moves every plot and the
+    #      bus redraws once
+    def _change_product(self, name, time, coords, age, time_change):
+        """
+        Draw the name and product coordinate
+        """
+        self.move(name, coords, age)
 
         # If the time has changed, lots of points will get redrawn,
         # so no need to redraw the entire canvas
         if time_change is not True:
-            self._canvas.draw()
+            if self._renderer is not None:
+                self._renderer.update()
+            else:
+                with instrument.span("canvas.draw"):
+                    self._canvas.draw()
+                instrument.frame_drawn()
@@ -0,0 +1,133 @@
+import numpy as np
+from surveyscore.score import survey_scores
+
+class ProductTable:
+    """
+    Holds every product's timeline in contiguous numpy arrays, one row
+    per product and one column per year. Product objects are just views
+    into a row of this table.
+    """
+    # Name and dtype of each (products x years) column
+    COLUMNS = {
+        'size': float,
+        'performance': float,
+        'age': float,
+        'mtbf': float,
+        'price': float,
+        'alive': bool,
+    }
+
+    def __init__(self, num_years, capacity=8):
+        """
+        Parameters:
+            num_years           Total number of years in the simulation
+            capacity            How many products to make room for up front.
+                                The table grows on its own past this.
+        """
+        self.num_years = num_years
+
+        # Set once the table has been branched (see branch()); it can't change after that
+        self._frozen = False
+
+        # Product name => row index
+        self._index = {}
+        self._names = []
+
+        self._data = {c: np.zeros((capacity, num_years), dtype=d)
+                      for c, d in self.COLUMNS.items()}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def row(self, name):
+        """
+        Return the row index of a product
+        """
+        return self._index[name]
+
+    def add(self, name, size, performance, mtbf, price=None, year=0):
+        """
+        Add a product whose stats stay constant for the whole simulation.
+        It is alive (and aging) from the given year onward.
+
+        Returns the new product's row index
+        """
+        assert(name not in self._index)
+        assert(not self._frozen)
+
+        year = year or 0
+        row = len(self._names)
+        if row == len(self._data['size']):
+            self._grow()
+
+        self._index[name] = row
+        self._names.append(name)
+
+        age = np.arange(self.num_years, dtype=float) - year
+        self._data['size'][row] = size
+        self._data['performance'][row] = performance
+        self._data['age'][row] = age
+        self._data['mtbf'][row] = mtbf
+        self._data['price'][row] = np.nan if price is None else price
+        self._data['alive'][row] = age >= 0
+
+        return row
+
+    def _grow(self):
+        """
+        Double the number of rows (amortizes the copies when adding lots of products)
+        """
+        for c, a in self._data.items():
+            bigger = np.zeros((max(2 * len(a), 1), self.num_years), dtype=a.dtype)
+            bigger[:len(a)] = a
+            self._data[c] = bigger
+
+    def column(self, column):
+        """
+        Return a (products x years) view of the given column.
+        Rows are ordered like names.
+        """
+        return self._data[column][:len(self._names)]
+
+    def get(self, column, row, t):
+        return self._data[column][row, t]
+
+    def fill(self, column, row, t, value):
+        """
+        Set a column to value from year t onward
+        """
+        assert(not self._frozen)
+        self._data[column][row, t:] = value
+
+    def set_age(self, row, t, age):
+        """
+        Set the age at year t; it keeps going up by one every year after
+        """
+        assert(not self._frozen)
+        self._data['age'][row, t:] = age + np.arange(self.num_years - t)
+
+    def branch(self):
+        """
+        Returns a TableBranch (see product/branch.py) that starts out the same
+        as this table and shares its data. The table can't be changed any more
+        after it's been branched; make changes in branches instead.
+        """
+        from product.branch import TableBranch
+        self._frozen = True
+        return TableBranch(self)
+
+    def survey_scores(self, market_segments):
+        """
+        Score every product against every segment for every year.
+        Returns a (products x segments x years) array.
+        """
+        return survey_scores(self.column('performance'), self.column('size'),
+                             self.column('mtbf'), self.column('price'),
+                             self.column('age'), market_segments)
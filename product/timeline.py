@@ -0,0 +1,219 @@
+"""
+Timelines stored as change points instead of one value per year.
+
+A product's stats only change at a few revisions, so a timeline is just
+the (period, value) pairs where it changes. Looking up a period is a
+binary search, and so is finding where an edit goes, so neither depends
+on how long the horizon is (quarterly or monthly periods over decades
+cost about as much as 10 years).
+
+SparseProductTable is a ProductTable (same interface) built out of these,
+for horizons where a dense (products x periods) table would be wasteful.
+"""
+from bisect import bisect_left, bisect_right
+import numpy as np
+from product.table import ProductTable
+from surveyscore.score import survey_scores
+
+class Timeline:
+    """
+    A value that holds from each change point until the next one
+    """
+    __slots__ = ('_periods', '_values')
+
+    def __init__(self, value, start=0):
+        """
+        Parameters:
+            value       Value from start onward (and before it, too)
+            start       Period of the first change point
+        """
+        self._periods = [start]
+        self._values = [value]
+
+    def __len__(self):
+        return len(self._periods)
+
+    def change_points(self):
+        """
+        [(period, value)] in order
+        """
+        return list(zip(self._periods, self._values))
+
+    def _index(self, t):
+        # Before the first change point, the first value holds
+        return max(bisect_right(self._periods, t) - 1, 0)
+
+    def at(self, t):
+        return self._values[self._index(t)]
+
+    def set_from(self, t, value):
+        """
+        Make the value `value` from period t onward (dropping any later change points)
+        """
+        i = bisect_left(self._periods, t)
+        del self._periods[i:], self._values[i:]
+
+        # No need for a change point if nothing changes
+        if self._values and self._values[-1] == value:
+            return
+        self._periods.append(t)
+        self._values.append(value)
+
+    def sample(self, periods):
+        """
+        Values at an array of periods
+        """
+        i = np.searchsorted(self._periods, periods, side='right') - 1
+        return np.asarray(self._values)[np.maximum(i, 0)]
+
+class AgeTimeline(Timeline):
+    """
+    Age goes up by one every year on its own, so the change points are
+    where it gets reset (e.g. a revision makes a product seem newer)
+    """
+    __slots__ = ('_periods_per_year',)
+
+    def __init__(self, age, start=0, periods_per_year=1):
+        super().__init__(float(age), start)
+        self._periods_per_year = periods_per_year
+
+    def at(self, t):
+        i = self._index(t)
+        return self._values[i] + (t - self._periods[i]) / self._periods_per_year
+
+    def set_from(self, t, age):
+        i = bisect_left(self._periods, t)
+        del self._periods[i:], self._values[i:]
+        self._periods.append(t)
+        self._values.append(float(age))
+
+    def sample(self, periods):
+        periods = np.asarray(periods)
+        i = np.maximum(np.searchsorted(self._periods, periods, side='right') - 1, 0)
+        return np.asarray(self._values)[i] \
+               + (periods - np.asarray(self._periods)[i]) / self._periods_per_year
+
+class SparseProductTable:
+    """
+    Same interface as ProductTable, but each product's stats are stored as
+    change points. Columns are only expanded to (products x periods) arrays
+    when something asks for them (e.g. scoring), and after that an edit
+    only rewrites the periods it changed.
+    """
+    COLUMNS = ProductTable.COLUMNS
+
+    def __init__(self, num_periods, periods_per_year=1):
+        """
+        Parameters:
+            num_periods         Total number of periods in the simulation
+                                (this is the table's num_years, so Products
+                                work with it as is)
+            periods_per_year    4 for quarters, 12 for months, etc
+        """
+        self.num_years = num_periods
+        self.periods_per_year = periods_per_year
+
+        self._index = {}
+        self._names = []
+
+        # Column => one Timeline per product
+        self._timelines = {c: [] for c in self.COLUMNS}
+
+        # Column => expanded (products x periods) array, once somebody's asked for it
+        self._columns = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def row(self, name):
+        return self._index[name]
+
+    def add(self, name, size, performance, mtbf, price=None, year=0):
+        """
+        Add a product whose stats stay constant for the whole simulation.
+        It is alive (and aging) from the given period onward.
+
+        Returns the new product's row index
+        """
+        assert(name not in self._index)
+        year = year or 0
+        row = len(self._names)
+        self._index[name] = row
+        self._names.append(name)
+
+        alive = Timeline(year <= 0)
+        if year > 0:
+            alive.set_from(year, True)
+
+        for column, timeline in (
+                ('size', Timeline(float(size))),
+                ('performance', Timeline(float(performance))),
+                ('age', AgeTimeline(-year / self.periods_per_year, 0, self.periods_per_year)),
+                ('mtbf', Timeline(float(mtbf))),
+                ('price', Timeline(np.nan if price is None else float(price))),
+                ('alive', alive)):
+            self._timelines[column].append(timeline)
+
+        # Expanded columns are a row short now
+        self._columns.clear()
+        return row
+
+    def timeline(self, column, row):
+        return self._timelines[column][row]
+
+    def _changed(self, column, row, t):
+        """
+        Bring the expanded column (if there is one) up to date after a row
+        changed from period t onward
+        """
+        expanded = self._columns.get(column)
+        if expanded is not None and t < self.num_years:
+            expanded[row, t:] = self._timelines[column][row].sample(np.arange(t, self.num_years))
+
+    def column(self, column):
+        """
+        Return a (products x periods) array of the given column.
+        Rows are ordered like names. Don't modify it.
+        """
+        expanded = self._columns.get(column)
+        if expanded is None:
+            periods = np.arange(self.num_years)
+            expanded = np.zeros((len(self._names), self.num_years), dtype=self.COLUMNS[column])
+            for row, timeline in enumerate(self._timelines[column]):
+                expanded[row] = timeline.sample(periods)
+            self._columns[column] = expanded
+        return expanded
+
+    def get(self, column, row, t):
+        return self._timelines[column][row].at(t)
+
+    def fill(self, column, row, t, value):
+        """
+        Set a column to value from period t onward
+        """
+        self._timelines[column][row].set_from(t, value)
+        self._changed(column, row, t)
+
+    def set_age(self, row, t, age):
+        """
+        Set the age at period t; it keeps going up after that
+        """
+        self._timelines['age'][row].set_from(t, age)
+        self._changed('age', row, t)
+
+    def survey_scores(self, market_segments):
+        """
+        Score every product against every segment for every period.
+        Returns a (products x segments x periods) array.
+        """
+        return survey_scores(self.column('performance'), self.column('size'),
+                             self.column('mtbf'), self.column('price'),
+                             self.column('age'), market_segments,
+                             years=np.arange(self.num_years) / self.periods_per_year)
@@ -0,0 +1,233 @@
+"""
+Production planning: how many units of each product to build each year,
+given the demand forecast (see surveyscore/marketshare.py) and the plant
+each product is built on.
+
+How the plant works (same as the sim):
+ - Capacity is how many units a year the first shift can build
+ - A second shift can build up to another full capacity's worth, but
+   its labor costs overtime_premium more
+ - Automation (1-10) cuts labor cost per unit; at 10 it's a tenth of what it is at 1
+ - Anything built and not sold sits in inventory, which costs
+   carrying_rate of the unit cost per year
+
+The planner builds for each year's demand from the cheapest capacity left:
+unused inventory, then the first shift, then the first shift of earlier
+years (built ahead and carried), then overtime. Every source is costed at
+the unit cost of the year it's built in (automation can change between
+years), plus carrying and overtime. A unit is only built if that costs
+less than its price; otherwise that sale is lost.
+
+Given a target_utilization, a second pass then brings every year up to it:
+first by building earlier what later years build beyond the target (so
+inventory only grows until those years), then by building for inventory.
+
+Both passes are greedy heuristics, not an LP, but they're right for the
+usual cases (demand under capacity, or a peak year that can be built ahead
+for) and handle every product at once.
+"""
+from collections import namedtuple
+import numpy as np
+
+# Rough numbers from our last round
+MATERIAL_COST = 10.0            # $/unit
+LABOR_COST = 8.0                # $/unit at automation 1
+OVERTIME_PREMIUM = 0.5          # Second shift labor costs 50% more
+CARRYING_RATE = 0.12            # Inventory costs 12% of unit cost per year
+MAX_UTILIZATION = 2.0           # Full second shift
+
+# All of these are (products x years) except cost, which is (products,)
+#   first_shift, overtime   Units built on each shift
+#   production              first_shift + overtime
+#   sales                   Units sold (demand that got filled)
+#   lost_sales              Demand that didn't
+#   inventory               Units left over at the end of the year
+#   utilization             production / capacity (1.0 is a full first shift)
+#   cost                    Overtime premium plus inventory carrying cost
+ProductionPlan = namedtuple('ProductionPlan',
+                            ('first_shift', 'overtime', 'production', 'sales', 'lost_sales',
+                             'inventory', 'utilization', 'cost'))
+
+def _per_year(a, shape):
+    """
+    Broadcast a scalar, (products,), or (products x years) array to (products x years)
+    """
+    a = np.asarray(a, dtype=float)
+    if a.ndim == 1:
+        a = a[:, None]
+    return np.broadcast_to(a, shape)
+
+def labor_cost(automation, base=LABOR_COST):
+    """
+    Labor cost per unit at a given automation level
+    """
+    return base * (11 - np.asarray(automation, dtype=float)) / 10
+
+def _raise_utilization(goal, capacity, max_utilization, first_shift, overtime, carry, extra):
+    """
+    The second pass of plan_production: build at least goal units every year.
+    Units later years build beyond their own goal get built earlier instead
+    (nearest year first, their overtime before their first shift); whatever's
+    still short gets built for inventory. First shift gets used before overtime.
+
+    Changes first_shift and overtime in place. Returns the extra overtime
+    premium and carrying cost of each product.
+    """
+    num_products, num_years = goal.shape
+    cost = np.zeros(num_products)
+
+    for s in range(num_years):
+        # Later years to pull from, then None for building for inventory
+        for t in list(range(s + 1, num_years)) + [None]:
+            production = first_shift[:, s] + overtime[:, s]
+            short = np.maximum(goal[:, s] - production, 0)
+            room = np.maximum(capacity[:, s] * max_utilization - production, 0)
+            if not (short > 0).any():
+                break
+
+            if t is None:
+                units = np.minimum(short, room)
+                held_for = num_years - s        # Carried to the end of the plan
+            else:
+                over_goal = np.maximum(first_shift[:, t] + overtime[:, t] - goal[:, t], 0)
+                units = np.minimum(np.minimum(short, room), over_goal)
+                held_for = t - s                # As if they were sold in year t
+
+                from_overtime = np.minimum(units, overtime[:, t])
+                overtime[:, t] -= from_overtime
+                first_shift[:, t] -= units - from_overtime
+                cost -= from_overtime * extra[:, t]
+
+            to_first = np.clip(capacity[:, s] - first_shift[:, s], 0, units)
+            first_shift[:, s] += to_first
+            overtime[:, s] += units - to_first
+            cost += (units - to_first) * extra[:, s]
+            cost += units * carry[:, s] * held_for
+    return cost
+
+def plan_production(demand, capacity, automation, price=None, starting_inventory=0,
+                    max_utilization=MAX_UTILIZATION, material_cost=MATERIAL_COST,
+                    base_labor_cost=LABOR_COST, overtime_premium=OVERTIME_PREMIUM,
+                    carrying_rate=CARRYING_RATE, target_utilization=None):
+    """
+    Plan production for every product and year.
+
+    Parameters:
+        demand              (products x years) forecast units, like
+                            MarketShare.units.sum(axis=1)
+        capacity            First shift capacity; (products,) or (products x years)
+        automation          Automation level; (products,) or (products x years)
+        price               (products x years) prices, for the margin. None (or nan)
+                            means every sale is worth building for.
+        starting_inventory  (products,) units on hand before year 0
+        max_utilization     Most a plant can build, as a multiple of capacity
+        target_utilization  If given, every year builds at least this much of
+                            its capacity (up to max_utilization), even if it
+                            has to go into inventory. See the module notes.
+
+    Returns a ProductionPlan
+    """
+    demand = np.asarray(demand, dtype=float)
+    num_products, num_years = demand.shape
+
+    shape = demand.shape
+    capacity = _per_year(capacity, shape)
+    labor = _per_year(labor_cost(automation, base_labor_cost), shape)
+    unit_cost = material_cost + labor
+
+    # What it costs to hold a unit for a year, and to build it on the second shift,
+    # at the year it's built
+    carry = carrying_rate * unit_cost
+    extra = overtime_premium * labor
+
+    if price is None:
+        price = np.full((num_products, num_years), np.inf)
+    else:
+        price = np.nan_to_num(_per_year(price, shape), nan=np.inf)
+
+    first_shift = np.zeros((num_products, num_years))
+    overtime = np.zeros((num_products, num_years))
+    sales = np.zeros((num_products, num_years))
+    cost = np.zeros(num_products)
+
+    # Capacity not spoken for yet (column 0 is the starting inventory)
+    spare = np.concatenate((_per_year(starting_inventory, (num_products, 1)),
+                            capacity,
+                            capacity * (max_utilization - 1)), axis=1)
+
+    for t in range(num_years):
+        # Sources usable for year t: inventory, first shift s <= t, overtime s <= t.
+        # Starting inventory is free to use since it's already been paid for.
+        years = np.arange(t + 1)
+        first_cols = 1 + years
+        over_cols = 1 + num_years + years
+        cols = np.concatenate(([0], first_cols, over_cols))
+
+        # A unit built in year s costs that year's unit cost, and so does carrying it
+        build = unit_cost[:, years]
+        hold = carry[:, years] * (t - years)
+        overhead = np.concatenate((np.zeros((num_products, 1)), hold,
+                                   hold + extra[:, years]), axis=1)
+        source_cost = overhead + np.concatenate((np.zeros((num_products, 1)), build, build),
+                                                axis=1)
+
+        available = spare[:, cols] * (source_cost <= price[:, t:t + 1])
+
+        # Take from the cheapest sources until the demand is met
+        order = np.argsort(source_cost, axis=1, kind='stable')
+        sorted_available = np.take_along_axis(available, order, axis=1)
+        before = np.cumsum(sorted_available, axis=1) - sorted_available
+        sorted_take = np.clip(demand[:, t:t + 1] - before, 0, sorted_available)
+
+        take = np.zeros_like(sorted_take)
+        np.put_along_axis(take, order, sorted_take, axis=1)
+
+        spare[:, cols] -= take
+        first_shift[:, years] += take[:, 1:t + 2]
+        overtime[:, years] += take[:, t + 2:]
+        sales[:, t] = take.sum(axis=1)
+        cost += (take * overhead).sum(axis=1)
+
+    # Starting inventory nothing claimed gets carried the whole time
+    cost += spare[:, 0] * carry[:, 0] * num_years
+
+    if target_utilization is not None:
+        goal = capacity * min(target_utilization, max_utilization)
+        cost += _raise_utilization(goal, capacity, max_utilization, first_shift, overtime,
+                                   carry, extra)
+
+    production = first_shift + overtime
+
+    inventory = _per_year(starting_inventory, (num_products, 1)) \
+                + np.cumsum(production - sales, axis=1)
+
+    utilization = np.divide(production, capacity, out=np.zeros_like(production),
+                            where=capacity > 0)
+
+    return ProductionPlan(first_shift=first_shift, overtime=overtime, production=production,
+                          sales=sales, lost_sales=demand - sales, inventory=inventory,
+                          utilization=utilization, cost=cost)
+
+def plan_for_market(market_share, capacity, automation, **kwargs):
+    """
+    plan_production for a MarketShare's forecast, using its products' prices.
+    Takes the same keyword arguments as plan_production.
+    """
+    table = market_share._table
+    return plan_production(market_share.units.sum(axis=1), capacity, automation,
+                           price=table.column('price'), **kwargs)
+
+def overall_utilization(plan, capacity):
+    """
+    Total units built over total first shift capacity, per product
+    """
+    capacity = _per_year(capacity, plan.production.shape)
+    total = capacity.sum(axis=1)
+    return np.divide(plan.production.sum(axis=1), total, out=np.zeros_like(total), where=total > 0)
+
+def capacity_for(plan, target_utilization=1.0):
+    """
+    The capacity each product would need each year to build all of its
+    demand (including the sales this plan lost) at the target utilization
+    """
+    return np.ceil((plan.production + plan.lost_sales) / target_utilization)
@@ -0,0 +1,210 @@
+"""
+Scenarios: a set of market segments plus a plan for every product.
+Nothing in here touches the GUI, so it's safe to use from batch jobs.
+
+On disk a scenario is JSON, like so (segments may be left out to get
+the default ones):
+{
+    "name": "aggressive",
+    "num_years": 10,
+    "segments": [{"name": "Traditional", "starting_point": [5, 15],
+                  "offset": [0, 0], "drift": [0.7, -0.7],
+                  "criteria": {"age": {"mean": 2, "stdev": 1, "importance": 0.47},
+                               "price": {"low": 20, "high": 30, "importance": 0.23},
+                               "position": {"importance": 0.21},
+                               "mtbf": {"low": 14000, "high": 19000, "importance": 0.09}}},
+                 ...],
+    "products": [{"name": "Cake", "performance": 5.6, "size": 14.5,
+                  "mtbf": 17500, "price": 25.5, "year": 0,
+                  "revisions": [{"year": 2, "performance": 6.2, "size": 13.8, "age": 1.2}]},
+                 ...]
+}
+A .jsonl file holds one scenario per line.
+"""
+import hashlib
+import json
+from marketsegment import MarketSegment, Age, Price, Position, MTBF, BuyingCriteria
+from product.model import Product
+from product.table import ProductTable
+
+# Names made up for unnamed scenarios are kept this short (in utf-8), so they
+# fit in a scenario library (scenariolibrary.NAME_DTYPE)
+MAX_DEFAULT_NAME_BYTES = 64
+
+# Stats a revision can change (age is handled separately since it keeps counting up)
+REVISABLE = ('size', 'performance', 'mtbf', 'price')
+
+def default_market_segments():
+    """
+    The segments from our current round
+    """
+    # TODO Not sure about stdev; I'm setting to 1 for now,
+    #      but they should be higher
+    # Fill in customer criteria
+    traditional_criteria = BuyingCriteria(
+            age=Age(mean=2, stdev=1, importance=0.47),
+            price=Price(low=20, high=30, importance=0.23),
+            position=Position(importance=0.21),
+            mtbf = MTBF(low=14000, high=19000, importance=0.09))
+    low_end_criteria = BuyingCriteria(
+            price=Price(low=15, high=25, importance=0.53),
+            age=Age(mean=7, stdev=1, importance=0.24),
+            position=Position(importance=0.16),
+            mtbf = MTBF(low=12000, high=17000, importance=0.07))
+    high_end_criteria = BuyingCriteria(
+            position=Position(importance=0.43),
+            age=Age(mean=0, stdev=1, importance=0.29),
+            mtbf = MTBF(low=20000, high=25000, importance=0.19),
+            price=Price(low=30, high=40, importance=0.09))
+    performance_criteria = BuyingCriteria(
+            mtbf = MTBF(low=22000, high=27000, importance=0.43),
+            position=Position(importance=0.29),
+            price=Price(low=25, high=35, importance=0.19),
+            age=Age(mean=1, stdev=1, importance=0.09))
+    size_criteria = BuyingCriteria(
+            position=Position(importance=0.43),
+            age=Age(mean=1.5, stdev=1, importance=0.29),
+            mtbf = MTBF(low=16000, high=21000, importance=0.19),
+            price=Price(low=25, high=35, importance=0.09))
+
+    # Create segments
+    traditional = MarketSegment(
+            starting_point=(5, 15), offset=(0, 0), drift=(0.7, -0.7),
+            customer_criteria=traditional_criteria, name="Traditional")
+    low_end = MarketSegment(
+            starting_point=(2.5, 17.5), offset=(-0.8, 0.8), drift=(0.5, -0.5),
+            customer_criteria=low_end_criteria, name="Low End")
+    performance = MarketSegment(
+            starting_point=(8, 17), offset=(1.4, -1.0), drift=(1.0, -0.7),
+            customer_criteria=performance_criteria, name="Performance")
+    high_end = MarketSegment(
+            starting_point=(7.5, 12.5), offset=(1.4, -1.4), drift=(0.9, -0.9),
+            customer_criteria=high_end_criteria, name="High End")
+    size = MarketSegment(
+            starting_point=(3, 12), offset=(1.0, -1.4), drift=(0.7, -1.0),
+            customer_criteria=size_criteria, name="Size")
+
+    return [low_end, traditional, high_end, performance, size]
+
+def default_products(num_years, table=None):
+    """
+    Our products at the start of the simulation (all of them share one table)
+    """
+    if table is None:
+        table = ProductTable(num_years)
+
+    cake = Product("Cake", performance=5.6, size=14.5, mtbf=17500, year=0, num_years=num_years, table=table)
+    cedar = Product("Cedar", performance=3.0, size=17.0, mtbf=14000, year=0, num_years=num_years, table=table)
+    cid = Product("Cid", performance=8.0, size=11.9, mtbf=23000, year=0, num_years=num_years, table=table)
+    coat = Product("Coat", performance=7.4, size=13.2, mtbf=26000, year=0, num_years=num_years, table=table)
+    cure = Product("Cure", performance=6.4, size=10.2, mtbf=20400, year=0, num_years=num_years, table=table)
+
+    return [cake, cedar, cid, coat, cure]
+
+def segment_from_dict(d):
+    c = d['criteria']
+    criteria = BuyingCriteria(age=Age(**c['age']), price=Price(**c['price']),
+                              position=Position(**c['position']), mtbf=MTBF(**c['mtbf']))
+    return MarketSegment(starting_point=tuple(d['starting_point']), offset=tuple(d['offset']),
+                         drift=tuple(d['drift']), customer_criteria=criteria, name=d['name'])
+
+def segment_to_dict(ms):
+    return {
+        'name': ms._name,
+        'starting_point': list(ms.starting_point),
+        'offset': list(ms.offset),
+        'drift': list(ms.drift),
+        'criteria': {k: v._asdict() for k, v in ms.criteria._asdict().items()},
+    }
+
+def product_from_dict(d, table):
+    """
+    Create a product in the given table and apply its revisions in order
+    """
+    p = Product(d['name'], size=d['size'], performance=d['performance'], mtbf=d['mtbf'],
+                price=d.get('price'), year=d.get('year', 0), table=table)
+    for r in d.get('revisions', []):
+        p.update_stats(r['year'], **{k: v for k, v in r.items() if k != 'year'})
+    return p
+
+def product_to_dict(p):
+    """
+    Turn a product's timeline back into its starting stats plus a revision
+    for every year something changed
+    """
+    table, row = p._table, p._row
+    alive = table.column('alive')[row]
+    year = int(alive.argmax()) if alive.any() else 0
+
+    d = {k: float(table.get(k, row, year)) for k in REVISABLE}
+    d['name'] = p._name
+    d['year'] = year
+    if d['price'] != d['price']:
+        d['price'] = None   # nan means we never set it
+
+    revisions = []
+    for t in range(year + 1, table.num_years):
+        r = {k: float(table.get(k, row, t)) for k in REVISABLE
+             if table.get(k, row, t) != table.get(k, row, t - 1)
+             and table.get(k, row, t) == table.get(k, row, t)}
+        if table.get('age', row, t) != table.get('age', row, t - 1) + 1:
+            r['age'] = float(table.get('age', row, t))
+        if r:
+            r['year'] = t
+            revisions.append(r)
+    d['revisions'] = revisions
+    return d
+
+def from_dict(d):
+    """
+    Returns (name, num_years, market_segments, products, table)
+    """
+    num_years = d['num_years']
+    if 'segments' in d:
+        market_segments = [segment_from_dict(s) for s in d['segments']]
+    else:
+        market_segments = default_market_segments()
+
+    table = ProductTable(num_years, capacity=max(len(d['products']), 1))
+    products = [product_from_dict(p, table) for p in d['products']]
+    return d.get('name'), num_years, market_segments, products, table
+
+def to_dict(name, num_years, market_segments, products):
+    return {
+        'name': name,
+        'num_years': num_years,
+        'segments': [segment_to_dict(ms) for ms in market_segments],
+        'products': [product_to_dict(p) for p in products],
+    }
+
+def _default_name(name):
+    """
+    Shorten a made-up name to MAX_DEFAULT_NAME_BYTES. The end of a path is the
+    useful part, so that's what's kept, after a hash of the whole name so two
+    long paths ending the same way still get different names.
+    """
+    encoded = name.encode('utf-8')
+    if len(encoded) <= MAX_DEFAULT_NAME_BYTES:
+        return name
+    digest = hashlib.blake2b(encoded, digest_size=4).hexdigest()
+    tail = encoded[len(digest) + 3 - MAX_DEFAULT_NAME_BYTES:]
+    return f"{digest}...{tail.decode('utf-8', errors='ignore')}"
+
+def iter_scenario_dicts(paths):
+    """
+    Lazily read scenarios out of .json (one scenario) and .jsonl
+    (one scenario per line) files. Scenarios without a name are named
+    after their file (and line), shortened if need be.
+    """
+    for path in paths:
+        with open(path) as f:
+            if path.endswith('.jsonl'):
+                for i, line in enumerate(f):
+                    if line.strip():
+                        d = json.loads(line)
+                        d.setdefault('name', _default_name(f"{path}:{i}"))
+                        yield d
+            else:
+                d = json.load(f)
+                d.setdefault('name', _default_name(path))
+                yield d
@@ -0,0 +1,304 @@
+"""
+A compact binary format for lots of scenarios (see scenario.py for what a
+scenario is).
+
+A library is a directory of flat binary columns plus a small layout.json:
+    layout.json             Format version, num_years, row counts, dtypes
+    scenario_names.bin      One fixed-width name per scenario
+    segment_start.bin       Index of each scenario's first segment row (plus one past the end)
+    segment_names.bin       One fixed-width name per segment row
+    segment_params.bin      One row of SEGMENT_FIELDS per segment
+    product_start.bin       Index of each scenario's first product row (plus one past the end)
+    product_names.bin       One fixed-width name per product row
+    <column>.bin            One (products x years) block per ProductTable column
+
+Everything gets memory-mapped when a library is opened, so opening one is
+instant no matter how big it is, and a scenario is only read off disk
+when it's used.
+
+To convert JSON scenarios (which must all have the same num_years):
+    python scenariolibrary.py scenarios/*.jsonl -o library/
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import numpy as np
+import scenario
+from marketsegment import MarketSegment, Age, Price, Position, MTBF, BuyingCriteria
+from product.model import Product
+from product.table import ProductTable
+
+FORMAT_VERSION = 1
+
+# Names are stored as fixed-width utf-8
+NAME_DTYPE = 'S64'
+
+# Columns of segment_params.bin
+SEGMENT_FIELDS = (
+    'start_x', 'start_y', 'offset_x', 'offset_y', 'drift_x', 'drift_y',
+    'age_mean', 'age_stdev', 'age_importance',
+    'price_low', 'price_high', 'price_importance',
+    'position_importance',
+    'mtbf_low', 'mtbf_high', 'mtbf_importance',
+)
+
+def _segment_row(ms):
+    c = ms.criteria
+    return (*ms.starting_point, *ms.offset, *ms.drift,
+            c.age.mean, c.age.stdev, c.age.importance,
+            c.price.low, c.price.high, c.price.importance,
+            c.position.importance,
+            c.mtbf.low, c.mtbf.high, c.mtbf.importance)
+
+def _segment_from_row(row, name):
+    r = dict(zip(SEGMENT_FIELDS, (float(v) for v in row)))
+    criteria = BuyingCriteria(
+            age=Age(mean=r['age_mean'], stdev=r['age_stdev'], importance=r['age_importance']),
+            price=Price(low=r['price_low'], high=r['price_high'], importance=r['price_importance']),
+            position=Position(importance=r['position_importance']),
+            mtbf=MTBF(low=r['mtbf_low'], high=r['mtbf_high'], importance=r['mtbf_importance']))
+    return MarketSegment(starting_point=(r['start_x'], r['start_y']),
+                         offset=(r['offset_x'], r['offset_y']),
+                         drift=(r['drift_x'], r['drift_y']),
+                         customer_criteria=criteria, name=name)
+
+def _encode(name):
+    encoded = name.encode('utf-8')
+    if len(encoded) > np.dtype(NAME_DTYPE).itemsize:
+        raise ValueError(f"{name!r} is too long to store "
+                         f"(at most {np.dtype(NAME_DTYPE).itemsize} bytes of utf-8)")
+    return encoded
+
+class ScenarioLibraryWriter:
+    """
+    Appends scenarios to a new library one at a time, so a library can be
+    much bigger than memory. Use it as a context manager (or call close()).
+    If the with block raises, layout.json isn't written, so the half-written
+    library can't be opened by mistake.
+    """
+    def __init__(self, path, num_years):
+        """
+        Parameters:
+            path            Directory to create the library in
+            num_years       Every scenario in a library has this many years
+        """
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+
+        # Writing over an old library: its layout would describe the wrong files
+        # until close(), and forever if the write fails
+        if is_library(path):
+            os.remove(os.path.join(path, 'layout.json'))
+        self._num_years = num_years
+        self._num_scenarios = 0
+        self._num_segments = 0
+        self._num_products = 0
+
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), 'wb')
+                       for name in ('scenario_names', 'segment_start', 'segment_names',
+                                    'segment_params', 'product_start', 'product_names',
+                                    *ProductTable.COLUMNS)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write(self, name, array, dtype):
+        self._files[name].write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+    def add(self, name, market_segments, products):
+        """
+        Append a scenario. The products must all be in the same ProductTable
+        (with num_years years), and be all of the products in it. A scenario
+        with no products is fine too.
+
+        Raises ValueError if a name is too long to store or the products
+        don't have num_years years; nothing gets written in that case.
+        """
+        if products:
+            table = products[0]._table
+            if table.num_years != self._num_years:
+                raise ValueError(f"Scenario {name!r} has {table.num_years} years, "
+                                 f"but this library has {self._num_years}")
+            assert(len(table) == len(products))
+            product_names = table.names
+            columns = {c: table.column(c) for c in ProductTable.COLUMNS}
+        else:
+            product_names = []
+            columns = {c: np.zeros((0, self._num_years)) for c in ProductTable.COLUMNS}
+
+        # Encode everything first, so a bad name can't leave half a scenario behind
+        encoded_name = _encode(name)
+        segment_names = [_encode(ms._name) for ms in market_segments]
+        product_names = [_encode(n) for n in product_names]
+
+        self._write('scenario_names', [encoded_name], NAME_DTYPE)
+        self._write('segment_start', [self._num_segments], np.int64)
+        self._write('product_start', [self._num_products], np.int64)
+
+        self._write('segment_names', segment_names, NAME_DTYPE)
+        self._write('segment_params', [_segment_row(ms) for ms in market_segments], np.float64)
+        self._write('product_names', product_names, NAME_DTYPE)
+        for column, dtype in ProductTable.COLUMNS.items():
+            self._write(column, columns[column], dtype)
+
+        self._num_scenarios += 1
+        self._num_segments += len(market_segments)
+        self._num_products += len(products)
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files = None
+
+    def abort(self):
+        """
+        Close the files without writing layout.json
+        """
+        if self._files is not None:
+            self._close_files()
+
+    def close(self):
+        if self._files is None:
+            return
+
+        # One past the end, so scenario i's rows are start[i]:start[i+1]
+        self._write('segment_start', [self._num_segments], np.int64)
+        self._write('product_start', [self._num_products], np.int64)
+        self._close_files()
+
+        layout = {
+            'version': FORMAT_VERSION,
+            'num_years': self._num_years,
+            'num_scenarios': self._num_scenarios,
+            'num_segments': self._num_segments,
+            'num_products': self._num_products,
+            'columns': {c: np.dtype(d).str for c, d in ProductTable.COLUMNS.items()},
+        }
+        with open(os.path.join(self._path, 'layout.json'), 'w') as f:
+            json.dump(layout, f, indent=4)
+
+def write_library(path, num_years, scenarios):
+    """
+    Write an iterable of (name, market_segments, products) to a new library.
+    Returns how many scenarios were written.
+    """
+    with ScenarioLibraryWriter(path, num_years) as writer:
+        for name, market_segments, products in scenarios:
+            writer.add(name, market_segments, products)
+        return writer._num_scenarios
+
+class ScenarioLibrary:
+    """
+    Read-only, memory-mapped view of a library written by ScenarioLibraryWriter
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'layout.json')) as f:
+            layout = json.load(f)
+        assert(layout['version'] == FORMAT_VERSION)
+
+        self.num_years = layout['num_years']
+        n, s, p = layout['num_scenarios'], layout['num_segments'], layout['num_products']
+
+        def open_column(name, dtype, shape):
+            if 0 in shape:
+                return np.zeros(shape, dtype=dtype)     # Can't mmap an empty file
+            return np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=shape)
+
+        self._scenario_names = open_column('scenario_names', NAME_DTYPE, (n,))
+        self._segment_start = open_column('segment_start', np.int64, (n + 1,))
+        self._segment_names = open_column('segment_names', NAME_DTYPE, (s,))
+        self._segment_params = open_column('segment_params', np.float64, (s, len(SEGMENT_FIELDS)))
+        self._product_start = open_column('product_start', np.int64, (n + 1,))
+        self._product_names = open_column('product_names', NAME_DTYPE, (p,))
+        self._columns = {c: open_column(c, np.dtype(d), (p, self.num_years))
+                         for c, d in layout['columns'].items()}
+
+    def __len__(self):
+        return len(self._scenario_names)
+
+    def name(self, i):
+        return self._scenario_names[i].decode('utf-8')
+
+    def names(self):
+        return [n.decode('utf-8') for n in self._scenario_names]
+
+    def _rows(self, start, i):
+        return slice(int(start[i]), int(start[i + 1]))
+
+    def market_segments(self, i):
+        """
+        Build scenario i's MarketSegment objects
+        """
+        rows = self._rows(self._segment_start, i)
+        return [_segment_from_row(row, name.decode('utf-8'))
+                for row, name in zip(self._segment_params[rows], self._segment_names[rows])]
+
+    def product_names(self, i):
+        return [n.decode('utf-8') for n in self._product_names[self._rows(self._product_start, i)]]
+
+    def columns(self, i):
+        """
+        Scenario i's product timelines as {column: (products x years) array}.
+        These are views into the memory map; nothing is copied.
+        """
+        rows = self._rows(self._product_start, i)
+        return {c: a[rows] for c, a in self._columns.items()}
+
+    def scenario(self, i):
+        """
+        Build scenario i as objects.
+        Returns (name, num_years, market_segments, products, table)
+        """
+        names = self.product_names(i)
+        columns = self.columns(i)
+
+        table = ProductTable(self.num_years, capacity=max(len(names), 1))
+        products = []
+        for row, name in enumerate(names):
+            products.append(Product(name, size=0, performance=0, mtbf=0, table=table))
+            for c in ProductTable.COLUMNS:
+                table.column(c)[row] = columns[c][row]
+
+        return self.name(i), self.num_years, self.market_segments(i), products, table
+
+def is_library(path):
+    return os.path.isfile(os.path.join(path, 'layout.json'))
+
+def from_scenario_dicts(path, dicts):
+    """
+    Write scenario dicts (see scenario.py) to a new library.
+    Returns how many scenarios were written.
+    """
+    dicts = iter(dicts)
+    first = next(dicts, None)
+    if first is None:
+        return write_library(path, 0, ())
+
+    def scenarios():
+        for d in itertools.chain([first], dicts):
+            name, _, market_segments, products, _ = scenario.from_dict(d)
+            yield name, market_segments, products
+
+    return write_library(path, first['num_years'], scenarios())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert JSON scenarios to a binary library")
+    parser.add_argument('paths', nargs='+', help=".json or .jsonl scenario files")
+    parser.add_argument('-o', '--output', required=True, help="library directory to create")
+    args = parser.parse_args(argv)
+
+    count = from_scenario_dicts(args.output, scenario.iter_scenario_dicts(args.paths))
+    print(f"Wrote {count} scenarios to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
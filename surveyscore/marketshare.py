@@ -0,0 +1,104 @@
+"""
+Turn survey scores into demand.
+
+Notes:
+ - Each segment's demand is split between products in proportion to
+   their survey scores (a product outside a segment's rough cut circle
+   gets nothing there, however good its age, price and MTBF are).
+ - Segment demand grows by a fixed rate every year.
+ - Products that aren't in production don't sell anything.
+"""
+import numpy as np
+from depgraph import Memo, SAME_ENTRY, ALL_PRODUCTS
+import instrument
+from surveyscore.scoregraph import ScoreGraph
+
+class MarketShare:
+    """
+    Unit demand and market share of every product in every segment for every
+    year. Only the products/years/segments that changed get recomputed (see
+    depgraph.py), and only when they're looked at.
+    """
+    def __init__(self, table, market_segments, segment_sizes, growth_rates, graph=None):
+        """
+        Parameters:
+            table               ProductTable holding the products
+            market_segments     A list of MarketSegment objects
+            segment_sizes       Units demanded by each segment in year 0
+            growth_rates        Yearly growth rate of each segment (0.1 is 10%)
+            graph               ScoreGraph to take scores from, if one's already
+                                around for this table and these segments (it
+                                has to be a rough_cut one)
+        """
+        assert(len(segment_sizes) == len(market_segments) == len(growth_rates))
+        assert(graph is None or graph.rough_cut)
+
+        self._table = table
+        self._market_segments = market_segments
+        self.graph = graph if graph is not None else ScoreGraph(table, market_segments,
+                                                                rough_cut=True)
+
+        years = np.arange(table.num_years)
+        sizes = np.asarray(segment_sizes, dtype=float)[:, None]
+        growth = np.asarray(growth_rates, dtype=float)[:, None]
+
+        # (segments x years)
+        self.demand = sizes * (1 + growth)**years
+
+        # A product's share depends on every product's score in the segment
+        scores = self.graph.scores
+        self._share = Memo("share", self._compute_share, self.graph.shape,
+                           inputs=[(scores, ALL_PRODUCTS)])
+        self._units = Memo("units", self._compute_units, self.graph.shape,
+                           inputs=[(self._share, SAME_ENTRY)])
+
+        self.recompute()
+
+    # (products x segments x years) arrays; don't modify them
+    @property
+    def scores(self):
+        return self.graph.scores.get()
+
+    @property
+    def share(self):
+        return self._share.get()
+
+    @property
+    def units(self):
+        return self._units.get()
+
+    @instrument.timed("marketshare.recompute")
+    def recompute(self, t=0):
+        """
+        Rescore every product from year t onward (right away)
+        """
+        self.graph.scores.invalidate(from_year=t)
+        self._units.get()
+
+    @instrument.timed("marketshare.product_changed")
+    def product_changed(self, name, t):
+        """
+        A product changed from year t onward. Only it gets rescored (though
+        every product's share from t onward gets redone), the next time
+        anything is looked at.
+        """
+        self.graph.product_changed(name, t)
+
+    def _compute_share(self, rows, segments, years):
+        """
+        Split each segment's demand by score
+        """
+        scores = self.scores[:, segments][:, :, years]
+        total = scores.sum(axis=0, keepdims=True)
+        share = np.divide(scores, total, out=np.zeros_like(scores), where=total > 0)
+        return share[rows]
+
+    def _compute_units(self, rows, segments, years):
+        share = self.share[np.ix_(rows, segments, years)]
+        return share * self.demand[np.ix_(segments, years)][None]
+
+    def listen(self, bus=None):
+        """
+        Keep up to date with product changes (see ProductListener.listen)
+        """
+        self.graph.listen(bus)
@@ -0,0 +1,148 @@
+"""
+Monte Carlo forecasting of survey scores.
+
+We don't actually know the segments' drifts, ideal spot offsets, or age
+stdevs very well (see the TODO about stdevs in scenario.py), so this
+samples lots of perturbed versions of them and reports how the scores
+are spread out.
+
+Notes:
+ - Samples are drawn as arrays, a chunk at a time, so no MarketSegment
+   objects get built per sample and memory doesn't grow with num_samples.
+ - Every perturbed quantity gets its own random stream (see sample_streams),
+   so for a given seed the results don't depend on chunk_size.
+ - Percentiles come from a histogram of scores that gets added to every
+   chunk, so they're accurate to 1/bins.
+"""
+from collections import namedtuple
+import numpy as np
+from surveyscore.score import (age_score, price_score, mtbf_score,
+                               positioning_score, segment_weights, segment_arrays)
+
+# percentiles maps each requested percentile to a (products x segments x years) array
+MonteCarloResult = namedtuple('MonteCarloResult', ['percentiles', 'mean', 'num_samples'])
+
+def sample_streams(rng, num_segments):
+    """
+    Split rng into one stream per perturbed quantity, plus one per segment for
+    the importances. Each stream is drawn from in sample order, so sample i
+    comes out the same whether it's drawn in one chunk or a hundred.
+    """
+    drift, offset, age_stdev, *weights = rng.spawn(3 + num_segments)
+    return {'drift': drift, 'offset': offset, 'age_stdev': age_stdev, 'weights': weights}
+
+def sample_segments(market_segments, n, rng, drift_sd=0.1, offset_sd=0.2,
+                    age_stdev_scale=(1, 2), importance_concentration=None):
+    """
+    Draw n perturbed copies of every segment as arrays.
+
+    Parameters:
+        rng                         A numpy Generator, or streams from sample_streams
+                                    (pass those when drawing in chunks)
+        drift_sd                    Stdev of the noise added to each drift component
+        offset_sd                   Stdev of the noise added to each ideal spot offset component
+        age_stdev_scale             The age stdev is multiplied by a factor drawn
+                                    uniformly from this (low, high) range
+        importance_concentration    If given, importances are drawn from a
+                                    Dirichlet centered on the real ones; bigger
+                                    means closer to the real ones
+
+    Returns a dict of arrays whose first two axes are (samples x segments):
+    start, drift, offset (trailing axis of 2), age_stdev, weights (trailing axis of 4)
+    """
+    num_segments = len(market_segments)
+    if isinstance(rng, np.random.Generator):
+        rng = sample_streams(rng, num_segments)
+    start = np.array([ms._starting_point for ms in market_segments], dtype=float)
+    drift = np.array([ms._drift for ms in market_segments], dtype=float)
+    offset = np.array([ms._offset for ms in market_segments], dtype=float)
+    age_stdev = np.array([ms._criteria.age.stdev for ms in market_segments], dtype=float)
+    weights = segment_weights(market_segments)
+
+    low, high = age_stdev_scale
+    samples = {
+        'start': np.broadcast_to(start, (n, num_segments, 2)),
+        'drift': drift + rng['drift'].normal(0, drift_sd, (n, num_segments, 2)),
+        'offset': offset + rng['offset'].normal(0, offset_sd, (n, num_segments, 2)),
+        'age_stdev': age_stdev * rng['age_stdev'].uniform(low, high, (n, num_segments)),
+        'weights': np.broadcast_to(weights, (n, num_segments, 4)),
+    }
+    if importance_concentration is not None:
+        # Dirichlet can't take zeros, so keep those at zero by hand
+        alpha = np.maximum(weights * importance_concentration, 1e-9)
+        samples['weights'] = np.stack([g.dirichlet(a, n) for g, a in zip(rng['weights'], alpha)],
+                                      axis=1)
+    return samples
+
+def simulate(performance, size, mtbf, price, age, market_segments, num_samples=10000,
+             chunk_size=1000, percentiles=(5, 50, 95), bins=1000, seed=None, **perturbation):
+    """
+    Score every product against num_samples perturbed futures.
+
+    Parameters:
+        performance, size, mtbf, price, age
+                            (products x years) arrays of product timelines
+        market_segments     A list of MarketSegment objects to perturb
+        num_samples         How many futures to sample in total
+        chunk_size          How many futures to score at once (bounds memory)
+        percentiles         Which percentiles to report (0-100)
+        bins                Histogram resolution of the scores
+        seed                Seed for the random number generator
+        perturbation        Passed to sample_segments (drift_sd, offset_sd, ...)
+
+    Returns a MonteCarloResult
+    """
+    rng = sample_streams(np.random.default_rng(seed), len(market_segments))
+    performance, size, mtbf, price, age = (np.atleast_2d(np.asarray(a, dtype=float))
+            for a in (performance, size, mtbf, price, age))
+    num_products, num_years = performance.shape
+    num_segments = len(market_segments)
+    years = np.arange(num_years, dtype=float)
+
+    # Price and mtbf aren't perturbed, so they're scored once (products x segments x years)
+    fixed = segment_arrays(market_segments, years)
+    fixed_price = price_score(price[:, None, :], fixed['price_low'], fixed['price_high'])
+    fixed_mtbf = mtbf_score(mtbf[:, None, :], fixed['mtbf_low'], fixed['mtbf_high'])
+    age_mean = fixed['age_mean']
+    position = np.stack((performance, size), axis=-1)[:, None, :, :]   # P x 1 x T x 2
+
+    counts = np.zeros(num_products * num_segments * num_years * bins, dtype=np.int64)
+    cell = np.arange(num_products * num_segments * num_years).reshape(
+            num_products, num_segments, num_years) * bins
+    total = np.zeros((num_products, num_segments, num_years))
+
+    done = 0
+    while done < num_samples:
+        n = min(chunk_size, num_samples - done)
+        s = sample_segments(market_segments, n, rng, **perturbation)
+
+        # Everything below is (samples x products x segments x years)
+        centroid = s['start'][:, :, None, :] + s['drift'][:, :, None, :] * years[:, None]
+        pos = positioning_score(centroid[:, None], s['offset'][:, None, :, None, :], position)
+        ages = age_score(age[None, :, None, :], age_mean, s['age_stdev'][:, None, :, None])
+
+        w = s['weights'][:, None, :, None, :]
+        scores = (w[..., 0] * ages + w[..., 1] * fixed_price
+                  + w[..., 2] * pos + w[..., 3] * fixed_mtbf)
+
+        which_bin = np.clip((scores * bins).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((cell + which_bin).ravel(), minlength=len(counts))
+        total += scores.sum(axis=0)
+        done += n
+
+    # Walk up each cell's histogram until we pass the requested fraction
+    cdf = counts.reshape(num_products, num_segments, num_years, bins).cumsum(axis=-1)
+    result = {}
+    for q in percentiles:
+        first = (cdf >= q / 100 * num_samples).argmax(axis=-1)
+        result[q] = (first + 0.5) / bins
+
+    return MonteCarloResult(result, total / num_samples, num_samples)
+
+def simulate_table(table, market_segments, **kwargs):
+    """
+    Same as simulate, but reads the product timelines out of a ProductTable
+    """
+    return simulate(table.column('performance'), table.column('size'),
+                    table.column('mtbf'), table.column('price'),
+                    table.column('age'), market_segments, **kwargs)
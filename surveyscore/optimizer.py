@@ -0,0 +1,143 @@
+"""
+Find where to put products (performance, size, mtbf, price) each year
+to get the best survey score in a segment we're aiming for.
+
+Notes:
+ - The survey score is a weighted sum of independent parts, so position,
+   price, and mtbf are each picked from their own candidate grid. That's
+   exact, and way cheaper than trying every combination.
+ - R&D can only move a product so far in a year, so positions are picked
+   greedily year by year, starting from where the product is now.
+ - Age isn't something we pick; it comes from the product's timeline.
+"""
+from collections import namedtuple
+import numpy as np
+from surveyscore.score import (age_score, price_score, mtbf_score, positioning_score,
+                               segment_weights, ROUGH_CUT_RADIUS)
+
+# Each field is a (years,) array. Years before the start are copied from the product.
+Plan = namedtuple('Plan', ['performance', 'size', 'mtbf', 'price', 'score'])
+
+def _disk(step, radius=ROUGH_CUT_RADIUS):
+    """
+    Offsets (N x 2) of every grid point within radius of the origin
+    """
+    r = np.arange(-radius, radius + step / 2, step)
+    xs, ys = np.meshgrid(r, r)
+    inside = xs**2 + ys**2 <= radius**2
+    return np.column_stack((xs[inside], ys[inside]))
+
+def optimize_products(products, targets, start=0, max_move=1.5, step=0.1,
+                      price_step=0.1, mtbf_choices=None):
+    """
+    Plan every product's stats from year start onward.
+
+    Parameters:
+        products        Products to plan (they may live in different tables,
+                        but all need the same number of years)
+        targets         The MarketSegment each product is aimed at
+                        (same order as products)
+        start           First year to plan; earlier years are left alone
+        max_move        How far (in perceptual map units) a product can move
+                        in a single year
+        step            Spacing of the position grid
+        price_step      Spacing of the price grid
+        mtbf_choices    MTBFs to choose from. Defaults to every 500 hours
+                        between 12000 and 27000.
+
+    Returns a dict mapping product names to a Plan
+    """
+    assert(len(products) == len(targets))
+    num_years = products[0]._table.num_years
+    assert(all(p._table.num_years == num_years for p in products))
+    assert(0 <= start < num_years)
+
+    if mtbf_choices is None:
+        mtbf_choices = np.arange(12000, 27001, 500)
+    mtbf_choices = np.sort(np.asarray(mtbf_choices, dtype=float))
+
+    def timeline(column):
+        return np.array([p._table.column(column)[p._row] for p in products], dtype=float)
+
+    # (products x years); years >= start get overwritten below
+    performance, size = timeline('performance'), timeline('size')
+    mtbf, price, age = timeline('mtbf'), timeline('price'), timeline('age')
+    total = np.zeros_like(performance)
+
+    weights = segment_weights(targets)                  # products x 4
+    offset = np.array([ms._offset for ms in targets], dtype=float)
+    mtbf_range = np.array([ms.get_mtbf_range() for ms in targets], dtype=float)
+    age_params = np.array([(ms._criteria.age.mean, ms._criteria.age.stdev)
+                           for ms in targets], dtype=float)
+
+    # Candidate positions relative to the segment centroid. Everything outside
+    # the rough cut circle scores 0, so it never gets looked at.
+    disk = _disk(step)
+
+    # MTBF score doesn't depend on the year
+    mtbf_scores = mtbf_score(mtbf_choices[None, :], mtbf_range[:, :1], mtbf_range[:, 1:])
+    best_mtbf = mtbf_choices[mtbf_scores.argmax(axis=1)]   # ties go to the cheaper one
+    best_mtbf_score = mtbf_scores.max(axis=1)
+
+    position = np.column_stack((performance[:, start], size[:, start]))
+    rows = np.arange(len(products))
+    for t in range(start, num_years):
+        centroid = np.array([ms.trajectory.location(t) for ms in targets])
+        price_range = np.array([ms.trajectory.price_range(t) for ms in targets])
+
+        # Position: best candidate we can reach from last year's position
+        candidates = centroid[:, None, :] + disk[None, :, :]
+        reachable = np.hypot(*(candidates - position[:, None, :]).transpose(2, 0, 1)) <= max_move
+        pos_scores = positioning_score(centroid[:, None, :], offset[:, None, :], candidates)
+        pos_scores = np.where(reachable, pos_scores, -1)
+        best = pos_scores.argmax(axis=1)
+        best_pos_score = np.maximum(pos_scores[rows, best], 0)
+        stuck = ~reachable.any(axis=1)
+
+        new_position = candidates[rows, best]
+        if stuck.any():
+            # Too far away to get in range this year; head for the ideal spot
+            heading = centroid[stuck] + offset[stuck] - position[stuck]
+            distance = np.hypot(heading[:, 0], heading[:, 1])[:, None]
+            new_position[stuck] = position[stuck] + heading * np.minimum(max_move / distance, 1)
+            best_pos_score[stuck] = positioning_score(centroid[stuck], offset[stuck], new_position[stuck])
+        position = new_position
+
+        # Price: anything past $5 outside the range fails the rough cut
+        low, high = price_range[:, :1], price_range[:, 1:]
+        price_choices = np.arange(-5, (high - low).max() + 5 + price_step / 2, price_step)[None, :] + low
+        price_scores = price_score(price_choices, low, high)
+        best_price = price_choices[rows, price_scores.argmax(axis=1)]
+
+        # Ordered like CRITERIA
+        scores = np.column_stack((
+            age_score(age[:, t], age_params[:, 0], age_params[:, 1]),
+            price_scores.max(axis=1),
+            best_pos_score,
+            best_mtbf_score,
+        ))
+
+        performance[:, t], size[:, t] = position[:, 0], position[:, 1]
+        mtbf[:, t], price[:, t] = best_mtbf, best_price
+        total[:, t] = (scores * weights).sum(axis=1)
+
+    return {p._name: Plan(performance[i], size[i], mtbf[i], price[i], total[i])
+            for i, p in enumerate(products)}
+
+def optimize_product(product, target, **kwargs):
+    """
+    Plan a single product; takes the same keyword arguments as optimize_products
+    """
+    return optimize_products([product], [target], **kwargs)[product._name]
+
+def apply_plan(product, plan, start=0):
+    """
+    Write a plan into a product's timeline, one revision per year that changes
+    """
+    previous = None
+    for t in range(start, len(plan.score)):
+        stats = {k: float(getattr(plan, k)[t]) for k in ('performance', 'size', 'mtbf', 'price')}
+        changed = {k: v for k, v in stats.items() if previous is None or previous[k] != v}
+        if changed:
+            product.update_stats(t, **changed)
+        previous = stats
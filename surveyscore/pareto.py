@@ -0,0 +1,262 @@
+"""
+Pareto frontier of a product's stats across several segments.
+
+Products like Cake or Cid sit between two segment circles, so moving
+them toward one segment costs score in the other. This finds every
+(performance, size, MTBF, price) choice for one year that isn't beaten
+in every segment at once by some other choice; what's left is the menu
+of trade-offs.
+
+Notes:
+ - Each segment's score is a weighted sum of independent parts, and every
+   part only ever helps. So a position whose scores are
+   beaten in every segment by another position can't be part of anything
+   on the frontier, and the same goes for prices and MTBFs. Each part's
+   choices get pruned that way before they're combined, which is exact
+   and keeps the combinations down to something reasonable.
+ - Only survey scores are objectives. Cost isn't, so more MTBF is always
+   at least as good; pass mtbf_choices to cap it.
+ - Candidates are scored in chunks of plain arrays, so searches can run
+   on a ComputeExecutor (see worker.py).
+"""
+from collections import namedtuple
+import numpy as np
+from surveyscore.score import (age_score, price_score, mtbf_score, positioning_score,
+                               segment_weights, segment_arrays)
+from surveyscore.optimizer import _disk
+
+# Each field has one entry per point on the frontier, best total score first.
+# scores is (points x segments), segments are the indices of the segments traded off.
+Frontier = namedtuple('Frontier', ['performance', 'size', 'mtbf', 'price', 'scores', 'segments'])
+
+# With no segments picked, the product is traded off between this many of
+# the nearest ones. Every extra objective makes the frontier a lot bigger.
+NEAREST_SEGMENTS = 2
+
+# (position step, price step) of the candidate grids for 1-2 objectives, and
+# the coarser ones used for more
+FINE_GRID = (0.1, 0.1)
+COARSE_GRID = (0.25, 0.5)
+
+def _dominated_by(front, points, chunk_size):
+    """
+    Which points some point in front is >= in every objective (in blocks of
+    about chunk_size**2 comparisons, so memory stays bounded)
+    """
+    dominated = np.zeros(len(points), dtype=bool)
+    if len(front) == 0:
+        return dominated
+    block = max(chunk_size**2 // len(front), 1)
+    for start in range(0, len(points), block):
+        p = points[start:start + block]
+        dominated[start:start + block] = (front[:, None, :] >= p[None, :, :]).all(axis=-1).any(axis=0)
+    return dominated
+
+def _pareto_front_2d(objectives):
+    """
+    pareto_front for one or two objectives: sorted by the first (best first),
+    a point is on the front if its second beats every point before it
+    """
+    if objectives.shape[1] == 1:
+        objectives = np.column_stack((objectives, objectives))
+    first, second = objectives[:, 0], objectives[:, 1]
+
+    # lexsort is stable, so of identical points the first one comes first
+    order = np.lexsort((-second, -first))
+    best_before = np.maximum.accumulate(second[order])
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = second[order][1:] > best_before[:-1]
+    front = order[keep]
+    return front[np.argsort(-objectives[front].sum(axis=1), kind='stable')]
+
+def pareto_front(objectives, chunk_size=1024):
+    """
+    Indices of the points that no other point beats in every objective
+    (bigger is better). Of identical points, only the first is kept.
+
+    Parameters:
+        objectives      (points x objectives) array
+        chunk_size      How many points get compared against each other at once
+
+    Returns an array of indices, biggest total first
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    if len(objectives) == 0:
+        return np.zeros(0, dtype=int)
+    if objectives.shape[1] <= 2:
+        return _pareto_front_2d(objectives)
+
+    # More objectives than that don't have a nice sort, so: anything that
+    # beats a point has a bigger total, so going from the biggest
+    # total down, nothing can beat the points before it
+    remaining = np.argsort(-objectives.sum(axis=1), kind='stable')
+
+    front = []
+    while len(remaining):
+        chunk, remaining = remaining[:chunk_size], remaining[chunk_size:]
+
+        # The biggest totals left only have to be checked against each other.
+        # Of identical points, the earlier one wins.
+        points = objectives[chunk]
+        at_least = (points[:, None, :] >= points[None, :, :]).all(axis=-1)
+        same = at_least & at_least.T
+        beats = at_least & (~same | np.triu(same, k=1))
+        new = chunk[~beats.any(axis=0)]
+        front.append(new)
+
+        # Whatever they beat (or equal) is out, which usually leaves very little
+        remaining = remaining[~_dominated_by(objectives[new], objectives[remaining], chunk_size)]
+    return np.concatenate(front)
+
+def pareto_ranks(objectives, max_rank=None, chunk_size=1024):
+    """
+    Non-dominated sorting: rank 0 is the Pareto front, rank 1 is the front
+    once rank 0 is taken out, and so on. Identical points get the same rank.
+
+    Parameters:
+        objectives      (points x objectives) array (bigger is better)
+        max_rank        Stop after this many fronts; the rest are ranked -1
+
+    Returns an array of ranks, one per point
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    unique, inverse = np.unique(objectives, axis=0, return_inverse=True)
+    ranks = np.full(len(unique), -1)
+
+    remaining = np.arange(len(unique))
+    rank = 0
+    while len(remaining) and (max_rank is None or rank < max_rank):
+        front = remaining[pareto_front(unique[remaining], chunk_size)]
+        ranks[front] = rank
+        remaining = remaining[ranks[remaining] < 0]
+        rank += 1
+    return ranks[inverse.ravel()]
+
+def _positions(centers, step):
+    """
+    Every candidate position: a grid of step-spaced points within the rough
+    cut of each of the centers (the same disks optimizer.py searches)
+    """
+    disk = _disk(step)
+    return np.unique(np.concatenate([c + disk for c in np.reshape(centers, (-1, 2))]).round(6),
+                     axis=0)
+
+def search_arrays(age, segments, weights, step=None, price_step=None, mtbf_choices=None,
+                  prune=True, chunk_size=200000):
+    """
+    The frontier, from plain arrays (see search for the friendly version).
+
+    Parameters:
+        age             The product's age that year
+        segments        segment_arrays() of the segments to trade off, for that one year
+        weights         segment_weights() of those segments
+        step            Spacing of the position grid
+        price_step      Spacing of the price grid. Both default to FINE_GRID
+                        for up to 2 segments and COARSE_GRID for more.
+        mtbf_choices    MTBFs to choose from. Defaults to every 500 hours from
+                        5000 under the lowest segment's top MTBF to the highest
+        prune           Throw out positions, prices and MTBFs that are beaten
+                        on their own before combining them (exact; see above)
+        chunk_size      How many combinations to score at once
+
+    Returns a Frontier (with segments left as None)
+    """
+    centroid = segments['centroid'][:, 0]
+    offset = segments['offset'][:, 0]
+    low, high = segments['price_low'][:, 0], segments['price_high'][:, 0]
+    mtbf_low, mtbf_high = segments['mtbf_low'][:, 0], segments['mtbf_high'][:, 0]
+
+    grid = FINE_GRID if len(centroid) <= 2 else COARSE_GRID
+    step = grid[0] if step is None else step
+    price_step = grid[1] if price_step is None else price_step
+
+    # Candidates for each part, and each part's score in every segment
+    positions = _positions(centroid, step)
+    prices = np.arange(low.min() - 5, high.max() + 5 + price_step / 2, price_step)
+    if mtbf_choices is None:
+        mtbf_choices = np.arange(mtbf_high.min() - 5000, mtbf_high.max() + 1, 500)
+    mtbfs = np.asarray(mtbf_choices, dtype=float)
+
+    position_scores = positioning_score(centroid, offset, positions[:, None, :])
+    price_scores = price_score(prices[:, None], low, high)
+    mtbf_scores = mtbf_score(mtbfs[:, None], mtbf_low, mtbf_high)
+    age_scores = age_score(age, segments['age_mean'][:, 0], segments['age_stdev'][:, 0])
+
+    if prune:
+        # Positions that miss every rough cut are beaten by any that don't
+        keep = pareto_front(position_scores)
+        positions, position_scores = positions[keep], position_scores[keep]
+        keep = pareto_front(price_scores)
+        prices, price_scores = prices[keep], price_scores[keep]
+        keep = pareto_front(mtbf_scores)
+        mtbfs, mtbf_scores = mtbfs[keep], mtbf_scores[keep]
+
+    # Score every combination, a chunk at a time. Price and MTBF get summed
+    # first since they're the small axes
+    rest = (weights[:, 1] * price_scores[:, None, :] + weights[:, 3] * mtbf_scores[None, :, :]
+            + weights[:, 0] * age_scores).reshape(-1, len(centroid))
+    num_rest = len(rest)
+    total = len(positions) * num_rest
+
+    best = []
+    for start in range(0, total, chunk_size):
+        index = np.arange(start, min(start + chunk_size, total))
+        p, r = np.divmod(index, num_rest)
+        pos = position_scores[p]
+        scores = weights[:, 2] * pos + rest[r]
+
+        # Only this chunk's front can be on the overall front
+        keep = pareto_front(scores)
+        best.append((index[keep], scores[keep]))
+
+    index = np.concatenate([i for i, _ in best])
+    scores = np.concatenate([s for _, s in best])
+    keep = pareto_front(scores)
+    index, scores = index[keep], scores[keep]
+
+    p, r = np.divmod(index, num_rest)
+    price_index, mtbf_index = np.divmod(r, len(mtbfs))
+    return Frontier(positions[p, 0], positions[p, 1], mtbfs[mtbf_index], prices[price_index],
+                    scores, None)
+
+def search(product, market_segments, t, segments=None, **kwargs):
+    """
+    Pareto frontier of a product's stats at year t, trading off its
+    survey scores in some segments.
+
+    Parameters:
+        product             The Product to place (only its age is used)
+        market_segments     A list of MarketSegment objects
+        t                   Year to place it in
+        segments            Indices of the segments to trade off (defaults to the
+                            NEAREST_SEGMENTS whose centroids are closest to the
+                            product that year)
+        kwargs              Passed to search_arrays (step, price_step, ...)
+
+    Returns a Frontier
+    """
+    args = search_args(product, market_segments, t, segments)
+    return search_arrays(*args[:3], **kwargs)._replace(segments=args[3])
+
+def search_args(product, market_segments, t, segments=None):
+    """
+    Everything search_arrays needs, looked up from the objects (segments'
+    trajectories get built lazily, so do this on the main thread and hand
+    the arrays to a worker)
+
+    Returns (age, segments, weights, segment indices)
+    """
+    if segments is None:
+        segments = nearest_segments(product, market_segments, t)
+    segments = list(segments)
+    chosen = [market_segments[s] for s in segments]
+    return (product.get_age(t), segment_arrays(chosen, [t]), segment_weights(chosen), segments)
+
+def nearest_segments(product, market_segments, t, n=NEAREST_SEGMENTS):
+    """
+    Indices of the n segments whose centroids are closest to the product at year t
+    """
+    position = np.array([product.get_performance(t), product.get_size(t)])
+    centroids = np.array([ms.trajectory.location(t) for ms in market_segments])
+    distance = np.hypot(*(centroids - position).T)
+    return sorted(np.argsort(distance, kind='stable')[:n].tolist())
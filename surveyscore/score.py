@@ -2,65 +2,73 @@
 Calculate the customer survey score
 """
 """
-Notes: 
+Notes:
  - age and mtbf scores stay the same throughout the simulation.
    price is predictable long-term, and ideal_position is from
    perceptual map
  - do importances change?
+ - Everything in here works on numpy arrays, so a single call can score
+   every product against every segment for every year. Plain floats
+   work too.
 """
+import numpy as np
+import instrument
 
-# Importances
-age_importance = 
-price = 
-ideal_position = 
-mtbf = 
+# Every cut below is a geometric falloff with this base (derivation done on paper)
+FALLOFF = 80/100
 
-# Scores
-age_mean = 
-age_stdev = 
-ideal_price =       # If reported as a range [low,high], this should be the average
-ideal_position_range = []
-mtbf_range = []
+# Positioning cuts: full marks (before the falloff) within FINE_CUT_RADIUS of
+# a segment's centroid, fading out to nothing at ROUGH_CUT_RADIUS
+FINE_CUT_RADIUS = 2.5
+ROUGH_CUT_RADIUS = 4
 
-# Product params
-product_age = 
+# Order of the importances in the weights returned by segment_weights()
+CRITERIA = ('age', 'price', 'position', 'mtbf')
 
-# Calculate Age:
-# Age is a gaussian
-# TODO Convert to function and implement
-age_score = gaussian(age_mean, age_stdev, product_age) * age_importance
+def age_score(product_age, age_mean, age_stdev):
+    """
+    Returns a value in [0,1]. Age is a gaussian centered at the
+    segment's preferred age, so being right on it gives 1.
+    """
+    product_age = np.asarray(product_age, dtype=float)
+    z = (product_age - age_mean) / age_stdev
+    return np.exp(-0.5 * z**2)
 
 # Price goes down 50 cents every year (we can do long-term predictions here)
-def price_score(product_price, price_range):
+def price_score(product_price, low, high):
     """
     Returns a value in [0,1]. The closer the product_price
     and ideal_price are, the higher the returned value.
+
+    The ideal price is the middle of the [low, high] range. Products
+    priced more than $5 outside of the range fail the rough cut.
+    A missing (nan) price scores 0.
     """
-    low, high = price_range
+    product_price = np.asarray(product_price, dtype=float)
+    ideal_price = (np.asarray(low) + np.asarray(high)) / 2
 
     # Rough cut
-    if product_price < low - 5 or high > ideal_price + 5:
-        return 0
-
-    # Normal demand curve
-    if low < product_price < high:
+    inside = (product_price >= low - 5) & (product_price <= high + 5)
 
-    # Fine cut. Derivation done on paper.
-    return (80/100)**abs(product_price - ideal_price)
+    # Fine cut
+    return np.where(inside, FALLOFF**np.abs(product_price - ideal_price), 0.0)
 
-def mtbf_score(product_mtbf, desired_mtbf):
+def mtbf_score(product_mtbf, low, high):
     """
     Returns a value in [0,1]. Towards top of range implies
     higher score.
 
-    desired_mtbf is the uppermost mtbf desired by customers.
+    high is the uppermost mtbf desired by customers.
     Going higher has no effect; going >5000 below fails this task.
     """
+    product_mtbf = np.asarray(product_mtbf, dtype=float)
+
     # Rough cut
-    if product_mtbf - 5000 < desired_mtbf:
-        return 0
-    
-    return (80/100)**(abs(product_mtbf - desired_mtbf)/1000)
+    inside = product_mtbf >= high - 5000
+
+    # Going past the top of the range doesn't help
+    shortfall = np.maximum(high - product_mtbf, 0)
+    return np.where(inside, FALLOFF**(shortfall/1000), 0.0)
 
 def positioning_score(centroid, offset_vector, product_position):
     """
@@ -71,22 +79,164 @@ def positioning_score(centroid, offset_vector, product_position):
         centroid            Center coord (x_c, y_c) of the market segment circle
         offset_vector       Ideal spot offset (dx, dy)
         product_position    Current placement of the product, (x, y)
+
+    Each parameter may also be an array whose last axis holds (x, y);
+    the leading axes are broadcast against each other.
     """
-    assert(centroid[0] > 0 and centroid[1] > 0 and product_position[0] > 0 and product_position[1] > 0)
+    centroid = np.asarray(centroid, dtype=float)
+    offset_vector = np.asarray(offset_vector, dtype=float)
+    product_position = np.asarray(product_position, dtype=float)
+
+    x_c, y_c = centroid[..., 0], centroid[..., 1]
+    dx, dy = offset_vector[..., 0], offset_vector[..., 1]
+    x, y = product_position[..., 0], product_position[..., 1]
 
-    x_c, y_c = centroid
-    dx, dy = offset_vector
-    x, y = product_position
+    dist_from_centroid = np.hypot(x - x_c, y - y_c)
+    dist_from_ideal = np.hypot(x - (x_c + dx), y - (y_c + dy))
 
-    dist_from_centroid = (x - x_c)**2 + (y - y_c)**2
-    # Outside of rough cut circle
-    if dist_from_centroid > 4**2:
-        return 0
+    # Fine cut: falls off with distance from the ideal spot
+    score = FALLOFF**dist_from_ideal
 
-    # Positioning Rough Cut (Between 2.5 and 4 units from center)
-    if dist_from_centroid > 2.5**2:
+    # Positioning Rough Cut (Between 2.5 and 4 units from center).
+    # Fades out linearly, hitting 0 at the edge of the rough cut circle
+    fade = np.clip((ROUGH_CUT_RADIUS - dist_from_centroid) / (ROUGH_CUT_RADIUS - FINE_CUT_RADIUS),
+                   0, 1)
+    return score * fade
 
-    
-    
+def in_rough_cut(position_scores, survey_scores):
+    """
+    Zeroes the survey scores wherever the positioning score is 0, i.e. for
+    products outside of a segment's rough cut circle. Only used when asked
+    for (rough_cut=True); the normal scores still give those products
+    credit for age, price and mtbf.
+    """
+    return np.where(position_scores > 0, survey_scores, 0.0)
+
+def segment_weights(market_segments):
+    """
+    Returns an (segments x 4) array of importances, ordered like CRITERIA
+    """
+    return np.array([[getattr(ms._criteria, c).importance for c in CRITERIA]
+                     for ms in market_segments], dtype=float)
 
+def segment_arrays(market_segments, years):
+    """
+    Collects each segment's (time-dependent) criteria into arrays of
+    shape (segments x years) so they can be broadcast against products.
+    Positions and prices come from the segments' precomputed trajectories.
 
+    Returns a dict with keys centroid and offset (trailing axis of 2),
+    price_low, price_high, mtbf_low, mtbf_high, age_mean, age_stdev
+    """
+    years = np.asarray(years, dtype=float)
+    offset = np.array([ms._offset for ms in market_segments], dtype=float)
+    price = np.array([ms.trajectory.price_range(years) for ms in market_segments])
+    criteria = [ms._criteria for ms in market_segments]
+
+    def column(f):
+        return np.array([f(c) for c in criteria], dtype=float)[:, None]
+
+    return {
+        'centroid': np.array([ms.trajectory.location(years) for ms in market_segments]),
+        'offset': offset[:, None, :],
+        'price_low': price[..., 0],
+        'price_high': price[..., 1],
+        'mtbf_low': column(lambda c: c.mtbf.low),
+        'mtbf_high': column(lambda c: c.mtbf.high),
+        'age_mean': column(lambda c: c.age.mean),
+        'age_stdev': column(lambda c: c.age.stdev),
+    }
+
+def criteria_scores(performance, size, mtbf, price, age, segments):
+    """
+    Scores products on each criterion separately.
+
+    Parameters:
+        performance, size, mtbf, price, age
+                            (products x years) arrays of product timelines
+        segments            The dict returned by segment_arrays()
+
+    Returns an array of shape (4 x products x segments x years), ordered
+    like CRITERIA. Nothing is weighted yet.
+    """
+    def product_axis(a):
+        # (products x years) ==> (products x 1 x years) so segments broadcast
+        return np.atleast_2d(np.asarray(a, dtype=float))[:, None, :]
+
+    position = np.stack((product_axis(performance), product_axis(size)), axis=-1)
+
+    return np.stack((
+        age_score(product_axis(age), segments['age_mean'], segments['age_stdev']),
+        price_score(product_axis(price), segments['price_low'], segments['price_high']),
+        positioning_score(segments['centroid'], segments['offset'], position),
+        mtbf_score(product_axis(mtbf), segments['mtbf_low'], segments['mtbf_high']),
+    ))
+
+@instrument.timed("score.survey_scores")
+def survey_scores(performance, size, mtbf, price, age, market_segments, years=None,
+                  rough_cut=False):
+    """
+    Computes the weighted survey score of every product in every segment
+    for every year in one batched call.
+
+    Parameters:
+        performance, size, mtbf, price, age
+                            (products x years) arrays of product timelines
+        market_segments     A list of MarketSegment objects
+        years               The year each timeline column corresponds to.
+                            Defaults to 0, 1, ..., num_years - 1
+        rough_cut           Zero the scores of products outside each segment's
+                            rough cut circle (see in_rough_cut)
+
+    Returns a (products x segments x years) array with values in [0,1]
+    """
+    if years is None:
+        years = np.arange(np.shape(performance)[-1])
+
+    segments = segment_arrays(market_segments, years)
+    scores = criteria_scores(performance, size, mtbf, price, age, segments)
+
+    # Weight each criterion by how much this segment cares about it
+    weights = segment_weights(market_segments)
+    total = np.einsum('cpst,sc->pst', scores, weights)
+    return in_rough_cut(scores[2], total) if rough_cut else total
+
+@instrument.timed("score.pair_scores")
+def pair_scores(performance, size, mtbf, price, age, market_segments, p, s, t,
+                rough_cut=False):
+    """
+    Like survey_scores, but only for some (product, segment, year) triples,
+    e.g. the ones that made it past a rough cut.
+
+    Parameters:
+        performance, size, mtbf, price, age
+                            (products x years) arrays of product timelines
+        market_segments     A list of MarketSegment objects
+        p, s, t             Equal-length arrays of product rows, segment
+                            indices, and years to score
+        rough_cut           Same as for survey_scores
+
+    Returns an array of scores lined up with p, s, t
+    """
+    p, s, t = np.asarray(p, dtype=int), np.asarray(s, dtype=int), np.asarray(t, dtype=int)
+    num_years = np.shape(performance)[-1]
+    segments = segment_arrays(market_segments, np.arange(num_years))
+
+    def product(a):
+        return np.atleast_2d(np.asarray(a, dtype=float))[p, t]
+
+    def segment(key):
+        a = segments[key]
+        return a[s, t if a.shape[1] > 1 else 0]
+
+    position = np.column_stack((product(performance), product(size)))
+    scores = np.stack((
+        age_score(product(age), segment('age_mean'), segment('age_stdev')),
+        price_score(product(price), segment('price_low'), segment('price_high')),
+        positioning_score(segment('centroid'), segment('offset'), position),
+        mtbf_score(product(mtbf), segment('mtbf_low'), segment('mtbf_high')),
+    ), axis=-1)
+
+    weights = segment_weights(market_segments)
+    total = (scores * weights[s]).sum(axis=-1)
+    return in_rough_cut(scores[..., 2], total) if rough_cut else total
@@ -0,0 +1,62 @@
+"""
+Survey scores that only get recomputed where something changed.
+
+Editing a product at year t invalidates that product's scores from year t
+onward (in every segment); changing a segment invalidates that segment's
+scores for every product. Anything built on top of the scores (see
+depgraph.py, and MarketShare for an example) gets invalidated along with
+them.
+"""
+import numpy as np
+from eventbus import ProductListener
+from depgraph import Memo
+import instrument
+from surveyscore.score import survey_scores
+
+class ScoreGraph(ProductListener):
+    """
+    Memoized survey scores (zeroed for dead products) of every product in a
+    table against every segment for every year
+    """
+    def __init__(self, table, market_segments, rough_cut=False):
+        """
+        Parameters:
+            table               ProductTable (or TableBranch) holding the products
+            market_segments     A list of MarketSegment objects
+            rough_cut           Zero the scores of products outside a segment's
+                                rough cut circle (see survey_scores)
+        """
+        self._table = table
+        self._market_segments = market_segments
+        self.rough_cut = rough_cut
+
+        # (products x segments x years)
+        self.scores = Memo("scores", self._compute_scores, self.shape)
+
+    def shape(self):
+        return (len(self._table), len(self._market_segments), self._table.num_years)
+
+    def _compute_scores(self, rows, segments, years):
+        index = np.ix_(rows, years)
+
+        def column(c):
+            return self._table.column(c)[index]
+
+        scores = survey_scores(column('performance'), column('size'), column('mtbf'),
+                               column('price'), column('age'),
+                               [self._market_segments[s] for s in segments], years=years,
+                               rough_cut=self.rough_cut)
+        return scores * column('alive')[:, None, :]
+
+    @instrument.timed("scoregraph.product_changed")
+    def product_changed(self, name, t):
+        """
+        A product's stats changed from year t onward
+        """
+        self.scores.invalidate(rows=self._table.row(name), from_year=t)
+
+    def segment_changed(self, index):
+        """
+        The segment at the given index changed (its criteria, drift, etc)
+        """
+        self.scores.invalidate(segments=index)
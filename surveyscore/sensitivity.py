@@ -0,0 +1,138 @@
+"""
+How much survey score each knob (performance, size, MTBF, price, age)
+buys a product, in every segment, every year.
+
+Notes:
+ - The score has cuts and kinks everywhere (rough cuts, the MTBF ceiling,
+   abs() around the ideal price), so the derivatives are finite differences
+   over one step of each knob rather than anything analytic.
+ - Every nudged copy of every product gets stacked into one tall batch and
+   scored with a single survey_scores call, so this costs about as much as
+   scoring 11x as many products once.
+ - Up and down are kept separate, since they're usually not symmetric
+   (e.g. past the top of the MTBF range, more MTBF buys nothing but less costs).
+"""
+from collections import namedtuple
+import numpy as np
+from surveyscore.score import survey_scores
+
+# Knobs, in the order of the leading axis of everything returned below
+PARAMETERS = ('performance', 'size', 'mtbf', 'price', 'age')
+
+# Default size of one step of each knob, about what one decision moves it by
+STEPS = {'performance': 0.5, 'size': 0.5, 'mtbf': 500, 'price': 0.5, 'age': 0.5}
+
+# Order of the direction axis of delta
+DIRECTIONS = (1, -1)
+
+# base is (products x segments x years)
+# gradient is (parameters x products x segments x years), per unit of each parameter
+# delta is (parameters x 2 x products x segments x years): the change in score
+#   from moving each parameter one step up (0) or down (1)
+# steps is the (parameters,) array of step sizes used
+Sensitivity = namedtuple('Sensitivity', ['base', 'gradient', 'delta', 'steps'])
+
+# One row of the best_moves table. change is signed (in the parameter's units),
+# gain is how much score it buys, score is the score before the move.
+Move = namedtuple('Move', ['product', 'segment', 'year', 'parameter', 'change', 'gain', 'score'])
+
+def sensitivity(performance, size, mtbf, price, age, market_segments, years=None, steps=None):
+    """
+    Score changes from nudging each parameter of every product, one at a time.
+
+    Parameters:
+        performance, size, mtbf, price, age
+                            (products x years) arrays of product timelines
+        market_segments     A list of MarketSegment objects
+        years               The year each timeline column corresponds to
+                            (see survey_scores)
+        steps               Dict overriding some of the STEPS
+
+    Returns a Sensitivity
+    """
+    columns = [np.atleast_2d(np.asarray(a, dtype=float))
+               for a in (performance, size, mtbf, price, age)]
+    num_products, num_years = columns[0].shape
+    steps = dict(STEPS, **(steps or {}))
+    steps = np.array([steps[p] for p in PARAMETERS], dtype=float)
+    assert(np.all(steps > 0))
+
+    # Row 0 leaves everything alone; rows 2i+1 and 2i+2 nudge parameter i up and down
+    n = len(PARAMETERS)
+    nudges = np.zeros((1 + 2 * n, n))
+    nudges[1::2][np.arange(n), np.arange(n)] = steps
+    nudges[2::2][np.arange(n), np.arange(n)] = -steps
+
+    # ((1 + 2n) * products x years), all scored in one go
+    batch = [(c[None] + nudges[:, i, None, None]).reshape(-1, num_years)
+             for i, c in enumerate(columns)]
+    scores = survey_scores(*batch, market_segments, years=years)
+    scores = scores.reshape(1 + 2 * n, num_products, len(market_segments), num_years)
+
+    base = scores[0]
+    delta = (scores[1:] - base).reshape(n, 2, *base.shape)
+    gradient = (scores[1::2] - scores[2::2]) / (2 * steps)[:, None, None, None]
+    return Sensitivity(base, gradient, delta, steps)
+
+def sensitivity_table(table, market_segments, **kwargs):
+    """
+    Same as sensitivity, but reads the product timelines out of a ProductTable
+    (or anything like one). Products that aren't alive yet get all zeros.
+    """
+    s = sensitivity(table.column('performance'), table.column('size'),
+                    table.column('mtbf'), table.column('price'),
+                    table.column('age'), market_segments, **kwargs)
+    alive = table.column('alive')[:, None, :]
+    return Sensitivity(s.base * alive, s.gradient * alive, s.delta * alive, s.steps)
+
+def best_moves(result, names, segment_names, years=None, products=None, top=20):
+    """
+    Ranks the best single step for each (product, segment, year), biggest gain
+    first. Moves that don't gain anything are left out.
+
+    Parameters:
+        result              A Sensitivity
+        names               Product names, ordered like the rows of result
+        segment_names       Segment names, ordered like the segments of result
+        years               Only rank these years (indices into the year axis)
+        products            Only rank these products (names)
+        top                 Length of the table (None for everything)
+
+    Returns a list of Moves
+    """
+    gains = result.delta.reshape(-1, *result.base.shape)
+    base = result.base
+    year_index = np.arange(base.shape[-1])
+    if years is not None:
+        year_index = np.atleast_1d(np.asarray(years, dtype=int))
+        gains, base = gains[..., year_index], base[..., year_index]
+    rows = np.arange(len(names))
+    if products is not None:
+        rows = np.array([names.index(name) for name in products], dtype=int)
+        gains, base = gains[:, rows], base[rows]
+
+    # Best (parameter, direction) in each cell, then the best cells overall
+    which = gains.argmax(axis=0)
+    gain = np.take_along_axis(gains, which[None], axis=0)[0]
+    order = np.argsort(-gain, axis=None, kind='stable')[:top]
+    order = order[gain.flat[order] > 0]
+
+    moves = []
+    for p, s, t in zip(*np.unravel_index(order, gain.shape)):
+        parameter, direction = divmod(int(which[p, s, t]), 2)
+        moves.append(Move(names[rows[p]], segment_names[s], int(year_index[t]),
+                          PARAMETERS[parameter],
+                          DIRECTIONS[direction] * float(result.steps[parameter]),
+                          float(gain[p, s, t]), float(base[p, s, t])))
+    return moves
+
+def format_moves(moves):
+    """
+    The best_moves table as text, one move per line
+    """
+    lines = [f"{'product':<12} {'segment':<14} {'year':>4}  {'move':<20} {'score':>6} {'gain':>7}"]
+    for m in moves:
+        move = f"{m.parameter} {m.change:+g}"
+        lines.append(f"{m.product:<12} {m.segment:<14} {m.year:>4}  {move:<20} "
+                     f"{m.score:>6.3f} {m.gain:>+7.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,150 @@
+"""
+Only products within 4 units of a segment's centroid can get a positioning
+score (see positioning_score), so there's no point scoring the rest.
+This keeps a uniform grid of product positions for every year so those
+products can be found without checking every product against every segment.
+Its scores are rough-cut scores (see survey_scores' rough_cut): everybody
+outside a segment's circle gets 0 there.
+
+Notes:
+ - The grid is one sorted array of (year, cell) keys, so every segment's
+   query for every year is a handful of searchsorted calls rather than a
+   Python loop.
+ - Pruning only pays off with lots of products and years; below
+   DENSE_BELOW (products x years) plain dense scoring is faster, so
+   survey_scores just does that.
+"""
+import numpy as np
+from eventbus import ProductListener
+import instrument
+from surveyscore.score import pair_scores, survey_scores, ROUGH_CUT_RADIUS
+
+# Below this many (product, year) positions, dense scoring beats pruning
+DENSE_BELOW = 2000
+
+# Cell coordinates get shifted by this so they're never negative inside a key
+_CELL_BIAS = 2**20
+
+def _keys(years, cx, cy):
+    """
+    One sortable int64 per (year, cell)
+    """
+    return ((np.asarray(years, dtype=np.int64) << 42)
+            | ((np.asarray(cx, dtype=np.int64) + _CELL_BIAS) << 21)
+            | (np.asarray(cy, dtype=np.int64) + _CELL_BIAS))
+
+class ProductGrid(ProductListener):
+    """
+    Buckets every product's (performance, size) position into square cells,
+    one grid per year. Cells are as wide as the query radius, so a query
+    only has to look at the 3x3 block of cells around its center.
+    """
+    def __init__(self, table, cell_size=ROUGH_CUT_RADIUS, dense_below=DENSE_BELOW):
+        """
+        Parameters:
+            table           ProductTable holding the products
+            cell_size       Width of a cell; queries with a bigger radius
+                            than this still work, but look at more cells
+            dense_below     survey_scores skips the index for tables with
+                            fewer (products x years) than this
+        """
+        self._table = table
+        self._cell_size = cell_size
+        self._dense_below = dense_below
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Index every product from scratch
+        """
+        table = self._table
+        positions = np.stack((table.column('performance'), table.column('size')), axis=-1)
+
+        # Products without a position (e.g. not launched yet) can't be in any cell
+        rows, years = np.nonzero(~np.isnan(positions).any(axis=-1))
+        cells = np.floor(positions[rows, years] / self._cell_size).astype(np.int64)
+        keys = _keys(years, cells[:, 0], cells[:, 1])
+
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._rows = rows[order]
+        self._positions = positions
+        self._stale = False
+
+    @instrument.timed("spatialindex.product_changed")
+    def product_changed(self, name, t):
+        """
+        A product moved (or was added) at year t. The index gets rebuilt
+        the next time it's used, so a burst of edits only costs one rebuild.
+        """
+        self._stale = True
+
+    def _query(self, centers, years, radius):
+        """
+        Products within radius of each of several centers, each in its own year.
+        Returns (which center, product row) pairs as two equal-length arrays.
+        """
+        if self._stale:
+            self.rebuild()
+
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        years = np.asarray(years, dtype=np.int64).ravel()
+        cells = np.floor(centers / self._cell_size).astype(np.int64)
+
+        # Every cell around each center that could be within reach
+        reach = int(np.ceil(radius / self._cell_size))
+        dx, dy = (d.ravel() for d in np.meshgrid(np.arange(-reach, reach + 1),
+                                                 np.arange(-reach, reach + 1)))
+        keys = _keys(years[:, None], cells[:, :1] + dx, cells[:, 1:] + dy)
+        start = np.searchsorted(self._keys, keys.ravel(), side='left')
+        count = np.searchsorted(self._keys, keys.ravel(), side='right') - start
+
+        # Expand each cell's [start, start + count) range of the sorted index
+        which = np.repeat(np.arange(len(centers)).repeat(len(dx)), count)
+        first = np.repeat(start - (np.cumsum(count) - count), count)
+        rows = self._rows[first + np.arange(count.sum())]
+
+        # The cells only narrow it down; check actual distances
+        offset = self._positions[rows, years[which]] - centers[which]
+        inside = (offset**2).sum(axis=1) <= radius**2
+        return which[inside], rows[inside]
+
+    def query(self, center, t, radius=ROUGH_CUT_RADIUS):
+        """
+        Rows of the products within radius of center during year t
+        """
+        _, rows = self._query([center], [t], radius)
+        return rows
+
+    def rough_cut_pairs(self, market_segments):
+        """
+        Every (product, segment, year) within the rough cut circle.
+        Returns three equal-length arrays.
+        """
+        num_years = self._table.num_years
+        if not market_segments:
+            return (np.zeros(0, dtype=int),) * 3
+
+        # (segments x years) centers, queried all at once
+        centroids = np.array([ms.trajectory.location(np.arange(num_years))
+                              for ms in market_segments])
+        years = np.broadcast_to(np.arange(num_years), centroids.shape[:2])
+        which, p = self._query(centroids.reshape(-1, 2), years, ROUGH_CUT_RADIUS)
+        s, t = np.divmod(which, num_years)
+        return p, s, t
+
+    def survey_scores(self, market_segments):
+        """
+        Same result as survey_scores(..., rough_cut=True) (products x segments
+        x years): products failing the positioning rough cut aren't scored at
+        all and are left at 0. Small tables are just scored densely.
+        """
+        table = self._table
+        columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+        if len(table) * table.num_years < self._dense_below:
+            return survey_scores(*columns, market_segments, rough_cut=True)
+
+        scores = np.zeros((len(table), len(market_segments), table.num_years))
+        p, s, t = self.rough_cut_pairs(market_segments)
+        scores[p, s, t] = pair_scores(*columns, market_segments, p, s, t, rough_cut=True)
+        return scores
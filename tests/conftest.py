@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The modules live at the top of the repo (there's no package to install)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nothing here needs a window
+import matplotlib
+matplotlib.use("Agg")
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "benchmarks"))
+import baseline
+
+@pytest.fixture(autouse=True)
+def baseline_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline, "BASELINE_DIR", str(tmp_path))
+    monkeypatch.delenv("CI", raising=False)
+    return tmp_path
+
+def test_first_run_saves_parameters_with_results():
+    assert baseline.report("suite", {"a": 1.0}, 0.25, parameters={"products": 10})
+    saved = baseline.load("suite", {"products": 10})
+    assert saved == {"parameters": {"products": 10}, "results": {"a": 1.0}}
+
+def test_runs_with_different_parameters_are_not_compared():
+    baseline.report("suite", {"a": 1.0}, 0.25, parameters={"products": 1000})
+
+    # Way slower, but it's a different size, so it gets its own baseline
+    assert baseline.report("suite", {"a": 50.0}, 0.25, parameters={"products": 10})
+    assert not baseline.report("suite", {"a": 2.0}, 0.25, parameters={"products": 1000})
+    assert baseline.report("suite", {"a": 50.0}, 0.25, parameters={"products": 10})
+
+def test_fps_regresses_when_it_goes_down():
+    baseline.report("render", {"scrub_fps": 30.0}, 0.25)
+    assert baseline.report("render", {"scrub_fps": 29.0}, 0.25)
+    assert not baseline.report("render", {"scrub_fps": 10.0}, 0.25)
+
+def test_baselines_without_parameters_are_refused(baseline_dir):
+    with open(baseline_dir / "suite.json", "w") as f:
+        json.dump({"a": 1.0}, f)
+    assert not baseline.report("suite", {"a": 1.0}, 0.25)
+    assert baseline.report("suite", {"a": 1.0}, 0.25, update=True)
+    assert baseline.report("suite", {"a": 1.1}, 0.25)
+
+def test_missing_baseline_fails_under_ci(monkeypatch):
+    monkeypatch.setenv("CI", "true")
+    assert not baseline.report("startup", {"map": 1.0}, 0.25)
+    assert baseline.load("startup") is None
+    assert baseline.report("startup", {"map": 1.0}, 0.25, update=True)
+    assert baseline.report("startup", {"map": 1.0}, 0.25)
@@ -0,0 +1,60 @@
+import json
+import numpy as np
+import pytest
+import batch
+import scenario
+import scenariolibrary
+from surveyscore.score import survey_scores
+
+SCENARIOS = [
+    {'name': "base", 'num_years': 6,
+     'products': [{'name': "Cake", 'performance': 5.5, 'size': 14.5, 'mtbf': 17500, 'price': 28},
+                  {'name': "Cid", 'performance': 3, 'size': 17, 'mtbf': 14000, 'price': 21,
+                   'revisions': [{'year': 2, 'performance': 4, 'size': 16}]}]},
+    {'name': "late entry", 'num_years': 6,
+     'products': [{'name': "Coat", 'performance': 8, 'size': 12, 'mtbf': 20000, 'price': 33,
+                   'year': 3}]},
+]
+
+@pytest.fixture
+def scenarios_file(tmp_path):
+    path = tmp_path / "scenarios.jsonl"
+    path.write_text("".join(json.dumps(d) + "\n" for d in SCENARIOS))
+    return str(path)
+
+def expected(d):
+    name, _, market_segments, products, table = scenario.from_dict(d)
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    return {'name': name, 'products': [p._name for p in products],
+            'segments': [ms._name for ms in market_segments],
+            'scores': survey_scores(*columns, market_segments)}
+
+def check(results):
+    assert sorted(r['name'] for r in results) == [d['name'] for d in SCENARIOS]
+    for d in SCENARIOS:
+        result, = [r for r in results if r['name'] == d['name']]
+        e = expected(d)
+        assert result['products'] == e['products'] and result['segments'] == e['segments']
+        assert np.allclose(result['scores'], e['scores'], atol=1e-4)
+
+def test_scores_match_scoring_in_process(scenarios_file, tmp_path, monkeypatch):
+    output = tmp_path / "results.jsonl"
+
+    # Every result should already be on disk by the time the next one gets written
+    lines_before = []
+    dumps = json.dumps
+    def watching(result):
+        lines_before.append(len(output.read_text().splitlines()))
+        return dumps(result)
+    monkeypatch.setattr(batch.json, "dumps", watching)
+
+    assert batch.run([scenarios_file], str(output), processes=2, chunksize=1) == 2
+    assert lines_before == [0, 1]
+    check([json.loads(line) for line in output.read_text().splitlines()])
+
+def test_libraries_score_the_same(scenarios_file, tmp_path):
+    library = tmp_path / "library"
+    scenariolibrary.from_scenario_dicts(str(library), scenario.iter_scenario_dicts([scenarios_file]))
+    output = tmp_path / "results.jsonl"
+    assert batch.run([str(library)], str(output), processes=2) == 2
+    check([json.loads(line) for line in output.read_text().splitlines()])
@@ -0,0 +1,61 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from batchplot import TextCollection, ProductCollectionPlot
+
+def make_axis():
+    f = Figure(figsize=(5, 5), dpi=100)
+    ax = f.add_subplot(111)
+    ax.set_xlim(0, 20)
+    ax.set_ylim(0, 20)
+    ax.set_axis_off()
+    canvas = FigureCanvasAgg(f)
+    return ax, canvas
+
+def test_labels_are_drawn_where_they_are_placed():
+    ax, canvas = make_axis()
+    labels = TextCollection(ax, colors='red')
+    labels.set_data([(5, 17)], ["Cedar"])
+    canvas.draw()
+
+    # Rows of the buffer count down from the top
+    pixels = np.asarray(canvas.buffer_rgba())
+    red = (pixels[..., 0] > 200) & (pixels[..., 1] < 100) & (pixels[..., 2] < 100)
+    rows, columns = np.nonzero(red)
+    assert len(rows)
+
+    x, y = ax.transData.transform((5, 17))
+    height = canvas.get_width_height()[1]
+    assert abs((height - rows.mean()) - y) < 10
+    assert abs(columns.min() - x) < 3
+
+def test_label_boxes_sit_next_to_their_markers():
+    ax, canvas = make_axis()
+    plot = ProductCollectionPlot(ax, declutter=False)
+    spots = [(3, 17), (8, 12), (12, 3)]
+    for i, (performance, size) in enumerate(spots):
+        plot.add(f"P{i}", size, performance)
+    canvas.draw()
+
+    renderer = canvas.get_renderer()
+    boxes = plot._labels.get_window_extents(renderer)
+    assert len(boxes) == len(spots)
+    for box, spot in zip(boxes, spots):
+        x, y = ax.transData.transform(spot)
+        assert abs(box.x0 - x) < 1
+        assert box.y0 - 5 < y < box.y1 + 5
+
+def test_decluttering_drops_overlapping_labels():
+    ax, canvas = make_axis()
+    labels = TextCollection(ax, declutter=True)
+    labels.set_data([(5, 5), (5.05, 5.05), (15, 15)], ["first", "second", "third"])
+    canvas.draw()
+    assert labels.culled == 1
+
+def test_extent_cache_only_keeps_current_labels():
+    ax, canvas = make_axis()
+    labels = TextCollection(ax)
+    for i in range(50):
+        labels.set_data([(5, 5)], [f"label {i}"])
+        canvas.draw()
+    assert len(labels._extents) == 1
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+import scenario
+from product.model import Product
+from product.table import ProductTable
+
+COLUMNS = ('size', 'performance', 'age', 'mtbf', 'price', 'alive')
+
+def make_table():
+    table = ProductTable(6)
+    table.add("A", 10, 5, 17000, price=30)
+    table.add("B", 4, 15, 20000, price=25, year=2)
+    return table
+
+def edit(table):
+    """
+    The same edits, whatever kind of table it is
+    """
+    table.fill('size', table.row("A"), 3, 12)
+    table.fill('performance', table.row("B"), 1, 14)
+    table.fill('size', table.row("A"), 1, 11)
+    table.set_age(table.row("A"), 2, 0.5)
+
+def test_branch_matches_a_table_with_the_same_edits():
+    expected = make_table()
+    edit(expected)
+
+    branch = make_table().branch()
+    edit(branch)
+    for c in COLUMNS:
+        assert np.array_equal(branch.column(c), expected.column(c), equal_nan=True)
+        got = np.array([[branch.get(c, row, t) for t in range(6)] for row in range(2)])
+        assert np.array_equal(got, expected.column(c), equal_nan=True)
+
+def test_edits_stay_in_their_branch():
+    root = make_table()
+    before = {c: root.column(c).copy() for c in COLUMNS}
+    first = root.branch()
+    second = root.branch()
+    edit(first)
+
+    for c in COLUMNS:
+        assert np.array_equal(root.column(c), before[c], equal_nan=True)
+        assert np.array_equal(second.column(c), before[c], equal_nan=True)
+    assert first.edited() == {"A": 1, "B": 1}
+    assert second.edited() == {}
+
+def test_branches_of_branches_start_from_their_parent():
+    parent = make_table().branch()
+    parent.fill('size', 0, 2, 8)
+    child = parent.branch()
+    assert np.array_equal(child.column('size'), parent.column('size'))
+
+    child.fill('size', 0, 4, 9)
+    parent.fill('size', 0, 0, 1)
+    assert list(child.column('size')[0]) == [10, 10, 8, 8, 9, 9]
+    assert list(parent.column('size')[0]) == [1] * 6
+
+def test_products_added_in_a_branch():
+    root = make_table()
+    branch = root.branch()
+    branch.add("C", 3, 3, 15000, year=1)
+    assert "C" in branch and "C" not in root
+    assert len(branch) == 3 and len(root) == 2
+    assert list(branch.column('alive')[2]) == [False] + [True] * 5
+    assert branch.column('size').shape == (3, 6)
+
+@pytest.mark.parametrize("edited", [False, True])
+def test_columns_are_read_only(edited):
+    root = make_table()
+    branch = root.branch()
+    if edited:
+        edit(branch)
+    column = branch.column('size')
+    with pytest.raises(ValueError):
+        column[0, 0] = 99
+    assert root.column('size')[0, 0] == 10
+
+def test_products_on_a_branch_score_like_the_same_table():
+    market_segments = scenario.default_market_segments()
+    expected = make_table()
+    edit(expected)
+    branch = make_table().branch()
+    edit(branch)
+    assert np.allclose(branch.survey_scores(market_segments), expected.survey_scores(market_segments))
+
+    product = Product.view(branch, "A")
+    product.update_stats(4, performance=7)
+    assert branch.get('performance', 0, 4) == 7
+    assert expected.get('performance', 0, 4) == 5
+
+class FakeMenu:
+    def __init__(self, name):
+        self.name = name
+        self.values = None
+
+    def show_values(self, size, performance, age):
+        self.values = (size, performance, age)
+
+def test_switching_branches_refreshes_the_input_boxes():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from perceptualmap import PerceptualMapFigure
+
+    root = make_table()
+    first, second = root.branch(), root.branch()
+    second.fill('size', 0, 0, 3)
+    figure = PerceptualMapFigure(scenario.default_market_segments(),
+                                 [Product.view(first, n) for n in first.names], FigureCanvasAgg,
+                                 editable=False, topic="products_changed_test_branch")
+    menu = FakeMenu("A")
+    figure.product_controller._product_menu.append(menu)
+
+    figure.show_products([Product.view(second, n) for n in second.names])
+    assert menu.values == (3, 5, 0)
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import scenario
+from depgraph import Memo, SAME_ENTRY, ALL_PRODUCTS
+from product.table import ProductTable
+from surveyscore.marketshare import MarketShare
+from surveyscore.scoregraph import ScoreGraph
+from surveyscore.score import survey_scores
+
+SHAPE = (4, 3, 6)
+
+class Recorder:
+    """
+    A compute function for a Memo that remembers what it was asked for.
+    Entry (p, s, t) is worth base[p, s, t].
+    """
+    def __init__(self, base):
+        self.base = base
+        self.calls = []
+
+    def __call__(self, rows, segments, years):
+        self.calls.append((list(rows), list(segments), list(years)))
+        return self.base[np.ix_(rows, segments, years)]
+
+@pytest.fixture
+def memos():
+    base = np.arange(np.prod(SHAPE), dtype=float).reshape(SHAPE)
+    source = Recorder(base)
+    memo = Memo("source", source, lambda: SHAPE)
+    same = Memo("same", Recorder(base), lambda: SHAPE, inputs=[(memo, SAME_ENTRY)])
+    spread = Memo("spread", Recorder(base), lambda: SHAPE, inputs=[(memo, ALL_PRODUCTS)])
+    for m in (memo, same, spread):
+        m.get()
+        m._compute.calls.clear()
+    return memo, same, spread
+
+def test_only_stale_entries_are_recomputed(memos):
+    memo, _, _ = memos
+    memo.invalidate(rows=1, from_year=3)
+    assert np.array_equal(memo.get(), memo._compute.base)
+    assert memo._compute.calls == [([1], [0, 1, 2], [3, 4, 5])]
+
+    memo.invalidate(segments=2)
+    memo.get()
+    assert memo._compute.calls[-1] == ([0, 1, 2, 3], [2], list(range(6)))
+
+    memo.invalidate(rows=[0, 3], segments=[1], from_year=5)
+    memo.get()
+    assert memo._compute.calls[-1] == ([0, 3], [1], [5])
+
+def test_recomputing_starts_at_the_earliest_stale_year(memos):
+    memo, _, _ = memos
+    memo.invalidate(rows=0, from_year=4)
+    memo.invalidate(rows=0, from_year=2)
+    memo.invalidate(rows=2, from_year=4)
+    memo.get()
+
+    # Rows that went stale at different years get recomputed separately
+    assert sorted(memo._compute.calls) == [([0], [0, 1, 2], [2, 3, 4, 5]),
+                                           ([2], [0, 1, 2], [4, 5])]
+    assert memo.is_valid()
+
+def test_invalidation_spreads_to_dependents(memos):
+    memo, same, spread = memos
+    memo.invalidate(rows=1, segments=0, from_year=2)
+
+    stale = ~same._valid
+    assert stale[1, 0, 2:].all() and stale.sum() == SHAPE[2] - 2
+    stale = ~spread._valid
+    assert stale[:, 0, 2:].all() and stale.sum() == SHAPE[0] * (SHAPE[2] - 2)
+
+    same.get()
+    spread.get()
+    assert same._compute.calls == [([1], [0], [2, 3, 4, 5])]
+    assert spread._compute.calls == [([0, 1, 2, 3], [0], [2, 3, 4, 5])]
+
+def test_changing_shape_recomputes_everything(memos):
+    memo, _, _ = memos
+    shape = [SHAPE]
+    memo._shape = lambda: shape[0]
+    shape[0] = (2, 3, 6)
+    memo._compute.base = memo._compute.base[:2]
+    memo.get()
+    assert memo._compute.calls == [([0, 1], [0, 1, 2], list(range(6)))]
+
+@pytest.fixture
+def market():
+    table = ProductTable(6)
+    products = scenario.default_products(6, table)
+    for p in products:
+        p.update_stats(0, price=30)
+    return table, products, scenario.default_market_segments()
+
+def fresh_scores(table, market_segments):
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    return (survey_scores(*columns, market_segments, rough_cut=True)
+            * table.column('alive')[:, None, :])
+
+def test_product_edits_rescore_from_their_year_on(market):
+    table, products, market_segments = market
+    share = MarketShare(table, market_segments, [1000] * 5, [0.1] * 5)
+    graph = share.graph
+    computed = graph.scores.computed
+
+    products[1].update_stats(2, performance=6, size=14)
+    graph.product_changed(products[1]._name, 2)
+    assert not graph.scores._valid[1, :, 2:].any()
+    assert graph.scores._valid[1, :, :2].all() and graph.scores._valid[[0, 2, 3, 4]].all()
+
+    assert np.allclose(graph.scores.get(), fresh_scores(table, market_segments))
+    assert graph.scores.computed - computed == len(market_segments) * 4
+    fresh = MarketShare(table, market_segments, [1000] * 5, [0.1] * 5)
+    assert np.allclose(share.share, fresh.share)
+    assert np.allclose(share.units, fresh.units)
+
+def test_segment_changes_rescore_that_segment(market):
+    table, _, market_segments = market
+    share = MarketShare(table, market_segments, [1000] * 5, [0.1] * 5)
+    graph = share.graph
+    computed = graph.scores.computed
+
+    market_segments[3].drift = (0.5, -0.5)
+    graph.segment_changed(3)
+    graph.scores.get()
+    assert graph.scores.computed - computed == len(table) * 6
+    assert np.allclose(graph.scores.get(), fresh_scores(table, market_segments))
+
+    fresh = MarketShare(table, market_segments, [1000] * 5, [0.1] * 5)
+    assert np.allclose(share.share, fresh.share)
+    assert np.allclose(share.units, fresh.units)
+
+def test_plain_score_graphs_dont_rough_cut(market):
+    table, _, market_segments = market
+    graph = ScoreGraph(table, market_segments)
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    assert np.allclose(graph.scores.get(), survey_scores(*columns, market_segments))
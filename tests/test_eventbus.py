@@ -0,0 +1,41 @@
+import numpy as np
+import scenario
+from eventbus import FrameBus
+from product.model import Product
+from product.table import ProductTable
+from surveyscore.scoregraph import ScoreGraph
+from surveyscore.spatialindex import ProductGrid
+
+def make_products(names):
+    table = ProductTable(6)
+    return table, [Product(n, 10, 10, 17000, num_years=6, price=25, table=table) for n in names]
+
+def test_models_listen_on_their_bus_topic():
+    market_segments = scenario.default_market_segments()
+    table, products = make_products(["Listen1", "Listen2"])
+    bus = FrameBus(topic="products_changed_test_listen")
+    for p in products:
+        p.set_bus(bus)
+
+    graph = ScoreGraph(table, market_segments)
+    graph.listen(bus)
+    grid = ProductGrid(table)
+    grid.listen(bus)
+    graph.scores.get()
+    assert len(grid.query((10, 10), 2)) == 2
+
+    products[0].update_stats(2, performance=3, size=17)
+    bus.flush()
+    assert np.allclose(graph.scores.get(), table.survey_scores(market_segments))
+    assert len(grid.query((10, 10), 2)) == 1
+    assert len(grid.query((10, 10), 1)) == 2
+
+def test_models_listen_without_a_bus():
+    market_segments = scenario.default_market_segments()
+    table, products = make_products(["Listen3"])
+    graph = ScoreGraph(table, market_segments)
+    graph.listen()
+    graph.scores.get()
+
+    products[0].update_stats(1, performance=3, size=17)
+    assert np.allclose(graph.scores.get(), table.survey_scores(market_segments))
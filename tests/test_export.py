@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import export
+import scenario
+from perceptualmap import PerceptualMapFigure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_frame_times_cover_the_plan():
+    times = export.frame_times(10, 4)
+    assert times[0] == 0 and times[-1] == 9
+    assert len(times) == 9 * 4 + 1
+
+def test_products_hold_their_yearly_stats_between_frames():
+    market_segments = scenario.default_market_segments()
+    products = scenario.default_products(10)
+    products[0].update_stats(3, performance=12, size=8)
+
+    figure = PerceptualMapFigure(market_segments, products, FigureCanvasAgg, editable=False,
+                                 topic="products_changed_test_export", batched=True)
+    collection = figure.product_controller._collection
+    figure.show_time(2.5)
+    assert np.allclose(collection._positions[0], (products[0].get_performance(2),
+                                                  products[0].get_size(2)))
+    figure.show_time(3)
+    assert np.allclose(collection._positions[0], (12, 8))
+
+def test_workers_dont_need_tk(tmp_path):
+    # Same setup and drawing a worker does, with tkinter made unimportable
+    script = f"""
+import sys
+sys.modules['tkinter'] = sys.modules['_tkinter'] = None
+sys.path.insert(0, {ROOT!r})
+import export, scenario
+d = scenario.to_dict("test", 3, scenario.default_market_segments(), scenario.default_products(3))
+export._init_worker(d, False, 30)
+export._render_frame((1.5, {str(tmp_path / 'frame.png')!r}))
+assert 'main' not in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=str(tmp_path))
+    assert (tmp_path / "frame.png").exists()
@@ -0,0 +1,28 @@
+import os
+from matplotlib import font_manager
+import fontcache
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+
+def test_cached_fonts_match_parsed_ones(tmp_path):
+    cache = str(tmp_path / "fonts.json")
+    cold = fontcache.register_fonts(FONT_DIR, cache)
+    assert os.path.exists(cache)
+    warm = fontcache.register_fonts(FONT_DIR, cache)
+    assert cold == warm
+    assert "Raleway" in cold
+
+    path = font_manager.findfont(font_manager.FontProperties(family="Raleway"),
+                                 fallback_to_default=False)
+    assert os.path.basename(path) == "Raleway-Regular.ttf"
+
+def test_falls_back_to_addfont_when_internals_change(tmp_path, monkeypatch):
+    def broken(font_files, cache):
+        raise AttributeError("matplotlib moved something")
+    monkeypatch.setattr(fontcache, "_entries", broken)
+
+    added = []
+    monkeypatch.setattr(font_manager.fontManager, "addfont", added.append)
+    names = fontcache.register_fonts(FONT_DIR, str(tmp_path / "fonts.json"))
+    assert len(added) == len(names) == 2
+    assert "Raleway" in names
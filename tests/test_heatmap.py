@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import matplotlib.pyplot as plt
+import heatmap
+import scenario
+from heatmap import RasterCache, PositioningHeatmap
+from surveyscore.score import positioning_score
+
+def test_cache_stays_under_its_cap():
+    cache = RasterCache(max_bytes=100)
+    for i in range(5):
+        cache.put(i, f"raster {i}", 30)
+        assert cache._bytes <= 100
+    assert len(cache) == 3 and cache._bytes == 90
+    assert [cache.get(i) for i in range(5)] == [None, None, "raster 2", "raster 3", "raster 4"]
+
+    # Replacing an entry doesn't count it twice
+    cache.put(4, "new raster 4", 30)
+    assert cache._bytes == 90 and cache.get(4) == "new raster 4"
+
+    # Something bigger than the cap still gets kept (on its own)
+    cache.put("big", "big raster", 250)
+    assert len(cache) == 1 and cache.get("big") == "big raster"
+
+def test_cache_throws_out_the_least_recently_used():
+    cache = RasterCache(max_bytes=3)
+    for key in "abc":
+        cache.put(key, key.upper(), 1)
+    assert cache.get("a") == "A"      # Now b is the oldest
+    cache.put("d", "D", 1)
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+
+    cache.put("e", "E", 2)            # a and c are older than d
+    assert [cache.get(key) for key in "acde"] == [None, None, "D", "E"]
+
+class SyncExecutor:
+    """
+    Runs jobs right away, like a ComputeExecutor whose poll came back instantly
+    """
+    def submit(self, key, fn, *args, on_done=None, **kwargs):
+        result = fn(*args, **kwargs)
+        if on_done is not None:
+            on_done(result)
+
+@pytest.fixture
+def computed(monkeypatch):
+    """
+    How many segment rasters have been computed
+    """
+    count = [0]
+    rasters = heatmap._rasters
+    def counting(grid, segments):
+        count[0] += len(segments)
+        return rasters(grid, segments)
+    monkeypatch.setattr(heatmap, "_rasters", counting)
+    return count
+
+def expected_image(overlay, market_segments, t):
+    return np.maximum.reduce([positioning_score(ms.trajectory.location(t), ms._offset,
+                                                overlay._grid)
+                              for ms in market_segments])
+
+@pytest.mark.parametrize("executor", [None, SyncExecutor()])
+def test_edited_segments_are_redrawn(computed, executor):
+    market_segments = scenario.default_market_segments()
+    fig, ax = plt.subplots()
+    overlay = PositioningHeatmap(ax, market_segments, resolution=40, executor=executor)
+    overlay.set_visible(True)
+    assert computed[0] == len(market_segments)
+    overlay.update(1)
+    overlay.update(0)
+    assert computed[0] == 2 * len(market_segments)
+
+    # Only the edited segment gets recomputed, since its trajectory got rebuilt
+    market_segments[2].drift = (1, 1)
+    overlay.update(0)
+    assert computed[0] == 2 * len(market_segments) + 1
+    assert np.allclose(overlay._image.get_array().filled(0),
+                       expected_image(overlay, market_segments, 0), atol=1e-6)
+    plt.close(fig)
+
+def test_cache_cap_is_respected(computed):
+    market_segments = scenario.default_market_segments()
+    fig, ax = plt.subplots()
+    raster_bytes = 40 * 40 * 4
+    overlay = PositioningHeatmap(ax, market_segments, resolution=40,
+                                 max_bytes=7 * raster_bytes)
+    overlay.set_visible(True)
+    overlay.update(1)
+    assert len(overlay._cache) == 7 and overlay._cache._bytes == 7 * raster_bytes
+
+    # Year 0's first segments got thrown out to make room, the rest are still there
+    overlay.update(0)
+    assert computed[0] == 2 * len(market_segments) + 3
+    plt.close(fig)
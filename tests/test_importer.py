@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from product.importer import import_csv
+from product.table import ProductTable
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "products.csv"
+    path.write_text(text)
+    return str(path)
+
+def test_stats_hold_until_the_next_row(tmp_path):
+    path = write_csv(tmp_path, """name,performance,size,mtbf,age,price,year
+Able,5.5,14.5,17500,3,28.00,1
+Able,6.2,13.8,18000,1.5,,3
+Baker,3,17,14000,0,20,0
+""")
+    table, report = import_csv(path, num_years=5)
+    assert report.rows_read == report.rows_imported == 3
+    assert sorted(report.products) == ["Able", "Baker"]
+
+    row = table.row("Able")
+    assert list(table.column('performance')[row]) == [5.5, 5.5, 5.5, 6.2, 6.2]
+    assert list(table.column('age')[row]) == [2, 3, 4, 1.5, 2.5]
+    assert list(table.column('alive')[row]) == [False, True, True, True, True]
+    assert np.isnan(table.column('price')[row, 3])
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 100])
+def test_the_last_row_for_a_year_wins(tmp_path, chunk_size):
+    path = write_csv(tmp_path, """name,performance,size,mtbf,age,price,year
+Able,1,1,17500,0,20,0
+Able,2,2,17500,0,20,0
+Baker,5,5,17500,0,20,1
+Able,3,3,17500,0,20,0
+""")
+    table, report = import_csv(path, num_years=3, chunk_size=chunk_size)
+    assert list(table.column('performance')[table.row("Able")]) == [3, 3, 3]
+
+def test_bad_rows_are_rejected_with_their_line_numbers(tmp_path):
+    path = write_csv(tmp_path, """name,performance,size,mtbf,age,price,year
+Able,5,5,17500,0,20,0
+"Two
+lines",5,5,17500,0,20,0
+Baker,x,5,17500,0,20,0
+,5,5,17500,0,20,0
+Charlie,5,5,17500,0,20,9
+Delta,-1,5,17500,0,20,0
+Echo,5,5,0,0,20,0
+Fox,5,5,17500,-1,20,0
+Golf,5,5,17500,0,abc,0
+""")
+    table, report = import_csv(path, num_years=3, chunk_size=4)
+    assert report.rows_read == 9
+    assert report.rows_imported == 2
+    assert sorted(report.products) == ["Able", "Two\nlines"]
+    assert report.examples == [
+        (5, "not a number"),
+        (6, "missing name"),
+        (7, "year outside the simulation"),
+        (8, "negative performance/size"),
+        (9, "MTBF not positive"),
+        (10, "negative age"),
+        (11, "not a number"),
+    ]
+    assert report.rejected["not a number"] == 2
+
+def test_products_already_in_the_table_keep_their_earlier_stats(tmp_path):
+    table = ProductTable(4)
+    table.add("Able", size=10, performance=10, mtbf=17000, price=25)
+    path = write_csv(tmp_path, """name,performance,size,mtbf,age,price,year
+Able,6,6,18000,0,30,2
+""")
+    import_csv(path, table=table)
+    assert list(table.column('performance')[0]) == [10, 10, 6, 6]
+    assert list(table.column('age')[0]) == [0, 1, 0, 1]
@@ -0,0 +1,35 @@
+from main import PerceptualMap
+
+class FakeMap(PerceptualMap):
+    """
+    Just enough of a PerceptualMap to drag its slider without a display
+    """
+    def __init__(self):
+        self._slider_year = None
+        self.idle = []
+        self.drawn = []
+
+    def after_idle(self, fn):
+        self.idle.append(fn)
+
+    def update_time(self, t):
+        self.drawn.append(t)
+
+    def run_idle(self):
+        idle, self.idle = self.idle, []
+        for fn in idle:
+            fn()
+
+def test_slider_drags_are_coalesced():
+    m = FakeMap()
+    for t in ("1", "2", "3", "4"):
+        m._on_slider(t)
+    assert len(m.idle) == 1 and m.drawn == []
+    m.run_idle()
+    assert m.drawn == [4]
+
+    # Once drawn, the next drag schedules again
+    m._on_slider("2")
+    m._on_slider("1")
+    m.run_idle()
+    assert m.drawn == [4, 1] and m.idle == []
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import scenario
+from product.model import Product
+from product.table import ProductTable
+from surveyscore.marketshare import MarketShare
+from surveyscore.score import survey_scores
+
+NUM_YEARS = 6
+SIZES = [1000, 2000, 500, 800, 700]
+GROWTH = [0.1, 0.05, 0.2, 0.15, 0.12]
+
+@pytest.fixture
+def market():
+    table = ProductTable(NUM_YEARS)
+    products = scenario.default_products(NUM_YEARS, table)
+    for p in products:
+        p.update_stats(0, price=30)
+    products.append(Product("Late", size=15, performance=5, mtbf=20000, year=2, price=28,
+                            table=table))
+    return table, products, scenario.default_market_segments()
+
+def reference(table, market_segments):
+    """
+    Units and shares the slow way: one segment and one year at a time
+    """
+    shape = (len(table), len(market_segments), NUM_YEARS)
+    units, share = np.zeros(shape), np.zeros(shape)
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    for t in range(NUM_YEARS):
+        for s, ms in enumerate(market_segments):
+            scores = survey_scores(*[c[:, t:t + 1] for c in columns], [ms], years=[t],
+                                   rough_cut=True)[:, 0, 0]
+            scores = scores * table.column('alive')[:, t]
+            if scores.sum() > 0:
+                share[:, s, t] = scores / scores.sum()
+            units[:, s, t] = share[:, s, t] * SIZES[s] * (1 + GROWTH[s])**t
+    return share, units
+
+def test_matches_a_per_year_recompute(market):
+    table, _, market_segments = market
+    share = MarketShare(table, market_segments, SIZES, GROWTH)
+    expected_share, expected_units = reference(table, market_segments)
+    assert np.allclose(share.share, expected_share)
+    assert np.allclose(share.units, expected_units)
+
+def test_demand_grows_every_year(market):
+    table, _, market_segments = market
+    share = MarketShare(table, market_segments, SIZES, GROWTH)
+    assert np.allclose(share.demand[:, 0], SIZES)
+    assert np.allclose(share.demand[:, 1:] / share.demand[:, :-1], 1 + np.array(GROWTH)[:, None])
+
+def test_products_that_arent_out_yet_sell_nothing(market):
+    table, _, market_segments = market
+    share = MarketShare(table, market_segments, SIZES, GROWTH)
+    late = table.row("Late")
+    assert np.all(share.units[late, :, :2] == 0)
+    assert np.any(share.units[late, :, 2:] > 0)
+
+def test_products_outside_every_circle_sell_nothing(market):
+    table, _, market_segments = market
+    Product("Far", size=1, performance=19, mtbf=27000, price=25, table=table)
+    share = MarketShare(table, market_segments, SIZES, GROWTH)
+    assert np.all(share.units[table.row("Far")] == 0)
+
+    # Wherever somebody qualifies, the whole segment's demand gets split up
+    total = share.share.sum(axis=0)
+    anyone = share.scores.sum(axis=0) > 0
+    assert anyone.any()
+    assert np.allclose(total[anyone], 1)
+    assert np.all(total[~anyone] == 0)
+
+def test_edits_are_rescored_from_their_year_on(market):
+    table, products, market_segments = market
+    share = MarketShare(table, market_segments, SIZES, GROWTH)
+    before = share.units.copy()
+    computed = share.graph.scores.computed
+
+    products[2].update_stats(3, performance=11, size=9, price=35)
+    share.product_changed(products[2]._name, 3)
+    expected_share, expected_units = reference(table, market_segments)
+    assert np.allclose(share.share, expected_share)
+    assert np.allclose(share.units, expected_units)
+
+    # Only the edited product got rescored, and only from year 3 on
+    assert share.graph.scores.computed - computed == len(market_segments) * (NUM_YEARS - 3)
+    assert np.array_equal(share.units[:, :, :3], before[:, :, :3])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import scenario
+from product.table import ProductTable
+from surveyscore.montecarlo import simulate_table
+from surveyscore.score import survey_scores
+
+NUM_YEARS = 6
+BINS = 1000
+
+@pytest.fixture
+def market():
+    table = ProductTable(NUM_YEARS)
+    for p in scenario.default_products(NUM_YEARS, table):
+        p.update_stats(0, price=30)
+    return table, scenario.default_market_segments()
+
+def test_no_perturbation_gives_the_survey_scores(market):
+    table, market_segments = market
+    result = simulate_table(table, market_segments, num_samples=50, chunk_size=20, bins=BINS,
+                            seed=1, drift_sd=0, offset_sd=0, age_stdev_scale=(1, 1))
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    expected = survey_scores(*columns, market_segments)
+
+    assert np.allclose(result.mean, expected)
+    for q in (5, 50, 95):
+        # Percentiles are only as fine as the histogram
+        assert np.all(np.abs(result.percentiles[q] - expected) <= 1 / BINS)
+
+@pytest.mark.parametrize("importance_concentration", [None, 50])
+def test_chunking_doesnt_change_the_results(market, importance_concentration):
+    table, market_segments = market
+    kwargs = dict(num_samples=300, seed=7, percentiles=(5, 50, 95),
+                  importance_concentration=importance_concentration)
+    whole = simulate_table(table, market_segments, chunk_size=300, **kwargs)
+    for chunk_size in (1, 64, 100):
+        chunked = simulate_table(table, market_segments, chunk_size=chunk_size, **kwargs)
+        for q in (5, 50, 95):
+            assert np.array_equal(chunked.percentiles[q], whole.percentiles[q])
+        assert np.allclose(chunked.mean, whole.mean)
+
+def test_perturbation_spreads_the_scores(market):
+    table, market_segments = market
+    result = simulate_table(table, market_segments, num_samples=300, seed=3)
+    assert np.all(result.percentiles[5] <= result.percentiles[50])
+    assert np.all(result.percentiles[50] <= result.percentiles[95])
+    assert np.any(result.percentiles[5] < result.percentiles[95])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import scenario
+from product.table import ProductTable
+from surveyscore.optimizer import optimize_products, optimize_product, apply_plan
+from surveyscore.score import survey_scores
+
+NUM_YEARS = 6
+
+@pytest.fixture
+def market():
+    table = ProductTable(NUM_YEARS)
+    products = scenario.default_products(NUM_YEARS, table)
+    market_segments = scenario.default_market_segments()
+    targets = [market_segments[i % len(market_segments)] for i in range(len(products))]
+    return table, products, targets
+
+def test_moves_stay_within_a_years_reach(market):
+    table, products, targets = market
+
+    # Too far from the Size segment to reach its circle, so it heads for it at full speed
+    products[0].update_stats(0, performance=18, size=2)
+    targets[0] = scenario.default_market_segments()[4]
+    plans = optimize_products(products, targets, start=1, max_move=1.5)
+
+    for i, p in enumerate(products):
+        plan = plans[p._name]
+        position = np.column_stack((plan.performance, plan.size))
+        position[0] = (p.get_performance(0), p.get_size(0))
+        moves = np.hypot(*np.diff(position, axis=0).T)
+        assert (moves <= 1.5 + 1e-9).all()
+        if i == 0:
+            assert np.allclose(moves, 1.5)
+
+def test_price_is_the_middle_of_the_band(market):
+    _, products, targets = market
+    plans = optimize_products(products, targets)
+    for p, ms in zip(products, targets):
+        low, high = ms.trajectory.price_range(np.arange(NUM_YEARS)).T
+        assert np.allclose(plans[p._name].price, (low + high) / 2, atol=1e-6)
+
+def test_mtbf_ties_go_to_the_cheapest(market):
+    _, products, targets = market
+    _, high = targets[0].get_mtbf_range()
+    choices = [high + 4000, high - 2000, high + 1000, high + 500]
+    plan = optimize_product(products[0], targets[0], mtbf_choices=choices)
+    assert np.all(plan.mtbf == high + 500)
+
+def test_scores_are_the_survey_scores_of_the_plan(market):
+    table, products, targets = market
+    plans = optimize_products(products, targets, start=2)
+    for p, ms in zip(products, targets):
+        apply_plan(p, plans[p._name], start=2)
+
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    for i, (p, ms) in enumerate(zip(products, targets)):
+        scores = survey_scores(*[c[i:i + 1] for c in columns], [ms])[0, 0]
+        assert np.allclose(plans[p._name].score[2:], scores[2:])
+
+def test_apply_plan_goes_through_update_stats(market, monkeypatch):
+    table, products, targets = market
+    product = products[2]
+    before = {c: table.column(c)[product._row].copy() for c in ('performance', 'mtbf')}
+    plan = optimize_product(product, targets[2], start=3)
+
+    calls = []
+    update_stats = product.update_stats
+    def record(t, **stats):
+        calls.append((t, stats))
+        update_stats(t, **stats)
+    monkeypatch.setattr(product, "update_stats", record)
+    apply_plan(product, plan, start=3)
+
+    # One revision per year that changes, starting with everything at the first one
+    assert calls[0][0] == 3 and set(calls[0][1]) == {'performance', 'size', 'mtbf', 'price'}
+    assert [t for t, _ in calls] == sorted({t for t, _ in calls})
+    for column in ('performance', 'size', 'mtbf', 'price'):
+        assert np.allclose(table.column(column)[product._row, 3:], getattr(plan, column)[3:])
+    for column, values in before.items():
+        assert np.array_equal(table.column(column)[product._row, :3], values[:3])
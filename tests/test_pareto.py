@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import scenario
+from surveyscore import pareto
+
+def brute_force_front(objectives):
+    """
+    Every point nothing else beats, keeping the first of identical points
+    """
+    front = []
+    for i, point in enumerate(objectives):
+        beaten = ((objectives >= point).all(axis=1) & (objectives > point).any(axis=1)).any()
+        repeat = (objectives[:i] == point).all(axis=1).any()
+        if not beaten and not repeat:
+            front.append(i)
+    return set(front)
+
+@pytest.mark.parametrize("num_objectives", [1, 2, 3, 5])
+def test_front_matches_brute_force(num_objectives):
+    rng = np.random.default_rng(num_objectives)
+
+    # Rounded so there are plenty of ties and repeats
+    objectives = rng.random((1500, num_objectives)).round(2)
+    front = pareto.pareto_front(objectives, chunk_size=100)
+    assert set(front) == brute_force_front(objectives)
+    assert len(front) == len(set(front))
+
+    totals = objectives[front].sum(axis=1)
+    assert np.all(np.diff(totals) <= 0)
+
+def test_ranks_peel_off_fronts():
+    objectives = np.array([[3, 3], [3, 3], [2, 4], [2, 2], [1, 1], [0, 5]], dtype=float)
+    assert pareto.pareto_ranks(objectives).tolist() == [0, 0, 0, 1, 2, 0]
+    assert pareto.pareto_ranks(objectives, max_rank=1).tolist() == [0, 0, 0, -1, -1, 0]
+
+@pytest.fixture
+def market():
+    return scenario.default_market_segments(), scenario.default_products(10)
+
+def test_pruning_doesnt_change_the_frontier(market):
+    market_segments, products = market
+    age, segments, weights, _ = pareto.search_args(products[0], market_segments, 2, [0, 1])
+    kwargs = dict(step=0.5, price_step=1.0, mtbf_choices=[15000, 17000, 19000])
+    pruned = pareto.search_arrays(age, segments, weights, **kwargs)
+    everything = pareto.search_arrays(age, segments, weights, prune=False, **kwargs)
+
+    def rows(f):
+        return sorted(map(tuple, f.scores.round(9)))
+    assert rows(pruned) == rows(everything)
+
+def test_frontier_scores_match_survey_scores(market):
+    from surveyscore.score import survey_scores
+    market_segments, products = market
+    frontier = pareto.search(products[0], market_segments, 2, segments=[0, 1])
+
+    n = len(frontier.price)
+    age = np.full(n, products[0].get_age(2))
+    scores = survey_scores(frontier.performance[:, None], frontier.size[:, None],
+                           frontier.mtbf[:, None], frontier.price[:, None], age[:, None],
+                           [market_segments[0], market_segments[1]], years=[2])
+    assert np.allclose(scores[:, :, 0], frontier.scores)
+
+def test_defaults_to_the_nearest_two_segments(market):
+    market_segments, products = market
+    cid = next(p for p in products if p._name == "Cid")
+    frontier = pareto.search(cid, market_segments, 2)
+    assert len(frontier.segments) == 2
+    assert frontier.segments == pareto.nearest_segments(cid, market_segments, 2)
+
+def test_editing_the_product_updates_its_frontier(market):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from perceptualmap import PerceptualMapFigure
+
+    market_segments, products = market
+    figure = PerceptualMapFigure(market_segments, products, FigureCanvasAgg, editable=False,
+                                 topic="products_changed_test_pareto")
+    name = products[0]._name
+    figure.show_frontier(name)
+    before = figure.frontier._dots.get_offsets().copy()
+
+    # Moved next to other segments, so it's traded off between other ones
+    products[0].update_stats(0, performance=17, size=3)
+    figure.bus.flush()
+    assert not np.array_equal(figure.frontier._dots.get_offsets(), before)
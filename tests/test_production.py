@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from production import plan_production, labor_cost, CARRYING_RATE, MATERIAL_COST
+
+def check_consistent(plan, demand, starting_inventory=0):
+    assert np.allclose(plan.sales + plan.lost_sales, demand)
+    assert np.allclose(plan.inventory,
+                       starting_inventory + np.cumsum(plan.production - plan.sales, axis=1))
+    assert (plan.inventory > -1e-9).all()
+    assert (plan.first_shift > -1e-9).all() and (plan.overtime > -1e-9).all()
+
+def test_demand_under_capacity_is_built_on_the_first_shift():
+    demand = np.array([[50, 80, 100], [10, 0, 30]], dtype=float)
+    plan = plan_production(demand, [100, 40], [5, 5])
+    check_consistent(plan, demand)
+    assert np.allclose(plan.first_shift, demand)
+    assert np.allclose(plan.overtime, 0)
+    assert np.allclose(plan.inventory, 0)
+    assert np.allclose(plan.cost, 0)
+
+def test_peaks_use_the_cheapest_of_building_ahead_and_overtime():
+    demand = np.array([[50, 150]], dtype=float)
+
+    # Carrying a unit for a year costs less than overtime here, so it's built ahead
+    plan = plan_production(demand, [100], [10], carrying_rate=0.01)
+    check_consistent(plan, demand)
+    assert np.allclose(plan.first_shift, [[100, 100]])
+    assert np.allclose(plan.overtime, 0)
+
+    # And here it doesn't
+    plan = plan_production(demand, [100], [1], carrying_rate=0.5)
+    check_consistent(plan, demand)
+    assert np.allclose(plan.first_shift, [[50, 100]])
+    assert np.allclose(plan.overtime, [[0, 50]])
+
+def test_sources_cost_what_they_did_the_year_they_were_built():
+    # Automation drops after year 0, so year 1's demand is cheaper to build in year 0
+    demand = np.array([[0, 100]], dtype=float)
+    automation = np.array([[10, 1]])
+    plan = plan_production(demand, [100], automation, price=[[15, 15]])
+    check_consistent(plan, demand)
+    assert np.allclose(plan.first_shift, [[100, 0]])
+    assert np.allclose(plan.lost_sales, 0)
+    unit_cost = MATERIAL_COST + labor_cost(10)
+    assert np.allclose(plan.cost, 100 * CARRYING_RATE * unit_cost)
+
+def test_sales_that_cost_more_than_their_price_are_lost():
+    demand = np.array([[100, 100]], dtype=float)
+    plan = plan_production(demand, [100], [1], price=[[10, np.nan]])
+    check_consistent(plan, demand)
+    assert np.allclose(plan.sales, [[0, 100]])
+
+@pytest.mark.parametrize("target", [0.95, 1.2])
+def test_target_utilization(target):
+    demand = np.array([[50, 80, 100, 150], [120, 120, 120, 120]], dtype=float)
+    capacity = np.array([100, 100], dtype=float)
+    untargeted = plan_production(demand, capacity, [3, 8])
+    plan = plan_production(demand, capacity, [3, 8], target_utilization=target)
+    check_consistent(plan, demand)
+
+    assert (plan.utilization >= target - 1e-9).all()
+    assert np.allclose(plan.sales, untargeted.sales)
+    assert (plan.cost >= untargeted.cost - 1e-9).all()
+
+def test_target_utilization_builds_ahead_before_building_for_inventory():
+    demand = np.array([[50, 80, 100, 150]], dtype=float)
+    plan = plan_production(demand, [100], [3], target_utilization=0.95)
+    check_consistent(plan, demand)
+    assert np.allclose(plan.production, 95)
+    assert np.isclose(plan.inventory[0, -1], 0)
+
+def test_target_utilization_stays_under_the_max():
+    demand = np.zeros((1, 3))
+    plan = plan_production(demand, [100], [5], target_utilization=3, max_utilization=1.5)
+    check_consistent(plan, demand)
+    assert np.allclose(plan.utilization, 1.5)
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+import pytest
+import scenario
+from product.table import ProductTable
+from scenariolibrary import ScenarioLibrary, ScenarioLibraryWriter, from_scenario_dicts, is_library
+
+def test_round_trip(tmp_path):
+    market_segments = scenario.default_market_segments()
+    products = scenario.default_products(6)
+    with ScenarioLibraryWriter(tmp_path, 6) as writer:
+        writer.add("first", market_segments, products)
+        writer.add("empty", market_segments[:2], [])
+        writer.add("second", market_segments[:1], products)
+
+    library = ScenarioLibrary(tmp_path)
+    assert library.names() == ["first", "empty", "second"]
+
+    name, num_years, segments, read, table = library.scenario(0)
+    assert (name, num_years) == ("first", 6)
+    assert [ms._name for ms in segments] == [ms._name for ms in market_segments]
+    assert [p._name for p in read] == [p._name for p in products]
+    for c in ProductTable.COLUMNS:
+        assert np.array_equal(table.column(c), products[0]._table.column(c), equal_nan=True)
+
+    name, _, segments, read, table = library.scenario(1)
+    assert name == "empty" and len(segments) == 2
+    assert read == [] and len(table) == 0
+    assert library.product_names(2) == [p._name for p in products]
+
+def test_names_that_are_too_long(tmp_path):
+    market_segments = scenario.default_market_segments()
+    products = scenario.default_products(6)
+    with ScenarioLibraryWriter(tmp_path, 6) as writer:
+        with pytest.raises(ValueError):
+            writer.add("x" * 65, market_segments, products)
+        with pytest.raises(ValueError):
+            writer.add("é" * 33, market_segments, products)    # 66 bytes of utf-8
+        writer.add("y" * 64, market_segments, products)
+
+    # The ones that failed didn't leave anything behind
+    library = ScenarioLibrary(tmp_path)
+    assert library.names() == ["y" * 64]
+    assert library.product_names(0) == [p._name for p in products]
+
+def test_wrong_number_of_years(tmp_path):
+    with ScenarioLibraryWriter(tmp_path, 6) as writer:
+        with pytest.raises(ValueError):
+            writer.add("short", scenario.default_market_segments(), scenario.default_products(4))
+        writer.add("right", scenario.default_market_segments(), scenario.default_products(6))
+    assert ScenarioLibrary(tmp_path).names() == ["right"]
+
+def test_failed_writes_dont_leave_a_library(tmp_path):
+    with ScenarioLibraryWriter(tmp_path, 6) as writer:
+        writer.add("old", scenario.default_market_segments(), scenario.default_products(6))
+    assert is_library(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with ScenarioLibraryWriter(tmp_path, 6) as writer:
+            writer.add("first", scenario.default_market_segments(), scenario.default_products(6))
+            raise RuntimeError("ran out of scenarios")
+    assert not is_library(tmp_path)
+    assert writer._files is None
+
+def test_default_names_fit(tmp_path, monkeypatch):
+    directory = tmp_path / ("very long directory name " * 4)
+    directory.mkdir()
+    lines = json.dumps({'num_years': 6, 'products': []}) + "\n"
+    for name in ("a.jsonl", "b.jsonl", "é" * 30 + ".jsonl"):
+        (directory / name).write_text(lines * 2)
+    paths = sorted(str(p) for p in directory.iterdir())
+    library = tmp_path / "library"
+    from_scenario_dicts(library, scenario.iter_scenario_dicts(paths))
+
+    names = ScenarioLibrary(library).names()
+    assert len(set(names)) == 6
+    assert all(len(n.encode('utf-8')) <= 64 for n in names)
+    assert names[0].endswith("a.jsonl:0") and names[3].endswith("b.jsonl:1")
+
+    # Short ones are left alone
+    assert next(scenario.iter_scenario_dicts([paths[0]]))['name'] == names[0]
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "c.jsonl").write_text(lines)
+    assert next(scenario.iter_scenario_dicts(["c.jsonl"]))['name'] == "c.jsonl:0"
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import scenario
+from surveyscore.score import (age_score, price_score, mtbf_score, positioning_score,
+                               survey_scores, pair_scores, FALLOFF, ROUGH_CUT_RADIUS)
+
+def one_score(ms, performance, size, mtbf, price, age, t):
+    """
+    A single product's score in a single segment, one float at a time
+    """
+    c = ms.criteria
+    low, high = ms.get_price_range(t)
+    return (c.age.importance * float(age_score(age, c.age.mean, c.age.stdev))
+            + c.price.importance * float(price_score(price, low, high))
+            + c.position.importance * float(positioning_score(ms.get_location(t), ms.offset,
+                                                              (performance, size)))
+            + c.mtbf.importance * float(mtbf_score(mtbf, c.mtbf.low, c.mtbf.high)))
+
+@pytest.fixture
+def timelines():
+    rng = np.random.default_rng(2)
+    shape = (15, 6)
+    return (rng.uniform(0, 20, shape), rng.uniform(0, 20, shape), rng.uniform(12000, 27000, shape),
+            rng.uniform(10, 45, shape), rng.uniform(0, 5, shape))
+
+def test_batched_scores_match_scoring_one_at_a_time(timelines):
+    market_segments = scenario.default_market_segments()
+    scores = survey_scores(*timelines, market_segments)
+    assert scores.shape == (15, len(market_segments), 6)
+    for p in range(15):
+        for s, ms in enumerate(market_segments):
+            for t in range(6):
+                stats = [a[p, t] for a in timelines]
+                assert np.isclose(scores[p, s, t], one_score(ms, *stats, t))
+
+@pytest.mark.parametrize("rough_cut", [False, True])
+def test_pair_scores_match_batched_scores(timelines, rough_cut):
+    market_segments = scenario.default_market_segments()
+    scores = survey_scores(*timelines, market_segments, rough_cut=rough_cut)
+    rng = np.random.default_rng(3)
+    p, s, t = rng.integers(15, size=50), rng.integers(len(market_segments), size=50), \
+              rng.integers(6, size=50)
+    assert np.allclose(pair_scores(*timelines, market_segments, p, s, t, rough_cut=rough_cut),
+                       scores[p, s, t])
+
+def test_rough_cut_only_zeroes_products_outside_the_circle(timelines):
+    market_segments = scenario.default_market_segments()
+    plain = survey_scores(*timelines, market_segments)
+    cut = survey_scores(*timelines, market_segments, rough_cut=True)
+
+    centroids = np.array([ms.trajectory.location(np.arange(6)) for ms in market_segments])
+    position = np.stack(timelines[:2], axis=-1)[:, None]
+    outside = np.hypot(*np.moveaxis(position - centroids, -1, 0)) >= ROUGH_CUT_RADIUS
+    assert outside.any() and (~outside).any()
+    assert np.all(cut[outside] == 0)
+    assert np.allclose(cut[~outside], plain[~outside])
+
+def test_criteria_scores():
+    assert age_score(2, 2, 1) == 1
+    assert np.isclose(age_score(3, 2, 1), np.exp(-0.5))
+
+    assert price_score(25, 20, 30) == 1
+    assert np.isclose(price_score(27, 20, 30), FALLOFF**2)
+    assert price_score(35, 20, 30) > 0 and price_score(35.5, 20, 30) == 0
+    assert price_score(np.nan, 20, 30) == 0
+
+    assert mtbf_score(23000, 17000, 23000) == mtbf_score(30000, 17000, 23000) == 1
+    assert np.isclose(mtbf_score(21000, 17000, 23000), FALLOFF**2)
+    assert mtbf_score(17999, 17000, 23000) == 0
+
+    # Full marks on the ideal spot (inside the fine cut), nothing outside the rough cut
+    assert positioning_score((10, 10), (1, 1), (11, 11)) == 1
+    assert positioning_score((10, 10), (0, 0), (10, 10 + ROUGH_CUT_RADIUS)) == 0
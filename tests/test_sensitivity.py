@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import scenario
+from product.table import ProductTable
+from surveyscore.score import survey_scores
+from surveyscore.sensitivity import (sensitivity_table, best_moves, format_moves, Move,
+                                     Sensitivity, PARAMETERS, STEPS)
+
+NUM_YEARS = 6
+
+@pytest.fixture
+def market():
+    table = ProductTable(NUM_YEARS)
+    for p in scenario.default_products(NUM_YEARS, table):
+        p.update_stats(0, price=30)
+    return table, scenario.default_market_segments()
+
+def test_deltas_match_scoring_nudged_copies(market):
+    table, market_segments = market
+    result = sensitivity_table(table, market_segments)
+    columns = {c: table.column(c) for c in PARAMETERS}
+    base = survey_scores(*columns.values(), market_segments)
+    assert np.allclose(result.base, base)
+
+    for i, parameter in enumerate(PARAMETERS):
+        for d, direction in enumerate((1, -1)):
+            nudged = dict(columns)
+            nudged[parameter] = columns[parameter] + direction * STEPS[parameter]
+            expected = survey_scores(*nudged.values(), market_segments) - base
+            assert np.allclose(result.delta[i, d], expected)
+
+    # The gradient is the central difference of the same two nudges
+    steps = np.array([STEPS[p] for p in PARAMETERS])[:, None, None, None]
+    assert np.allclose(result.gradient, (result.delta[:, 0] - result.delta[:, 1]) / (2 * steps))
+
+def made_up_result():
+    """
+    A Sensitivity over 2 products, 1 segment and 2 years with gains picked by hand
+    """
+    delta = np.full((len(PARAMETERS), 2, 2, 1, 2), -0.01)
+    delta[0, 0, 0, 0, 0] = 0.05     # A, year 0: more performance
+    delta[3, 1, 0, 0, 0] = 0.02     #            less price, not as good
+    delta[2, 0, 1, 0, 0] = 0.10     # B, year 0: more mtbf
+    delta[1, 1, 1, 0, 1] = 0.03     # B, year 1: less size
+    # A, year 1 can't gain anything
+    base = np.array([[[0.5, 0.6]], [[0.2, 0.3]]])
+    steps = np.array([STEPS[p] for p in PARAMETERS], dtype=float)
+    return Sensitivity(base, np.zeros(delta[:, 0].shape), delta, steps)
+
+def test_best_moves_ranks_the_best_step_per_cell():
+    moves = best_moves(made_up_result(), ["A", "B"], ["High End"])
+    assert moves == [Move("B", "High End", 0, 'mtbf', 500.0, 0.10, 0.2),
+                     Move("A", "High End", 0, 'performance', 0.5, 0.05, 0.5),
+                     Move("B", "High End", 1, 'size', -0.5, 0.03, 0.3)]
+
+def test_best_moves_filters():
+    result = made_up_result()
+    assert [m.product for m in best_moves(result, ["A", "B"], ["High End"], top=1)] == ["B"]
+    assert [(m.product, m.year) for m in best_moves(result, ["A", "B"], ["High End"],
+                                                    years=[1])] == [("B", 1)]
+    moves = best_moves(result, ["A", "B"], ["High End"], products=["A"])
+    assert [(m.product, m.parameter) for m in moves] == [("A", 'performance')]
+    assert best_moves(result, ["A", "B"], ["High End"], products=["A"], years=[1]) == []
+
+def test_format_moves():
+    moves = [Move("Cake", "Traditional", 2, 'mtbf', 500.0, 0.0421, 0.61234),
+             Move("Cedar", "High End", 0, 'price', -0.5, 0.0037, 0.1)]
+    assert format_moves(moves) == (
+        "product      segment        year  move                  score    gain\n"
+        "Cake         Traditional       2  mtbf +500             0.612  +0.042\n"
+        "Cedar        High End          0  price -0.5            0.100  +0.004")
+    assert format_moves([]).count("\n") == 0
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from product.table import ProductTable
+from scenario import default_market_segments
+from surveyscore.score import survey_scores
+from surveyscore.spatialindex import ProductGrid
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    table = ProductTable(12)
+    for i in range(300):
+        table.add(f"p{i}", rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(14000, 27000),
+                  price=rng.uniform(15, 40))
+    return table
+
+def rough_cut_scores(table, market_segments):
+    columns = [table.column(c) for c in ('performance', 'size', 'mtbf', 'price', 'age')]
+    return survey_scores(*columns, market_segments, rough_cut=True)
+
+def test_pruned_scores_match_dense_scores(table):
+    market_segments = default_market_segments()
+    grid = ProductGrid(table, dense_below=0)
+    assert np.allclose(grid.survey_scores(market_segments), rough_cut_scores(table, market_segments))
+
+def test_small_tables_are_scored_densely(table, monkeypatch):
+    grid = ProductGrid(table, dense_below=10**9)
+    monkeypatch.setattr(grid, "rough_cut_pairs", None)
+    market_segments = default_market_segments()
+    assert np.allclose(grid.survey_scores(market_segments), rough_cut_scores(table, market_segments))
+
+def test_query_matches_brute_force(table):
+    grid = ProductGrid(table)
+    performance, size = table.column('performance'), table.column('size')
+    for center, t in (((5, 15), 0), ((0.1, 0.1), 3), ((19, 7), 11)):
+        expected = np.flatnonzero(np.hypot(performance[:, t] - center[0],
+                                           size[:, t] - center[1]) <= 4)
+        assert sorted(grid.query(center, t)) == expected.tolist()
+
+def test_positions_without_coordinates_are_left_out(table):
+    table.fill('performance', 0, 5, np.nan)
+    grid = ProductGrid(table)
+    p, s, t = grid.rough_cut_pairs(default_market_segments())
+    assert not np.any((p == 0) & (t >= 5))
+
+def test_moves_show_up_in_queries(table):
+    grid = ProductGrid(table)
+    table.fill('performance', 7, 4, 10.0)
+    table.fill('size', 7, 4, 10.0)
+    grid.product_changed("p7", 4)
+    assert 7 in grid.query((10, 10), 4, radius=0.5)
+    assert 7 in grid.query((10, 10), 11, radius=0.5)
+
+def test_rough_cut_only_zeroes_scores(table):
+    market_segments = default_market_segments()
+    plain = table.survey_scores(market_segments)
+    cut = rough_cut_scores(table, market_segments)
+    assert np.all((cut == plain) | (cut == 0))
+    assert np.any(cut != plain)
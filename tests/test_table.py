@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from product.model import Product
+from product.table import ProductTable
+
+def test_growing_past_capacity_keeps_every_row():
+    table = ProductTable(4, capacity=2)
+    for i in range(9):
+        assert table.add(f"P{i}", size=i, performance=20 - i, mtbf=15000 + i,
+                         price=20 + i, year=i % 3) == i
+    assert len(table) == 9 and len(table._data['size']) == 16
+    assert table.names == [f"P{i}" for i in range(9)]
+
+    for i, name in enumerate(table.names):
+        row = table.row(name)
+        assert list(table.column('size')[row]) == [i] * 4
+        assert list(table.column('performance')[row]) == [20 - i] * 4
+        assert list(table.column('age')[row]) == list(np.arange(4) - i % 3)
+        assert list(table.column('alive')[row]) == list(np.arange(4) >= i % 3)
+    assert table.column('mtbf').shape == (9, 4)
+
+def test_tables_can_start_empty():
+    table = ProductTable(3, capacity=0)
+    table.add("A", 10, 5, 17000)
+    assert len(table) == 1 and np.isnan(table.column('price')).all()
+
+def test_fill_and_set_age_only_change_from_their_year_on():
+    table = ProductTable(6)
+    a = table.add("A", 10, 5, 17000, price=30)
+    b = table.add("B", 4, 15, 20000, price=25, year=2)
+
+    table.fill('size', a, 3, 12)
+    table.fill('price', a, 5, 28.5)
+    table.set_age(b, 3, 0.5)
+    assert list(table.column('size')[a]) == [10, 10, 10, 12, 12, 12]
+    assert list(table.column('price')[a]) == [30] * 5 + [28.5]
+    assert list(table.column('age')[b]) == [-2, -1, 0, 0.5, 1.5, 2.5]
+
+    # The other row is left alone
+    assert list(table.column('size')[b]) == [4] * 6
+    assert list(table.column('age')[a]) == list(range(6))
+    assert table.get('size', a, 4) == 12
+
+def test_frozen_tables_cant_change():
+    table = ProductTable(6)
+    table.add("A", 10, 5, 17000)
+    table.branch()
+    with pytest.raises(AssertionError):
+        table.fill('size', 0, 0, 1)
+    with pytest.raises(AssertionError):
+        table.set_age(0, 0, 1)
+    with pytest.raises(AssertionError):
+        table.add("B", 4, 15, 20000)
+
+def test_views_share_the_row():
+    table = ProductTable(6, capacity=1)
+    Product("A", size=10, performance=5, mtbf=17000, price=30, table=table)
+    original = Product("B", size=4, performance=15, mtbf=20000, year=1, table=table)
+    view = Product.view(table, "B")
+    assert view._row == original._row == 1
+
+    original.update_stats(2, size=5, mtbf=21000)
+    assert [view.get_size(t) for t in range(6)] == [4, 4, 5, 5, 5, 5]
+    assert view.get_mtbf(4) == 21000 and view.get_age(0) == -1 and not view.is_alive(0)
+
+    view.update_stats(4, performance=13, age=0)
+    assert original.get_performance(4) == 13 and original.get_age(5) == 1
+    assert list(table.column('performance')[1]) == [15] * 4 + [13] * 2
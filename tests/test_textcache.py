@@ -0,0 +1,63 @@
+import io
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import textcache
+from textcache import cached_text
+
+def make_figure():
+    # One data unit per pixel, so labels can be put on whole pixels
+    fig = Figure(figsize=(4, 3), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_xlim(0, 400)
+    ax.set_ylim(0, 300)
+    ax.axis('off')
+    return fig, ax
+
+LABELS = [((100, 100), r"\$25.00 to \$35.00", dict(c='C1', ha='center', va='center')),
+          ((30, 250), "Cake (2)", {}),
+          ((390, 290), "runs off the edge", dict(c='C2', rotation=20))]
+
+def render(text):
+    fig, ax = make_figure()
+    for xy, s, kwargs in LABELS:
+        text(ax, *xy, s, **kwargs)
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+def test_cached_labels_look_the_same():
+    assert np.array_equal(render(cached_text), render(lambda ax, *a, **k: ax.text(*a, **k)))
+
+def test_labels_are_only_rasterized_once(monkeypatch):
+    monkeypatch.setattr(textcache, "_cache", textcache.RasterCache(2**20))
+    rasterized = []
+    rasterize = textcache.CachedText._rasterize
+    def counting(self, renderer, anchor):
+        rasterized.append(self.get_text())
+        return rasterize(self, renderer, anchor)
+    monkeypatch.setattr(textcache.CachedText, "_rasterize", counting)
+
+    fig, ax = make_figure()
+    label = cached_text(ax, 100, 100, "$20.00")
+    fig.canvas.draw()
+    label.set_position((150, 120))
+    fig.canvas.draw()
+    assert rasterized == ["$20.00"]
+
+    # New text or a new color is a different picture
+    label.set_text("$19.50")
+    fig.canvas.draw()
+    label.set_color('red')
+    fig.canvas.draw()
+    label.set_text("$20.00")
+    label.set_color('black')
+    fig.canvas.draw()
+    assert rasterized == ["$20.00", "$19.50", "$19.50"]
+
+def test_vector_output_still_has_text():
+    fig, ax = make_figure()
+    cached_text(ax, 100, 100, "Cedar (3)")
+    svg = io.StringIO()
+    fig.savefig(svg, format='svg')
+    assert "Cedar (3)" in svg.getvalue()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import scenario
+from product.table import ProductTable
+from product.timeline import AgeTimeline, SparseProductTable, Timeline
+
+def test_timeline_only_keeps_changes():
+    timeline = Timeline(1.0)
+    timeline.set_from(3, 2.0)
+    timeline.set_from(5, 2.0)
+    assert timeline.change_points() == [(0, 1.0), (3, 2.0)]
+    timeline.set_from(2, 4.0)
+    assert timeline.change_points() == [(0, 1.0), (2, 4.0)]
+    assert list(timeline.sample(np.arange(5))) == [1, 1, 4, 4, 4]
+    assert [timeline.at(t) for t in range(5)] == [1, 1, 4, 4, 4]
+
+def test_age_goes_up_on_its_own():
+    age = AgeTimeline(0, periods_per_year=4)
+    age.set_from(8, 0.5)
+    assert list(age.sample(np.arange(10))) == [0, .25, .5, .75, 1, 1.25, 1.5, 1.75, .5, .75]
+    assert age.at(9) == .75
+
+def edit_both(tables, rng, num_edits):
+    num_years = tables[0].num_years
+    for _ in range(num_edits):
+        row = int(rng.integers(len(tables[0])))
+        t = int(rng.integers(num_years))
+        if rng.random() < 0.2:
+            age = float(rng.uniform(0, 3))
+            for table in tables:
+                table.set_age(row, t, age)
+        else:
+            column = str(rng.choice(['size', 'performance', 'mtbf', 'price']))
+            value = float(rng.uniform(1, 20))
+            for table in tables:
+                table.fill(column, row, t, value)
+
+@pytest.mark.parametrize("expand_first", [False, True])
+def test_sparse_table_matches_dense_table(expand_first):
+    rng = np.random.default_rng(1)
+    dense, sparse = ProductTable(12), SparseProductTable(12)
+    for i in range(20):
+        stats = (f"p{i}", rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(14000, 27000))
+        year = int(rng.integers(0, 4))
+        dense.add(*stats, price=25, year=year)
+        sparse.add(*stats, price=25, year=year)
+
+    # Once columns have been expanded, edits only patch the years they changed
+    if expand_first:
+        for c in ProductTable.COLUMNS:
+            sparse.column(c)
+    edit_both([dense, sparse], rng, 200)
+
+    for c in ProductTable.COLUMNS:
+        assert np.allclose(sparse.column(c), dense.column(c), equal_nan=True)
+        for row in range(0, 20, 7):
+            for t in range(12):
+                assert np.isclose(sparse.get(c, row, t), dense.get(c, row, t), equal_nan=True)
+
+    market_segments = scenario.default_market_segments()
+    assert np.allclose(sparse.survey_scores(market_segments), dense.survey_scores(market_segments))
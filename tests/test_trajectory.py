@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import scenario
+from marketsegment import SegmentTrajectory
+
+def closed_form(ms, t):
+    """
+    Where a segment is at time t, straight from its parameters
+    """
+    t = np.asarray(t, dtype=float)[..., None]
+    location = np.asarray(ms.starting_point) + np.asarray(ms.drift) * t
+    price = ms.criteria.price
+    return (location, location + np.asarray(ms.offset),
+            np.concatenate((price.low - .5 * t, price.high - .5 * t), axis=-1))
+
+@pytest.mark.parametrize("t", [0, 0.3, 2.25, 2.6, 9.99, [0, 1.1, 3.75, 7.5]])
+def test_lookups_match_the_closed_form(t):
+    for ms in scenario.default_market_segments():
+        trajectory = SegmentTrajectory(ms, horizon=10)
+        location, ideal_spot, price_range = closed_form(ms, t)
+        assert np.allclose(trajectory.location(t), location)
+        assert np.allclose(trajectory.ideal_spot(t), ideal_spot)
+        assert np.allclose(trajectory.price_range(t), price_range)
+        assert trajectory.horizon == 10
+
+def test_lookups_past_the_horizon_grow_it():
+    ms = scenario.default_market_segments()[1]
+    trajectory = SegmentTrajectory(ms, horizon=2, steps_per_year=4)
+    assert np.allclose(trajectory.location(2.5), closed_form(ms, 2.5)[0])
+    assert trajectory.horizon == 4
+
+    # Doubles as many times as it takes, even for the last point of an array
+    t = [0.5, 3, 13.1]
+    assert np.allclose(trajectory.price_range(t), closed_form(ms, t)[2])
+    assert trajectory.horizon == 16
+
+    # Exactly on the end of the table still needs the row after it
+    assert np.allclose(trajectory.ideal_spot(16), closed_form(ms, 16)[1])
+    assert trajectory.horizon == 32
+
+def test_negative_times_arent_allowed():
+    trajectory = SegmentTrajectory(scenario.default_market_segments()[0])
+    with pytest.raises(AssertionError):
+        trajectory.location(-0.5)
+
+@pytest.mark.parametrize("setting, value", [
+    ("starting_point", (4, 16)),
+    ("offset", (0.5, -0.5)),
+    ("drift", (0.3, -1.2)),
+    ("criteria", None),
+])
+def test_setters_rebuild_the_trajectory(setting, value):
+    ms = scenario.default_market_segments()[0]
+    if setting == "criteria":
+        value = ms.criteria._replace(price=ms.criteria.price._replace(low=15, high=25))
+    old = ms.trajectory
+    assert ms.trajectory is old
+
+    setattr(ms, setting, value)
+    assert ms._trajectory is None
+    assert ms.trajectory is not old
+    for t in (0, 1.5, 4):
+        location, ideal_spot, price_range = closed_form(ms, t)
+        assert np.allclose(ms.get_location(t), location)
+        assert np.allclose(ms.get_ideal_spot(t), ideal_spot)
+        assert np.allclose(ms.get_price_range(t), price_range)
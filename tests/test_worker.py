@@ -0,0 +1,108 @@
+import threading
+import pytest
+import instrument
+from worker import ComputeExecutor
+
+class FakeAfter:
+    """
+    Stands in for Tk's after(); run() does what the main loop would
+    """
+    def __init__(self):
+        self.scheduled = []
+
+    def __call__(self, ms, fn):
+        self.scheduled.append(fn)
+
+    def run(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for fn in scheduled:
+            fn()
+
+def fail():
+    raise ValueError("nope")
+
+def finish(executor, futures):
+    for f in futures:
+        f.exception()
+
+@pytest.fixture
+def after():
+    return FakeAfter()
+
+def test_errors_dont_drop_other_results(after):
+    executor = ComputeExecutor(after, max_workers=1)
+    results = []
+    futures = [executor.submit("a", int, "1", on_done=results.append),
+               executor.submit("b", fail),
+               executor.submit("c", int, "3", on_done=results.append),
+               executor.submit("d", fail)]
+    finish(executor, futures)
+
+    # Everything gets delivered, then one error per poll
+    with pytest.raises(ValueError):
+        after.run()
+    assert sorted(results) == [1, 3]
+    with pytest.raises(ValueError):
+        after.run()
+    after.run()
+    assert after.scheduled == []
+    executor.shutdown()
+
+def test_callback_errors_dont_drop_other_results(after):
+    executor = ComputeExecutor(after, max_workers=1)
+    results = []
+    futures = [executor.submit("a", int, "1", on_done=lambda _: fail()),
+               executor.submit("b", int, "2", on_done=results.append)]
+    finish(executor, futures)
+    with pytest.raises(ValueError):
+        after.run()
+    assert results == [2]
+    executor.shutdown()
+
+def test_default_error_handler(after):
+    errors = []
+    executor = ComputeExecutor(after, max_workers=1, on_error=errors.append)
+    finish(executor, [executor.submit("a", fail)])
+    after.run()
+    assert [type(e) for e in errors] == [ValueError]
+    executor.shutdown()
+
+def test_stale_results_are_dropped(after):
+    executor = ComputeExecutor(after, max_workers=1)
+    results = []
+    release = threading.Event()
+    first = executor.submit("a", release.wait, on_done=results.append)
+    second = executor.submit("a", int, "2", on_done=results.append)
+    release.set()
+    finish(executor, [first, second])
+    after.run()
+    assert results == [2]
+    executor.shutdown()
+
+def test_spans_on_other_threads_dont_mix():
+    instrument.enable()
+    instrument.reset()
+    try:
+        started = threading.Event()
+        release = threading.Event()
+
+        def worker():
+            with instrument.span("worker"):
+                started.set()
+                release.wait()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        started.wait()
+        with instrument.span("main"):
+            pass
+        release.set()
+        thread.join()
+
+        # Neither span ended up nested in the other
+        collapsed = dict(instrument._collapsed)
+        assert set(collapsed) == {"main", "worker"}
+        assert instrument.stats()["main"][0] == instrument.stats()["worker"][0] == 1
+    finally:
+        instrument.disable()
+        instrument.reset()
@@ -0,0 +1,91 @@
+"""
+Drawing text with Agg rasterizes every glyph of every label, every frame.
+With blitting, that's most of what a frame costs: the segments' labels are
+drawn again each frame even though they only say a handful of different
+things (prices change at 2-decimal steps, the MTBF range never does).
+
+CachedText is a Text that rasterizes each distinct label once and then
+just copies the pixels. Cached labels get snapped to whole pixels, so they
+can sit up to half a pixel away from where Text would put them.
+
+Anything that isn't Agg (PDF/SVG export), or text with a bbox or path
+effects, is drawn the normal way.
+"""
+import numpy as np
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.colors import to_rgba
+from matplotlib.text import Text
+from matplotlib.transforms import IdentityTransform
+from heatmap import RasterCache
+
+# Rasterized labels, shared by every CachedText
+_cache = RasterCache(8 * 2**20)
+
+# Blank pixels around each label, so antialiased edges don't get cut off
+PAD = 2
+
+class CachedText(Text):
+    """
+    A Text whose pixels are reused whenever it says the same thing in the
+    same style again
+    """
+    def _key(self, renderer):
+        return (self.get_text(), to_rgba(self.get_color(), self.get_alpha()),
+                self.get_fontproperties(), renderer.dpi, self.get_horizontalalignment(),
+                self.get_verticalalignment(), self.get_rotation(), self.get_rotation_mode(),
+                self._linespacing, self.get_usetex())
+
+    def _rasterize(self, renderer, anchor):
+        """
+        Draw the label by itself into an image. Returns (rgba, where the
+        anchor is in it, counting pixels from the bottom left).
+        """
+        bbox = self.get_window_extent(renderer)
+        left = int(np.ceil(anchor[0] - bbox.x0)) + PAD
+        bottom = int(np.ceil(anchor[1] - bbox.y0)) + PAD
+        width = left + int(np.ceil(bbox.x1 - anchor[0])) + PAD
+        height = bottom + int(np.ceil(bbox.y1 - anchor[1])) + PAD
+
+        stamp = Text(left, bottom, self.get_text())
+        stamp.update_from(self)
+        stamp.set_transform(IdentityTransform())
+        stamp.set_clip_on(False)
+        stamp.set_figure(self.figure)
+
+        offscreen = RendererAgg(width, height, renderer.dpi)
+        stamp.draw(offscreen)
+        return np.asarray(offscreen.buffer_rgba()).copy(), (left, bottom)
+
+    def draw(self, renderer):
+        if (not isinstance(renderer, RendererAgg) or not self.get_visible()
+                or self.get_text() == '' or self.get_bbox_patch() is not None
+                or self.get_path_effects()):
+            return super().draw(renderer)
+
+        anchor = self.get_transform().transform(self.get_unitless_position())
+        key = self._key(renderer)
+        cached = _cache.get(key)
+        if cached is None:
+            cached = self._rasterize(renderer, anchor)
+            _cache.put(key, cached, cached[0].nbytes)
+        rgba, (left, bottom) = cached
+
+        gc = renderer.new_gc()
+        self._set_gc_clip(gc)
+        renderer.draw_image(gc, int(round(anchor[0])) - left, int(round(anchor[1])) - bottom,
+                            rgba[::-1])
+        gc.restore()
+        self.stale = False
+
+def cached_text(ax, x, y, s, **kwargs):
+    """
+    Same as ax.text, but makes a CachedText
+    """
+    text = CachedText(x, y, s, **{'verticalalignment': 'baseline',
+                                  'horizontalalignment': 'left',
+                                  'transform': ax.transData,
+                                  'clip_on': False,
+                                  **kwargs})
+    text.set_clip_path(ax.patch)
+    ax.add_artist(text)
+    return text
@@ -0,0 +1,148 @@
+"""
+Runs heavy computations (scoring, rasters, optimizing, etc) off of the Tk
+main loop so the window doesn't freeze.
+
+Every job has a key saying what it's for (e.g. "heatmap"). Submitting a
+job cancels the older jobs with the same key: ones that haven't started
+yet are dropped, and the results of ones already running are thrown
+away. Only the newest result for a key ever gets delivered.
+
+Results are delivered on the main loop: the executor polls for finished
+jobs with tkinter's after() while there are any outstanding. A job that
+raised doesn't stop the other finished jobs from being delivered.
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import instrument
+
+# How often (ms) to check for finished jobs while there are any
+POLL_MS = 15
+
+class ComputeExecutor:
+    """
+    A thread (or process) pool whose results come back on the Tk main loop
+    """
+    def __init__(self, after, processes=False, max_workers=None, poll_ms=POLL_MS,
+                 on_error=None):
+        """
+        Parameters:
+            after           Schedules a function to run on the main loop after
+                            some milliseconds (a Tk widget's after())
+            processes       Use worker processes instead of threads. Only worth
+                            it for work that holds the GIL; the functions and
+                            arguments have to be picklable.
+            max_workers     Size of the pool (defaults to what concurrent.futures picks)
+            poll_ms         How often to check for finished jobs
+            on_error        Called on the main loop with the exception of any
+                            job submitted without its own on_error. If None,
+                            those exceptions are raised from the poll, once
+                            every other finished job has been delivered.
+        """
+        self._after = after
+        self._poll_ms = poll_ms
+        self._on_error = on_error
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self._pool = pool(max_workers=max_workers)
+
+        # Key => newest job for it
+        self._latest = {}
+
+        # [(key, future, on_done, on_error)] that haven't finished yet
+        self._outstanding = []
+        self._polling = False
+
+        # Exceptions nobody handles, waiting to be raised (one per poll)
+        self._errors = []
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool, replacing any older job with the same key.
+
+        Parameters:
+            key             What the job is for; newer jobs with the same key win
+            on_done         Called on the main loop with the result
+            on_error        Called on the main loop with the exception if fn
+                            raised. Defaults to the executor's on_error.
+
+        Returns the job's Future
+        """
+        self.cancel(key)
+
+        future = self._pool.submit(fn, *args, **kwargs)
+        self._latest[key] = future
+        self._outstanding.append((key, future, on_done,
+                                  self._on_error if on_error is None else on_error))
+        self._start_polling()
+        return future
+
+    def cancel(self, key):
+        """
+        Cancel the job for a key (if it hasn't started) or ignore its result
+        (if it has)
+        """
+        future = self._latest.pop(key, None)
+        if future is not None and not future.done():
+            if not future.cancel():
+                instrument.count("worker.stale")
+            else:
+                instrument.count("worker.cancelled")
+
+    def pending(self):
+        """
+        Number of jobs whose results are still wanted
+        """
+        return sum(not f.done() for f in self._latest.values())
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self._after(self._poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+
+        still_running = []
+        finished = []
+        for job in self._outstanding:
+            (still_running if not job[1].done() else finished).append(job)
+        self._outstanding = still_running
+
+        # Keep polling before delivering, in case a callback raises
+        if still_running:
+            self._start_polling()
+
+        for key, future, on_done, on_error in finished:
+            # Cancelled, or replaced by a newer job while it ran
+            if future.cancelled() or self._latest.get(key) is not future:
+                continue
+            del self._latest[key]
+
+            # A callback that raises gets the same treatment as a job that
+            # did, so it can't keep the other results from being delivered
+            try:
+                error = future.exception()
+                if error is not None:
+                    if on_error is None:
+                        raise error
+                    on_error(error)
+                elif on_done is not None:
+                    with instrument.span(f"worker.deliver:{key}"):
+                        on_done(future.result())
+            except Exception as e:
+                self._errors.append(e)
+
+        if len(self._errors) > 1:
+            self._start_polling()
+
+        # Only raise once everything else has been delivered
+        if self._errors:
+            raise self._errors.pop(0)
+
+    def shutdown(self):
+        """
+        Cancel everything and stop the pool (doesn't wait for running jobs)
+        """
+        for key in list(self._latest):
+            self.cancel(key)
+        self._outstanding = []
+        self._errors = []
+        self._pool.shutdown(wait=False, cancel_futures=True)